@@ -70,7 +70,9 @@ allowed_origins = [
 CORS(app, resources={
     r"/api/*": {
         "origins": allowed_origins,
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "Range", "If-Range", "If-None-Match", "If-Modified-Since", "X-Chunk-SHA256"],
+        # The PDF viewer reads these to load documents with Range requests
+        "expose_headers": ["Accept-Ranges", "Content-Range", "Content-Length", "ETag"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
     },
     r"/apispec*": {"origins": "*"},
@@ -0,0 +1,88 @@
+"""
+Benchmark concurrent kernel boots through RedisKernelManager.
+
+N users request their first kernel at the same moment. With per-user boot
+futures the boots overlap, so wall time stays close to a single boot instead
+of N boots back to back. A user whose kernel already exists is timed while
+the others boot, to show they are not blocked behind the shared lock.
+
+Usage:
+    python bench_kernel_boot.py --users 8                 # real ipykernel boots
+    python bench_kernel_boot.py --users 50 --simulate 2   # fake 2 s boots, no kernels
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Isolate boot cost: no pre-warmed pool, no reaper, no kernel cap in the way
+os.environ['KERNEL_POOL_SIZE'] = '0'
+os.environ['KERNEL_IDLE_TIMEOUT'] = '0'
+os.environ.setdefault('KERNEL_MAX_PER_WORKER', '1000')
+
+from notebook_executor import NotebookExecutor
+from redis_kernel_manager import RedisKernelManager
+
+
+class SimulatedExecutor:
+    """Stands in for NotebookExecutor with a fixed boot delay"""
+
+    boot_seconds = 2.0
+
+    def __init__(self):
+        time.sleep(self.boot_seconds)
+        self.last_used = time.time()
+
+    def is_alive(self):
+        return True
+
+    def is_busy(self):
+        return False
+
+    def shutdown(self):
+        pass
+
+
+def run(users, factory):
+    manager = RedisKernelManager(executor_factory=factory)
+
+    # One user with a kernel already running
+    start = time.perf_counter()
+    manager.get_kernel(0)
+    single_boot = time.perf_counter() - start
+
+    def boot(user_id):
+        t0 = time.perf_counter()
+        manager.get_kernel(user_id)
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=users + 1) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(boot, user_id) for user_id in range(1, users + 1)]
+        time.sleep(0.05)
+        existing_user = pool.submit(boot, 0).result()
+        latencies = [f.result() for f in futures]
+        wall = time.perf_counter() - start
+
+    print(f"Single boot:                 {single_boot:.2f}s")
+    print(f"{users} concurrent boots wall:    {wall:.2f}s "
+          f"(serial would be ~{single_boot * users:.2f}s)")
+    print(f"Per-user boot latency:       min {min(latencies):.2f}s / max {max(latencies):.2f}s")
+    print(f"Existing user during boots:  {existing_user * 1000:.1f}ms")
+
+    for user_id in range(0, users + 1):
+        manager.cleanup_user_kernel(user_id)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='number of users booting at once')
+    parser.add_argument('--simulate', type=float, default=None,
+                        help='use a fake executor that takes this many seconds to boot')
+    args = parser.parse_args()
+
+    if args.simulate is not None:
+        SimulatedExecutor.boot_seconds = args.simulate
+        run(args.users, SimulatedExecutor)
+    else:
+        run(args.users, NotebookExecutor)
@@ -0,0 +1,188 @@
+import os
+import re
+import uuid
+import fcntl
+import tempfile
+from contextlib import contextmanager
+from threading import Lock
+
+from file_utils import sha256_file
+
+_DIGEST = re.compile(r'[0-9a-f]{64}')
+
+# Only these are linked: metadata.json and other files may be edited in place
+BLOB_EXTENSIONS = ('.ipynb', '.pdf')
+
+
+def link_digest(path):
+    """sha256 of a file stored as a link into the blob store, from the link itself; None for plain files"""
+    try:
+        target = os.readlink(path)
+    except OSError:
+        return None
+    folder, name = os.path.split(target)
+    if _DIGEST.fullmatch(name) and '.blobs' in folder.split(os.sep):
+        return name
+    return None
+
+
+class BlobStore:
+    """
+    Content-addressed storage of course files under public/.blobs.
+
+    Each distinct notebook or PDF is stored once, as
+    public/.blobs/sha256/<first two hex digits>/<sha256>, and the day folders
+    hold relative symlinks to it under the uploaded name. The same deck
+    uploaded into several days or course buckets takes its space, and its
+    pages in the OS page cache, only once; its hash is known from the link
+    name without reading the file, and serves as its ETag.
+
+    Links are replaced atomically, so a re-upload swaps the content in one
+    step. Blobs no day folder links to any more are removed by
+    collect_garbage(); collect_unlinked() runs it only when a replacement or
+    remove() has dropped a link since the last collection. Adding holds a shared flock on .blobs/.lock and
+    collecting an exclusive one, so several workers never remove a blob
+    another is linking. CONTENT_BLOB_STORE=off keeps plain files.
+    """
+
+    def __init__(self, public_folder_getter):
+        self.public_folder_getter = public_folder_getter
+        self.enabled = os.environ.get('CONTENT_BLOB_STORE', 'on').lower() not in ('off', 'false', '0', 'no')
+        self.lock = Lock()
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.collected = 0
+        self.unlinked = False  # a link to some blob was dropped since the last collection
+
+    def _root(self):
+        return os.path.join(self.public_folder_getter(), '.blobs')
+
+    def blob_path(self, digest):
+        return os.path.join(self._root(), 'sha256', digest[:2], digest)
+
+    @contextmanager
+    def _locked(self, mode):
+        os.makedirs(self._root(), exist_ok=True)
+        with open(os.path.join(self._root(), '.lock'), 'a') as f:
+            fcntl.flock(f, mode)
+            yield
+
+    # ── Writing ──
+
+    def save(self, destination, save):
+        """Store a file written through save(fileobj) and link it at destination; returns its sha256"""
+        staging = os.path.join(self._root(), 'tmp')
+        os.makedirs(staging, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=staging)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                save(f)
+            return self.add(tmp, destination)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def add(self, source, destination, digest=None):
+        """Move a file (on the same filesystem as public/) into the store and link it at destination.
+
+        source may be destination itself, to convert a file in place. digest
+        may be passed when the caller has already verified it. Returns the sha256.
+        """
+        digest = digest or sha256_file(source)
+        blob = self.blob_path(digest)
+        with self._locked(fcntl.LOCK_SH):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if os.path.exists(blob):
+                with self.lock:
+                    self.deduplicated += 1
+                    self.bytes_saved += os.path.getsize(source)
+            else:
+                # Hard-linked first, so source stays readable until the symlink replaces it
+                os.chmod(source, 0o644)
+                os.link(source, blob)
+                with self.lock:
+                    self.stored += 1
+            replaced = link_digest(destination)
+            self._link(blob, destination)
+            if replaced and replaced != digest:
+                with self.lock:
+                    self.unlinked = True
+            if os.path.abspath(source) != os.path.abspath(destination):
+                os.unlink(source)
+        return digest
+
+    def _link(self, blob, destination):
+        folder = os.path.dirname(destination)
+        tmp = os.path.join(folder, f'.link-{uuid.uuid4().hex}')
+        os.symlink(os.path.relpath(blob, folder), tmp)
+        try:
+            os.replace(tmp, destination)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    # ── Cleaning up ──
+
+    def remove(self, path):
+        """Delete a file or link from a day folder"""
+        digest = link_digest(path)
+        os.remove(path)
+        if digest:
+            with self.lock:
+                self.unlinked = True
+
+    def _linked_digests(self):
+        digests = set()
+        for folder, dirs, files in os.walk(self.public_folder_getter()):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            for name in files:
+                digest = link_digest(os.path.join(folder, name))
+                if digest:
+                    digests.add(digest)
+        return digests
+
+    def collect_garbage(self):
+        """Remove blobs no file under public/ links to; returns how many"""
+        root = os.path.join(self._root(), 'sha256')
+        if not os.path.isdir(root):
+            return 0
+        removed = 0
+        with self._locked(fcntl.LOCK_EX):
+            linked = self._linked_digests()
+            for prefix in os.listdir(root):
+                for name in os.listdir(os.path.join(root, prefix)):
+                    if _DIGEST.fullmatch(name) and name not in linked:
+                        os.remove(os.path.join(root, prefix, name))
+                        removed += 1
+        with self.lock:
+            self.collected += removed
+        return removed
+
+    def collect_unlinked(self):
+        """collect_garbage() if a link has been dropped since the last collection; returns how many"""
+        with self.lock:
+            unlinked, self.unlinked = self.unlinked, False
+        return self.collect_garbage() if unlinked else 0
+
+    def get_stats(self):
+        blobs = total_bytes = 0
+        root = os.path.join(self._root(), 'sha256')
+        for folder, _, files in os.walk(root):
+            for name in files:
+                try:
+                    total_bytes += os.path.getsize(os.path.join(folder, name))
+                    blobs += 1
+                except OSError:
+                    continue
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'blobs': blobs,
+                'bytes': total_bytes,
+                'stored': self.stored,
+                'deduplicated': self.deduplicated,
+                'bytes_saved': self.bytes_saved,
+                'collected': self.collected,
+            }
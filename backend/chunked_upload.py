@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+
+from file_utils import sha256_file, write_atomic
+
+_UPLOAD_ID = re.compile(r'[0-9a-f]{32}')
+_BLOCK_SIZE = 256 * 1024
+
+
+class UploadError(Exception):
+    """A chunked upload request that cannot be accepted; the message is shown to the client"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ChunkedUploads:
+    """
+    Resumable uploads of course files in fixed-size chunks.
+
+    A session lives in public/.uploads/<upload_id>/ (hidden from the content
+    catalog, on the same filesystem as the day folders, visible to every
+    worker): session.json, the data file the chunks are written into at
+    their offsets, and one marker per chunk that arrived intact. A client
+    that lost its connection asks for the session status and sends only
+    the missing chunks. Completing the upload renames the data file over
+    the final path (or into the blob store, linked from it), so readers
+    never see a partial file.
+
+    UPLOAD_CHUNK_SIZE sets the chunk size, UPLOAD_MAX_BYTES the largest
+    file, and sessions untouched for UPLOAD_SESSION_TTL seconds are removed.
+    """
+
+    def __init__(self, public_folder_getter, blobs=None):
+        self.public_folder_getter = public_folder_getter
+        self.blobs = blobs   # optional BlobStore the completed files go into
+        self.chunk_size = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+        self.max_bytes = int(os.environ.get('UPLOAD_MAX_BYTES', str(1024 * 1024 * 1024)))
+        self.ttl = int(os.environ.get('UPLOAD_SESSION_TTL', '86400'))
+
+    def _root(self):
+        return os.path.join(self.public_folder_getter(), '.uploads')
+
+    def _dir(self, upload_id):
+        return os.path.join(self._root(), upload_id)
+
+    def create(self, day_number, filename, size, sha256=None):
+        """Start an upload session; returns its status"""
+        if not isinstance(size, int) or size < 0 or size > self.max_bytes:
+            raise UploadError(f'size must be between 0 and {self.max_bytes} bytes')
+        self.prune()
+        session = {
+            'upload_id': uuid.uuid4().hex,
+            'day_number': day_number,
+            'filename': filename,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'chunk_size': self.chunk_size,
+            'chunks': max(1, -(-size // self.chunk_size)),
+            'created_at': time.time(),
+        }
+        folder = self._dir(session['upload_id'])
+        os.makedirs(os.path.join(folder, 'received'))
+        with open(os.path.join(folder, 'data'), 'wb') as f:
+            f.truncate(size)
+        with open(os.path.join(folder, 'session.json'), 'w') as f:
+            json.dump(session, f)
+        return self.status(session)
+
+    def load(self, upload_id):
+        if not _UPLOAD_ID.fullmatch(upload_id):
+            raise UploadError('Upload not found', 404)
+        try:
+            with open(os.path.join(self._dir(upload_id), 'session.json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError('Upload not found', 404)
+
+    def _received(self, session):
+        try:
+            return sorted(int(name) for name in os.listdir(os.path.join(self._dir(session['upload_id']), 'received')))
+        except OSError:
+            return []
+
+    def status(self, session):
+        received = self._received(session)
+        return {
+            **session,
+            'received': received,
+            'missing': sorted(set(range(session['chunks'])) - set(received)),
+        }
+
+    def write_chunk(self, session, index, stream, length, sha256=None):
+        """Stream one chunk from the request body into place; returns the session status"""
+        if not 0 <= index < session['chunks']:
+            raise UploadError(f"chunk index must be between 0 and {session['chunks'] - 1}")
+        offset = index * session['chunk_size']
+        expected = min(session['chunk_size'], session['size'] - offset)
+        if length != expected:
+            raise UploadError(f'chunk {index} must be {expected} bytes, got {length}')
+
+        folder = self._dir(session['upload_id'])
+        marker = os.path.join(folder, 'received', str(index))
+        if os.path.exists(marker):
+            os.remove(marker)  # being re-sent: it only counts again once it arrives intact
+        digest = hashlib.sha256()
+        fd = os.open(os.path.join(folder, 'data'), os.O_WRONLY)
+        try:
+            written = 0
+            while written < expected:
+                block = stream.read(min(_BLOCK_SIZE, expected - written))
+                if not block:
+                    raise UploadError(f'chunk {index} ended after {written} of {expected} bytes')
+                os.pwrite(fd, block, offset + written)
+                digest.update(block)
+                written += len(block)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise UploadError(f'chunk {index} checksum mismatch, send it again')
+        open(marker, 'w').close()
+        return self.status(session)
+
+    def complete(self, session, final_path):
+        """Move a fully received upload into place.
+
+        final_path is called for the destination once the upload checks out,
+        so a failed completion creates nothing. Returns the destination.
+        """
+        status = self.status(session)
+        if status['missing']:
+            raise UploadError(f"{len(status['missing'])} chunk(s) missing", 409)
+        folder = self._dir(session['upload_id'])
+        data = os.path.join(folder, 'data')
+        if session['sha256'] and sha256_file(data) != session['sha256']:
+            self.abort(session)
+            raise UploadError('file checksum mismatch, upload it again', 422)
+
+        destination = final_path()
+        if self.blobs and self.blobs.enabled:
+            self.blobs.add(data, destination, session['sha256'])
+            self.abort(session)
+            return destination
+        os.chmod(data, 0o644)
+        try:
+            os.replace(data, destination)
+        except OSError:
+            # Day folder on another filesystem: copy next to it, then rename
+            with open(data, 'rb') as src:
+                write_atomic(destination, lambda f: shutil.copyfileobj(src, f))
+        self.abort(session)
+        return destination
+
+    def abort(self, session):
+        shutil.rmtree(self._dir(session['upload_id']), ignore_errors=True)
+
+    def prune(self):
+        """Remove sessions untouched for longer than the TTL"""
+        root = self._root()
+        if not os.path.isdir(root):
+            return
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(root):
+            folder = os.path.join(root, name)
+            try:
+                # Chunk writes touch the data file; a session still being created has only the folder
+                data = os.path.join(folder, 'data')
+                touched = os.path.getmtime(data if os.path.exists(data) else folder)
+            except OSError:
+                continue
+            if touched < cutoff:
+                shutil.rmtree(folder, ignore_errors=True)
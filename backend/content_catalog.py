@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import struct
+import ctypes
+import ctypes.util
+from threading import Lock, Thread
+
+from pdf_pages import read_page_index
+from blob_store import link_digest
+
+# inotify(7) constants
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+
+
+def file_type(name):
+    """Content type of a day folder file, as shown in the admin listing"""
+    if name.endswith('.ipynb'):
+        return 'notebook'
+    if name.endswith('.pdf'):
+        return 'pdf'
+    return 'other'
+
+
+class _Inotify:
+    """Minimal inotify binding (ctypes): marks the catalog dirty on any change"""
+
+    def __init__(self, on_change):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.on_change = on_change
+        self.watched = set()
+        Thread(target=self._read_events, name='content-catalog-inotify', daemon=True).start()
+
+    def watch(self, paths):
+        for path in paths:
+            if path in self.watched:
+                continue
+            if self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK) >= 0:
+                self.watched.add(path)
+
+    def forget(self):
+        """Re-add every watch on the next refresh (directories may have been replaced)"""
+        self.watched = set()
+
+    def _read_events(self):
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError:
+                return
+            # Each event is a struct inotify_event; the details do not matter,
+            # any event under the content tree means the snapshot is stale
+            if len(data) >= struct.calcsize('iIII'):
+                self.on_change()
+
+
+class ContentCatalog:
+    """
+    Process-wide, in-memory index of the course content under public/.
+
+    Holds the day number -> folder mapping (top-level dayN folders plus
+    course buckets, see the discovery rules in build()), each day's files
+    with sizes and mtimes, and its parsed metadata.json with title,
+    description and level pulled out. Day listings, content pages, search,
+    recommendations and the admin content listing all read the current
+    snapshot without touching the filesystem.
+
+    Staleness is detected with inotify when available (CONTENT_CATALOG_WATCH
+    = auto | inotify | mtime). Otherwise the mtimes of the watched
+    directories and metadata files are compared at most once every
+    CONTENT_CATALOG_CHECK_INTERVAL seconds. Writers in this process call
+    invalidate() after changing content.
+
+    A refresh builds a complete new snapshot and swaps it in with a single
+    assignment, so readers see either the old catalog or the new one, never
+    a half-built one. Snapshots are shared: callers must not mutate them.
+    """
+
+    def __init__(self, public_folder_getter):
+        self.public_folder_getter = public_folder_getter
+        self.check_interval = float(os.environ.get('CONTENT_CATALOG_CHECK_INTERVAL', '2'))
+        self.watch_mode = os.environ.get('CONTENT_CATALOG_WATCH', 'auto').lower()
+
+        self._snapshot = None
+        self._generation = 0   # bumped by invalidate(); a snapshot is current if it matches
+        self._last_check = 0.0
+        self._refresh_lock = Lock()
+        self._inotify = None
+        self._pid = None
+        self.refreshes = 0
+
+    # ── Reading ──
+
+    def days(self):
+        """{day_number: day entry} for every discovered day"""
+        return self._current()['days']
+
+    def list_days(self, allowed_day_numbers=None):
+        """Day entries in day_number order, optionally limited to a set of day numbers"""
+        days = self._current()['days']
+        return [days[n] for n in sorted(days)
+                if allowed_day_numbers is None or n in allowed_day_numbers]
+
+    def day(self, day_number):
+        """The entry for one day, or None"""
+        return self._current()['days'].get(day_number)
+
+    def resolve(self, day_number):
+        """The folder of a day, or None"""
+        entry = self.day(day_number)
+        return entry['path'] if entry else None
+
+    def has_file(self, day_number, filename):
+        entry = self.day(day_number)
+        return bool(entry) and filename in entry['file_names']
+
+    def invalidate(self):
+        """Mark the catalog stale; the next read rebuilds it"""
+        self._generation += 1
+
+    def get_stats(self):
+        snapshot = self._snapshot
+        return {
+            'watch': 'inotify' if self._inotify else 'mtime',
+            'days': len(snapshot['days']) if snapshot else 0,
+            'built_at': snapshot['built_at'] if snapshot else None,
+            'refreshes': self.refreshes,
+        }
+
+    # ── Freshness ──
+
+    def _current(self):
+        if self._pid != os.getpid():
+            # First use in this process (or after a fork): watchers do not survive fork
+            self._pid = os.getpid()
+            self._inotify = None
+            self.invalidate()
+            self._start_watching()
+
+        snapshot = self._snapshot
+        if snapshot is not None and not self._inotify and self._mtimes_changed(snapshot):
+            self.invalidate()
+        if snapshot is None or snapshot['generation'] != self._generation:
+            snapshot = self._refresh()
+        return snapshot
+
+    def _start_watching(self):
+        if self.watch_mode not in ('auto', 'inotify'):
+            return
+        try:
+            self._inotify = _Inotify(self.invalidate)
+        except (OSError, AttributeError) as e:
+            if self.watch_mode == 'inotify':
+                print(f"⚠ inotify unavailable ({e}), content catalog falls back to mtime checks")
+
+    def _mtimes_changed(self, snapshot):
+        now = time.time()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        return _stat_signature(snapshot['watched']) != snapshot['signature']
+
+    def _refresh(self):
+        with self._refresh_lock:
+            # Another thread may have rebuilt it while we waited
+            generation = self._generation
+            if self._snapshot is not None and self._snapshot['generation'] == generation:
+                return self._snapshot
+            self._last_check = time.time()
+            snapshot = build(self.public_folder_getter())
+            # Changes seen during the scan bump the generation again, so they are not lost
+            snapshot['generation'] = generation
+            if self._inotify:
+                self._inotify.forget()
+                self._inotify.watch(snapshot['watched'])
+                # Anything that changed between the scan and the watches being added
+                if _stat_signature(snapshot['watched']) != snapshot['signature']:
+                    self.invalidate()
+            self._snapshot = snapshot
+            self.refreshes += 1
+            return snapshot
+
+
+def _stat_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return signature
+
+
+def _read_metadata(folder):
+    path = os.path.join(folder, 'metadata.json')
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _day_entry(day_number, path, public_folder):
+    files = []
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        names = []
+    for name in names:
+        if name.startswith('.') or name == 'metadata.json':
+            continue
+        file_path = os.path.join(path, name)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        if not os.path.isfile(file_path):
+            continue
+        kind = file_type(name)
+        # Page count from the PDF's page index, None until it has been extracted
+        page_index = read_page_index(file_path, stat) if kind == 'pdf' else None
+        files.append({
+            'name': name,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'type': kind,
+            'pages': page_index['pages'] if page_index else None,
+            # Known from the link for blob-stored files, otherwise once the PDF is indexed
+            'sha256': link_digest(file_path) or (page_index['sha256'] if page_index else None),
+        })
+
+    metadata = _read_metadata(path)
+    return {
+        'day_number': day_number,
+        'path': path,
+        'folder': os.path.relpath(path, public_folder),
+        'title': metadata.get('title', f'Day {day_number}'),
+        'description': metadata.get('description', ''),
+        'level': metadata.get('level', ''),
+        'videos': metadata.get('videos', []),
+        'files': files,
+        'file_names': frozenset(f['name'] for f in files),
+        'notebooks': [f['name'] for f in files if f['type'] == 'notebook'],
+        'pdfs': [f['name'] for f in files if f['type'] == 'pdf'],
+        'metadata': metadata,
+    }
+
+
+def build(public_folder):
+    """Scan public_folder into a catalog snapshot.
+
+    Discovery rules:
+      1. Top-level `public/dayN/` folders — day_number from the folder name.
+      2. Any other top-level folder is treated as a *course bucket* and is
+         walked one level deep. Each sub-folder containing a `metadata.json`
+         with a numeric `day_number` is registered. This lets nested courses
+         (e.g. `public/student_course/module1_.../`) plug in without touching
+         the existing `dayN` numbering.
+    Hidden (dot) folders are skipped.
+    """
+    snapshot = {'days': {}, 'watched': [], 'signature': [], 'built_at': time.time()}
+    if not os.path.exists(public_folder):
+        return snapshot
+
+    watched = [public_folder]
+    mapping = {}
+    for item in sorted(os.listdir(public_folder)):
+        item_path = os.path.join(public_folder, item)
+        if item.startswith('.') or not os.path.isdir(item_path):
+            continue
+
+        # Case 1 — legacy top-level dayN folder.
+        if item.startswith('day'):
+            try:
+                mapping[int(item.replace('day', ''))] = item_path
+                continue
+            except ValueError:
+                pass  # fall through to bucket scan
+
+        # Case 2 — course bucket, recurse one level for explicit day_number.
+        watched.append(item_path)
+        try:
+            sub_items = sorted(os.listdir(item_path))
+        except OSError:
+            continue
+        for sub in sub_items:
+            sub_path = os.path.join(item_path, sub)
+            if sub.startswith('.') or not os.path.isdir(sub_path):
+                continue
+            # Watched even without metadata, so adding one is noticed
+            watched.append(sub_path)
+            watched.append(os.path.join(sub_path, 'metadata.json'))
+            meta = _read_metadata(sub_path)
+            n = meta.get('day_number')
+            if isinstance(n, int):
+                mapping[n] = sub_path
+
+    for day_number, path in mapping.items():
+        snapshot['days'][day_number] = _day_entry(day_number, path, public_folder)
+        if path not in watched:
+            watched.append(path)
+            watched.append(os.path.join(path, 'metadata.json'))
+
+    snapshot['watched'] = watched
+    snapshot['signature'] = _stat_signature(watched)
+    return snapshot
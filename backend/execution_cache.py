@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+from blob_store import link_digest
+
+CACHE_TAG = 'cacheable'
+
+
+def is_cacheable_cell(cell):
+    """True if a notebook cell opted in to result caching.
+
+    Authors mark a deterministic, side-effect-free cell with either
+    metadata {"lms": {"cacheable": true}} or the cell tag "cacheable".
+    """
+    if cell.get('cell_type') != 'code':
+        return False
+    metadata = cell.get('metadata') or {}
+    lms = metadata.get('lms')
+    if isinstance(lms, dict) and lms.get('cacheable') is True:
+        return True
+    return CACHE_TAG in (metadata.get('tags') or [])
+
+
+def code_cells(notebook):
+    """{'count': number of cells, 'code': {index: (source, cacheable)}} of a parsed notebook"""
+    cells = notebook.get('cells', []) if isinstance(notebook, dict) else []
+    code = {}
+    for index, cell in enumerate(cells):
+        if cell.get('cell_type') == 'code':
+            source = cell.get('source', '')
+            code[index] = (''.join(source) if isinstance(source, list) else source, is_cacheable_cell(cell))
+    return {'count': len(cells), 'code': code}
+
+
+_notebook_hashes = {}
+_notebook_hashes_lock = Lock()
+
+
+def notebook_hash(path):
+    """sha256 of a notebook file, re-hashed only when its mtime or size changes"""
+    digest = link_digest(path)
+    if digest:
+        return digest  # stored in the blob store: the link names it
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _notebook_hashes_lock:
+        cached = _notebook_hashes.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _notebook_hashes_lock:
+        _notebook_hashes[path] = (signature, digest)
+    return digest
+
+
+class ExecutionCache:
+    """
+    Memoized outputs of cacheable notebook cells, shared by all learners.
+
+    - Keyed by notebook hash + cell index + source hash, so editing the
+      notebook or the cell's code never returns stale output
+    - Bounded LRU of EXECUTION_CACHE_MAX_ENTRIES entries: an OrderedDict in
+      memory, or (when Redis is available) one key per entry plus a sorted
+      set of last-access times shared by every worker
+    - Outputs containing errors or spilled (per-user) payloads, or larger than
+      EXECUTION_CACHE_MAX_ENTRY_BYTES, are never stored
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+        self.max_entries = int(os.environ.get('EXECUTION_CACHE_MAX_ENTRIES', '1000'))
+        self.max_entry_bytes = int(os.environ.get('EXECUTION_CACHE_MAX_ENTRY_BYTES', str(256 * 1024)))
+        self.ttl = int(os.environ.get('EXECUTION_CACHE_TTL', '86400'))
+
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    @staticmethod
+    def key(notebook_digest, cell_index, source):
+        source_digest = hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+        return f"execcache:{notebook_digest[:32]}:{cell_index}:{source_digest}"
+
+    def get(self, key):
+        """Return the stored outputs for key, or None"""
+        outputs = None
+        if self.redis_client:
+            try:
+                raw = self.redis_client.get(key)
+                if raw:
+                    self.redis_client.zadd('execcache:lru', {key: time.time()})
+                    outputs = json.loads(raw)
+            except Exception as e:
+                print(f"⚠ Redis error reading execution cache: {e}")
+        else:
+            with self.lock:
+                outputs = self.entries.get(key)
+                if outputs is not None:
+                    self.entries.move_to_end(key)
+
+        with self.lock:
+            if outputs is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return outputs
+
+    def put(self, key, outputs):
+        """Store a cell's outputs if they are safe to share"""
+        if any(o['type'] == 'error' or 'spilled' in o for o in outputs):
+            return
+        outputs = [{**o, 'execution_count': None} if 'execution_count' in o else o for o in outputs]
+        raw = json.dumps(outputs)
+        if len(raw) > self.max_entry_bytes:
+            return
+
+        if self.redis_client:
+            try:
+                pipe = self.redis_client.pipeline()
+                pipe.set(key, raw, ex=self.ttl)
+                pipe.zadd('execcache:lru', {key: time.time()})
+                pipe.zcard('execcache:lru')
+                size = pipe.execute()[-1]
+                if size > self.max_entries:
+                    evicted = [k for k, _ in self.redis_client.zpopmin('execcache:lru', size - self.max_entries)]
+                    if evicted:
+                        self.redis_client.delete(*evicted)
+            except Exception as e:
+                print(f"⚠ Redis error writing execution cache: {e}")
+                return
+            with self.lock:
+                self.stored += 1
+            return
+
+        with self.lock:
+            self.entries[key] = outputs
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.stored += 1
+
+    def get_stats(self):
+        if self.redis_client:
+            try:
+                size = self.redis_client.zcard('execcache:lru')
+            except Exception:
+                size = None
+        else:
+            size = len(self.entries)
+        with self.lock:
+            return {
+                'backend': 'redis' if self.redis_client else 'memory',
+                'entries': size,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stored': self.stored,
+            }
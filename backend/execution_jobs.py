@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Condition, Thread
+
+
+class TooManyQueuedJobs(Exception):
+    """Raised when a user already has EXECUTION_JOB_MAX_QUEUED jobs waiting"""
+
+
+class ExecutionJobManager:
+    """
+    Runs notebook cells as background jobs so long cells do not hold a request thread.
+
+    - Submitting a cell returns a job id immediately; the job waits in the
+      fair-share scheduler's queue and only takes one of the
+      EXECUTION_JOB_WORKERS pool threads once it has a slot, so one user's
+      backlog never occupies the threads other users' jobs need
+    - A user may have at most EXECUTION_JOB_MAX_QUEUED jobs waiting
+    - Outputs are appended to the job as the kernel streams them, so clients
+      can poll (or long-poll) for partial results
+    - Cancelling a running job sends a kernel interrupt
+
+    Job state lives in Redis when the kernel manager has a Redis connection
+    (so any worker can answer a poll), otherwise in this worker's memory.
+    """
+
+    FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+    def __init__(self, kernel_manager, scheduler):
+        self.kernel_manager = kernel_manager
+        self.scheduler = scheduler
+        self.redis_client = kernel_manager.redis_client if kernel_manager.redis_available else None
+        self.worker_id = os.getpid()
+
+        self.job_ttl = int(os.environ.get('EXECUTION_JOB_TTL', '3600'))
+        self.max_queued = int(os.environ.get('EXECUTION_JOB_MAX_QUEUED', '10'))
+        # Never fewer threads than slots, so a granted job does not wait for a thread
+        max_workers = max(int(os.environ.get('EXECUTION_JOB_WORKERS', '8')), scheduler.max_concurrent)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cell-job')
+
+        # In-memory job store (used when Redis is not available)
+        self.jobs = {}
+        self.cancel_requested = set()
+
+        # Jobs waiting for a slot on this worker, job_id -> (scheduler handle, job)
+        self.waiting = {}
+        # Kernels running a job on this worker, job_id -> kernel
+        self.running = {}
+        self.lock = Lock()
+        self.changed = Condition(self.lock)
+
+        if self.redis_client:
+            Thread(target=self._watch_cancellations, name='cell-job-cancel-watcher', daemon=True).start()
+
+    # ── Public API ──
+
+    def submit(self, user_id, code):
+        """Queue a cell for execution and return the new job record.
+
+        Raises TooManyQueuedJobs if the user already has max_queued jobs waiting.
+        """
+        with self.lock:
+            queued = sum(1 for _, waiting in self.waiting.values() if waiting['user_id'] == user_id)
+        if queued >= self.max_queued:
+            raise TooManyQueuedJobs(f"You already have {queued} cells queued; wait for them to finish")
+
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'status': 'queued',
+            'error': None,
+            'worker_id': self.worker_id,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        self._prune_expired()
+        self._save(job)
+        with self.lock:
+            # Registered before submitting: the slot may be granted right away
+            self.waiting[job['job_id']] = (None, job)
+        handle = self.scheduler.submit(user_id, lambda started: self._granted(job, code, started))
+        with self.lock:
+            if job['job_id'] in self.waiting:
+                self.waiting[job['job_id']] = (handle, job)
+        return job
+
+    def get(self, job_id, since=0):
+        """Return a job with its outputs from index `since` onwards, or None"""
+        job = self._load(job_id)
+        if job is None:
+            return None
+        outputs, total = self._load_outputs(job_id, since)
+        return {**job, 'outputs': outputs, 'output_count': total}
+
+    def wait(self, job_id, timeout, since=0):
+        """Long-poll: return once the job finishes, has outputs past `since`, or timeout expires"""
+        deadline = time.time() + timeout
+        while True:
+            job = self.get(job_id, since)
+            if job is None or job['status'] in self.FINISHED_STATES or job['output_count'] > since:
+                return job
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return job
+
+            if job['worker_id'] == self.worker_id:
+                with self.changed:
+                    self.changed.wait(remaining)
+            else:
+                # Job runs on another worker, poll Redis
+                time.sleep(min(0.25, remaining))
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or interrupt the kernel running it"""
+        if self.redis_client:
+            self.redis_client.set(f"execjob:{job_id}:cancel", 1, ex=self.job_ttl)
+        else:
+            with self.lock:
+                self.cancel_requested.add(job_id)
+
+        with self.lock:
+            handle, job = self.waiting.get(job_id, (None, None))
+        if handle and self.scheduler.withdraw(handle):
+            with self.lock:
+                self.waiting.pop(job_id, None)
+            self._finish(job, 'cancelled')
+            return
+
+        with self.lock:
+            kernel = self.running.get(job_id)
+        if kernel:
+            print(f"Interrupting kernel for job {job_id}")
+            kernel.interrupt()
+
+    # ── Worker side ──
+
+    def _granted(self, job, code, started):
+        """Scheduler callback: the job has a slot, hand it to a pool thread"""
+        with self.lock:
+            self.waiting.pop(job['job_id'], None)
+        try:
+            self.executor.submit(self._run, job, code, started)
+        except RuntimeError as e:  # pool shut down
+            self.scheduler.release(job['user_id'], started)
+            self._finish(job, 'failed', error=str(e))
+
+    def _run(self, job, code, started):
+        job_id = job['job_id']
+        try:
+            # A cancel that arrived while the job was queued (possibly through another worker)
+            if self._is_cancel_requested(job_id):
+                self._finish(job, 'cancelled')
+                return
+
+            kernel = self.kernel_manager.get_kernel(job['user_id'])
+            with self.lock:
+                self.running[job_id] = kernel
+            if self._is_cancel_requested(job_id):
+                self._finish(job, 'cancelled')
+                return
+
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            self._save(job)
+
+            for output in kernel.execute_cell_stream(code):
+                if output['type'] == 'status':
+                    # Session notices go on the job record, not into its outputs
+                    job.setdefault('notices', []).append(output['text'])
+                    self._save(job)
+                else:
+                    self._append_output(job_id, output)
+        except Exception as e:
+            self._finish(job, 'failed', error=str(e))
+            return
+        finally:
+            with self.lock:
+                self.running.pop(job_id, None)
+            self.scheduler.release(job['user_id'], started)
+
+        self._finish(job, 'cancelled' if self._is_cancel_requested(job_id) else 'completed')
+
+    def _finish(self, job, status, error=None):
+        job['status'] = status
+        job['error'] = error
+        job['finished_at'] = time.time()
+        self._save(job)
+
+    def _watch_cancellations(self):
+        """Interrupt local jobs cancelled through another worker (Redis mode only)"""
+        while True:
+            time.sleep(0.5)
+            with self.lock:
+                running = list(self.running.items())
+            for job_id, kernel in running:
+                try:
+                    if self.redis_client.exists(f"execjob:{job_id}:cancel"):
+                        print(f"Interrupting kernel for job {job_id} (cancelled remotely)")
+                        kernel.interrupt()
+                        with self.lock:
+                            self.running.pop(job_id, None)
+                except Exception as e:
+                    print(f"⚠ Redis error watching job cancellations: {e}")
+
+    # ── Storage ──
+
+    def _save(self, job):
+        if self.redis_client:
+            self.redis_client.set(f"execjob:{job['job_id']}", json.dumps(job), ex=self.job_ttl)
+        with self.changed:
+            if not self.redis_client:
+                stored = self.jobs.setdefault(job['job_id'], {'outputs': []})
+                stored.update(job)
+            self.changed.notify_all()
+
+    def _load(self, job_id):
+        if self.redis_client:
+            raw = self.redis_client.get(f"execjob:{job_id}")
+            return json.loads(raw) if raw else None
+        with self.lock:
+            stored = self.jobs.get(job_id)
+            return {k: v for k, v in stored.items() if k != 'outputs'} if stored else None
+
+    def _append_output(self, job_id, output):
+        if self.redis_client:
+            key = f"execjob:{job_id}:outputs"
+            pipe = self.redis_client.pipeline()
+            pipe.rpush(key, json.dumps(output))
+            pipe.expire(key, self.job_ttl)
+            pipe.execute()
+        with self.changed:
+            if not self.redis_client:
+                self.jobs[job_id]['outputs'].append(output)
+            self.changed.notify_all()
+
+    def _load_outputs(self, job_id, since):
+        """Return (outputs[since:], total output count)"""
+        if self.redis_client:
+            key = f"execjob:{job_id}:outputs"
+            outputs = [json.loads(o) for o in self.redis_client.lrange(key, since, -1)]
+            return outputs, (since + len(outputs) if outputs else self.redis_client.llen(key))
+        with self.lock:
+            outputs = self.jobs.get(job_id, {}).get('outputs', [])
+            return outputs[since:], len(outputs)
+
+    def _is_cancel_requested(self, job_id):
+        if self.redis_client:
+            return bool(self.redis_client.exists(f"execjob:{job_id}:cancel"))
+        with self.lock:
+            return job_id in self.cancel_requested
+
+    def _prune_expired(self):
+        """Drop finished in-memory jobs older than job_ttl (Redis expires its own keys)"""
+        if self.redis_client:
+            return
+        cutoff = time.time() - self.job_ttl
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.get('finished_at') and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+                self.cancel_requested.discard(job_id)
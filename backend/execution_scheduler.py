@@ -0,0 +1,239 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock, Condition
+
+
+class ExecutionQueueTimeout(Exception):
+    """Raised when a cell waited longer than the queue timeout for a slot"""
+
+
+class _Waiter:
+    def __init__(self, user_id, on_grant=None):
+        self.user_id = user_id
+        self.on_grant = on_grant   # set for submit(): called instead of waking a blocked thread
+        self.enqueued_at = time.time()
+        self.granted = False
+        self.started = None
+
+
+class FairShareScheduler:
+    """
+    Admits cell executions on this worker under a global concurrency limit,
+    sharing slots fairly between users with deficit round robin.
+
+    - At most EXECUTION_MAX_CONCURRENT cells run at once (default: CPU count),
+      and at most EXECUTION_MAX_PER_USER per user (default 1, since a user's
+      kernel runs one cell at a time anyway)
+    - Waiting cells are queued per user, and users with waiting cells take
+      turns in a ring. Each turn adds EXECUTION_SCHEDULER_QUANTUM seconds of
+      credit to the user's deficit; a user may start a cell while their
+      deficit is positive
+    - A cell's run time is only known afterwards, so it is charged when the
+      slot is released. A user running minute-long cells goes into debt and
+      sits out several turns, while a user printing a line gets through on
+      the next free slot
+    - Unused credit is dropped when a user's queue empties; debt is kept
+      (capped at EXECUTION_SCHEDULER_MAX_DEBT seconds) and paid off one
+      quantum per turn
+    - Background work queues with submit() instead of blocking a thread in
+      acquire(): it is handed to its callback once granted, so queued jobs
+      never tie up the threads that run them
+    """
+
+    def __init__(self, max_concurrent=None, max_per_user=None, quantum=None):
+        self.max_concurrent = max_concurrent or int(os.environ.get('EXECUTION_MAX_CONCURRENT') or os.cpu_count() or 4)
+        self.max_per_user = max_per_user or int(os.environ.get('EXECUTION_MAX_PER_USER', '1'))
+        self.quantum = quantum or float(os.environ.get('EXECUTION_SCHEDULER_QUANTUM', '1.0'))
+        self.max_debt = float(os.environ.get('EXECUTION_SCHEDULER_MAX_DEBT', str(self.quantum * 30)))
+        self.queue_timeout = float(os.environ.get('EXECUTION_QUEUE_TIMEOUT', '120'))
+
+        self.lock = Lock()
+        self.changed = Condition(self.lock)
+        self.queues = {}          # user_id -> deque of _Waiter
+        self.ring = deque()       # users with waiting cells, in turn order
+        self.deficits = {}        # user_id -> seconds of credit (negative = debt)
+        self.running = 0
+        self.running_by_user = {}
+
+        # Metrics
+        self.dispatched = 0
+        self.timeouts = 0
+        self.recent_waits = deque(maxlen=1000)
+        self.max_wait = 0.0
+
+    # ── Public API ──
+
+    @contextmanager
+    def slot(self, user_id, timeout=None):
+        """Hold an execution slot for user_id for the duration of the block"""
+        started = self.acquire(user_id, timeout)
+        try:
+            yield
+        finally:
+            self.release(user_id, started)
+
+    def acquire(self, user_id, timeout=None):
+        """Wait for a slot; returns the start time to pass to release()"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        waiter = _Waiter(user_id)
+        self._enqueue(waiter)
+        with self.changed:
+            deadline = waiter.enqueued_at + timeout
+            while not waiter.granted:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._abandon(waiter)
+                    self.timeouts += 1
+                    raise ExecutionQueueTimeout(
+                        f"Server busy: waited {timeout:.0f}s for an execution slot")
+                self.changed.wait(remaining)
+            return waiter.started
+
+    def submit(self, user_id, on_grant):
+        """Queue for a slot without blocking; on_grant(started) is called once it is granted.
+
+        It may be called right away, on this thread. The callback must
+        eventually call release(user_id, started). Returns a handle for withdraw().
+        """
+        waiter = _Waiter(user_id, on_grant)
+        self._enqueue(waiter)
+        return waiter
+
+    def withdraw(self, waiter):
+        """Take a submitted waiter out of the queue; False if it was already granted"""
+        with self.changed:
+            if waiter.granted:
+                return False
+            self._abandon(waiter)
+            return True
+
+    def release(self, user_id, started):
+        """Free a slot and charge the user for the time they held it"""
+        with self.changed:
+            self.running -= 1
+            self.running_by_user[user_id] -= 1
+            if not self.running_by_user[user_id]:
+                del self.running_by_user[user_id]
+
+            deficit = self.deficits.get(user_id, 0) - (time.time() - started)
+            if deficit < 0 or user_id in self.ring:
+                self.deficits[user_id] = max(deficit, -self.max_debt)
+            else:
+                self.deficits.pop(user_id, None)
+
+            granted = self._dispatch()
+        _notify(granted)
+
+    def get_stats(self):
+        """Queue depth, slot usage and wait-time metrics"""
+        with self.lock:
+            waits = sorted(self.recent_waits)
+            queued = {user_id: len(queue) for user_id, queue in self.queues.items()}
+            now = time.time()
+            oldest = min((q[0].enqueued_at for q in self.queues.values()), default=None)
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_per_user': self.max_per_user,
+                'quantum': self.quantum,
+                'running': self.running,
+                'queued': sum(queued.values()),
+                'queued_by_user': queued,
+                'oldest_wait_seconds': round(now - oldest, 3) if oldest else 0,
+                'dispatched': self.dispatched,
+                'timeouts': self.timeouts,
+                'wait_seconds': {
+                    'samples': len(waits),
+                    'mean': round(sum(waits) / len(waits), 4) if waits else 0,
+                    'p50': round(_percentile(waits, 0.50), 4),
+                    'p95': round(_percentile(waits, 0.95), 4),
+                    'p99': round(_percentile(waits, 0.99), 4),
+                    'max': round(self.max_wait, 4),
+                },
+                'deficits': {user_id: round(d, 3) for user_id, d in self.deficits.items()},
+            }
+
+    def _enqueue(self, waiter):
+        with self.changed:
+            self.queues.setdefault(waiter.user_id, deque()).append(waiter)
+            if waiter.user_id not in self.ring:
+                self.ring.append(waiter.user_id)
+                self.deficits.setdefault(waiter.user_id, self.quantum)
+            granted = self._dispatch()
+        _notify(granted)
+
+    # ── Internals (called with self.lock held) ──
+
+    def _dispatch(self):
+        """Grant free slots to waiting users in deficit round robin order.
+
+        Returns the granted submit() waiters, whose callbacks the caller runs
+        once the lock is released.
+        """
+        granted_any = False
+        callbacks = []
+        blocked = 0  # consecutive users skipped because of the per-user cap
+        while self.running < self.max_concurrent and self.ring and blocked < len(self.ring):
+            user_id = self.ring[0]
+            if self.running_by_user.get(user_id, 0) >= self.max_per_user:
+                blocked += 1
+                self.ring.rotate(-1)
+                continue
+
+            if self.deficits.get(user_id, 0) <= 0:
+                # Not this user's turn yet: pay off a quantum of debt
+                self.deficits[user_id] = self.deficits.get(user_id, 0) + self.quantum
+                self.ring.rotate(-1)
+                continue
+
+            blocked = 0
+            queue = self.queues[user_id]
+            waiter = queue.popleft()
+            waiter.granted = True
+            waiter.started = time.time()
+            wait = waiter.started - waiter.enqueued_at
+            self.recent_waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+            if waiter.on_grant:
+                callbacks.append(waiter)
+            granted_any = True
+            self.running += 1
+            self.running_by_user[user_id] = self.running_by_user.get(user_id, 0) + 1
+            self.dispatched += 1
+
+            if queue:
+                self.ring.rotate(-1)
+            else:
+                self._leave_ring(user_id)
+
+        if granted_any:
+            self.changed.notify_all()
+        return callbacks
+
+    def _abandon(self, waiter):
+        """Remove a waiter that gave up"""
+        queue = self.queues.get(waiter.user_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                self._leave_ring(waiter.user_id)
+
+    def _leave_ring(self, user_id):
+        del self.queues[user_id]
+        self.ring.remove(user_id)
+        # Unused credit is not banked while running; debt is
+        if self.deficits.get(user_id, 0) > 0 and user_id not in self.running_by_user:
+            del self.deficits[user_id]
+
+
+def _notify(waiters):
+    for waiter in waiters:
+        waiter.on_grant(waiter.started)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
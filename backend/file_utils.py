@@ -0,0 +1,31 @@
+import os
+import hashlib
+import tempfile
+
+
+def write_atomic(path, save):
+    """
+    Write a file through save(fileobj) into a hidden temp file next to it,
+    then rename it into place, so readers never see a partial file. The
+    folder is created if missing; the temp file is removed if save fails.
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            save(f)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def sha256_file(path):
+    """Hex sha256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
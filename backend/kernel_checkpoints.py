@@ -0,0 +1,253 @@
+import os
+import ast
+import json
+import shutil
+import tempfile
+from threading import Lock
+
+# Top-level statements that only (re)define names; safe to replay even when
+# the namespace itself is restored from a snapshot
+_DEFINITION_NODES = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# Runs silently in the user's kernel. Pickles each picklable global on its
+# own (so one bad value does not lose the rest), remembers module aliases by
+# name, and writes the snapshot atomically with a JSON header next to it.
+# The pickle is only ever loaded inside the same user's kernel; the worker
+# reads the JSON header alone.
+_SNAPSHOT_CODE = """
+def _lms_snapshot(path, cells, max_bytes):
+    import os, json, pickle, types
+    hidden = set(get_ipython().user_ns_hidden)
+    variables, modules, total = {}, {}, 0
+    for name, value in list(globals().items()):
+        if name.startswith('_') or name in hidden or name in ('In', 'Out', 'exit', 'quit', 'get_ipython'):
+            continue
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+            continue
+        if getattr(value, '__module__', None) == '__main__' and isinstance(value, (type, types.FunctionType)):
+            continue  # re-created by replaying its definition cell
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            continue
+        if total + len(data) > max_bytes:
+            continue
+        variables[name] = data
+        total += len(data)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump({'modules': modules, 'variables': variables}, f)
+    os.replace(path + '.tmp', path)
+    with open(path + '.json.tmp', 'w') as f:
+        json.dump({'cells': cells, 'variables': len(variables), 'bytes': total}, f)
+    os.replace(path + '.json.tmp', path + '.json')
+_lms_snapshot(%r, %d, %d)
+del _lms_snapshot
+"""
+
+_LOAD_CODE = """
+def _lms_load_snapshot(path):
+    import importlib, pickle
+    with open(path, 'rb') as f:
+        snapshot = pickle.load(f)
+    for name, module in snapshot['modules'].items():
+        try:
+            globals()[name] = importlib.import_module(module)
+        except Exception:
+            pass
+    for name, data in snapshot['variables'].items():
+        try:
+            globals()[name] = pickle.loads(data)
+        except Exception:
+            pass
+_lms_load_snapshot(%r)
+del _lms_load_snapshot
+"""
+
+
+def is_definition_cell(code):
+    """True if a cell only imports modules and defines functions or classes"""
+    try:
+        body = ast.parse(code).body
+    except SyntaxError:
+        return False
+    return bool(body) and all(isinstance(node, _DEFINITION_NODES) for node in body)
+
+
+class CheckpointStore:
+    """
+    Opt-in checkpoints of learners' kernel sessions, so a deploy or worker
+    recycle does not force everyone to re-run their notebooks by hand.
+
+    KERNEL_CHECKPOINTS selects what is kept:
+    - off (default): nothing
+    - history: the code of every cell that ran without error, in order
+      (a Redis list when Redis is available, otherwise a JSON-lines file)
+    - namespace: history plus, every KERNEL_CHECKPOINT_NAMESPACE_INTERVAL
+      seconds, a pickle of the kernel's picklable globals written by the
+      kernel itself under KERNEL_CHECKPOINT_DIR
+
+    Restoring replays the history into a fresh kernel. With a namespace
+    snapshot only definition cells (imports, def, class) and the cells run
+    after the snapshot are replayed; the rest comes from the pickle.
+
+    A history that reaches KERNEL_CHECKPOINT_MAX_CELLS is marked truncated
+    and no longer grows: replaying a prefix of the session would restore a
+    stale state, so a truncated checkpoint is never restored.
+    """
+
+    def __init__(self, redis_client=None, root=None):
+        self.mode = os.environ.get('KERNEL_CHECKPOINTS', 'off').lower()
+        self.redis_client = redis_client
+        self.root = root or os.environ.get('KERNEL_CHECKPOINT_DIR') or os.path.join(tempfile.gettempdir(), 'lms-checkpoints')
+        self.max_cells = int(os.environ.get('KERNEL_CHECKPOINT_MAX_CELLS', '200'))
+        self.ttl = int(os.environ.get('KERNEL_CHECKPOINT_TTL', str(7 * 24 * 3600)))
+        self.namespace_interval = float(os.environ.get('KERNEL_CHECKPOINT_NAMESPACE_INTERVAL', '300'))
+        self.namespace_max_bytes = int(os.environ.get('KERNEL_CHECKPOINT_NAMESPACE_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.lock = Lock()
+        self.restores = 0
+        self.restores_skipped = 0   # truncated checkpoints that were discarded
+        self.cells_replayed = 0
+        self.cells_failed = 0
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.mode in ('history', 'namespace')
+
+    @property
+    def snapshots_enabled(self):
+        return self.mode == 'namespace'
+
+    def _history_key(self, user_id):
+        return f"kernel:checkpoint:{user_id}:cells"
+
+    def _truncated_key(self, user_id):
+        return f"kernel:checkpoint:{user_id}:truncated"
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.root, str(user_id))
+
+    def namespace_path(self, user_id):
+        return os.path.join(self._user_dir(user_id), 'namespace.pkl')
+
+    def record(self, user_id, code):
+        """Append a successfully executed cell to a user's history.
+
+        Returns the new length; 0 when the history has just reached
+        max_cells and the checkpoint was marked truncated; None when nothing
+        was recorded (already truncated, or a storage error).
+        """
+        entry = json.dumps({'code': code, 'definitions': is_definition_cell(code)})
+        if self.redis_client:
+            try:
+                key = self._history_key(user_id)
+                if self.redis_client.llen(key) >= self.max_cells:
+                    return 0 if self.redis_client.set(self._truncated_key(user_id), 1, nx=True, ex=self.ttl) else None
+                pipe = self.redis_client.pipeline()
+                pipe.rpush(key, entry)
+                pipe.expire(key, self.ttl)
+                return pipe.execute()[0]
+            except Exception as e:
+                print(f"⚠ Redis error writing kernel checkpoint: {e}")
+                return None
+
+        path = os.path.join(self._user_dir(user_id), 'history.jsonl')
+        with self.lock:
+            os.makedirs(self._user_dir(user_id), exist_ok=True)
+            count = 0
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    count = sum(1 for _ in f)
+            if count >= self.max_cells:
+                marker = os.path.join(self._user_dir(user_id), 'truncated')
+                if os.path.exists(marker):
+                    return None
+                open(marker, 'w').close()
+                return 0
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(entry + '\n')
+            return count + 1
+
+    def load(self, user_id):
+        """Return a user's checkpoint as {'cells': [...], 'namespace': path or None, 'truncated': bool}, or None"""
+        cells = []
+        truncated = False
+        if self.redis_client:
+            try:
+                cells = [json.loads(c) for c in self.redis_client.lrange(self._history_key(user_id), 0, -1)]
+                truncated = bool(self.redis_client.exists(self._truncated_key(user_id)))
+            except Exception as e:
+                print(f"⚠ Redis error reading kernel checkpoint: {e}")
+        else:
+            path = os.path.join(self._user_dir(user_id), 'history.jsonl')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    cells = [json.loads(line) for line in f if line.strip()]
+            truncated = os.path.exists(os.path.join(self._user_dir(user_id), 'truncated'))
+
+        namespace = self.namespace_path(user_id)
+        namespace = namespace if self.snapshots_enabled and os.path.exists(namespace + '.json') else None
+        if not cells and not namespace:
+            return None
+        return {'cells': cells, 'namespace': namespace, 'truncated': truncated}
+
+    def clear(self, user_id):
+        """Forget a user's checkpoint (after an explicit restart)"""
+        if self.redis_client:
+            try:
+                self.redis_client.delete(self._history_key(user_id), self._truncated_key(user_id))
+            except Exception as e:
+                print(f"⚠ Redis error clearing kernel checkpoint: {e}")
+        shutil.rmtree(self._user_dir(user_id), ignore_errors=True)
+
+    def record_restore(self, cells, failed):
+        with self.lock:
+            self.restores += 1
+            self.cells_replayed += cells - failed
+            self.cells_failed += failed
+
+    def record_skipped_restore(self):
+        with self.lock:
+            self.restores_skipped += 1
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'mode': self.mode,
+                'backend': 'redis' if self.redis_client else 'disk',
+                'restores': self.restores,
+                'restores_skipped': self.restores_skipped,
+                'cells_replayed': self.cells_replayed,
+                'cells_failed': self.cells_failed,
+            }
+
+    def snapshot_code(self, user_id, cells):
+        """Kernel code that pickles the namespace, tagged with the history length it covers"""
+        return _SNAPSHOT_CODE % (self.namespace_path(user_id), cells, self.namespace_max_bytes)
+
+    @staticmethod
+    def restore_plan(checkpoint):
+        """The cells to run to rebuild a session, in order.
+
+        Returns a list of code strings; a namespace load is included as one of
+        them when a snapshot exists.
+        """
+        cells = checkpoint['cells']
+        namespace = checkpoint['namespace']
+        if not namespace:
+            return [cell['code'] for cell in cells]
+
+        try:
+            with open(namespace + '.json', 'r') as f:
+                covered = int(json.load(f)['cells'])
+        except Exception as e:
+            print(f"⚠ Unreadable namespace snapshot {namespace}: {e}")
+            return [cell['code'] for cell in cells]
+
+        plan = [cell['code'] for cell in cells[:covered] if cell['definitions']]
+        plan.append(_LOAD_CODE % namespace)
+        plan.extend(cell['code'] for cell in cells[covered:])
+        return plan
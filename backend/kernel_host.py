@@ -0,0 +1,322 @@
+"""
+Standalone kernel host daemon.
+
+Owns every learner's Jupyter kernel in one long-lived process so that
+Gunicorn worker restarts do not kill notebook sessions and kernel I/O does
+not compete with request handling for the worker's GIL. Workers talk to it
+over a unix socket (see KERNEL_BACKEND=daemon in RedisKernelManager).
+
+Protocol: each frame is a 4-byte big-endian length followed by a compact
+JSON object. A client opens one connection per request and sends a single
+frame such as {"op": "execute", "user_id": 7, "code": "..."}. The host
+answers with zero or more {"kind": "output", "output": {...}} frames and a
+final {"kind": "done", "success": true, "result": ...} frame. While an op
+produces nothing (booting or restoring a kernel, a silent cell) the host
+sends {"kind": "keepalive"} every KERNEL_KEEPALIVE_INTERVAL seconds, so the
+client's KERNEL_HOST_TIMEOUT only measures how long the host may be silent.
+
+Ops: execute, restart, interrupt, cleanup, stats, ping.
+
+Usage:
+    python kernel_host.py [--socket /tmp/lms-kernel-host.sock]
+"""
+import os
+import sys
+import json
+import time
+import fcntl
+import socket
+import signal
+import struct
+import argparse
+import subprocess
+import socketserver
+from queue import Queue, Empty
+from threading import Thread
+
+from output_store import split_status
+
+DEFAULT_SOCKET_PATH = '/tmp/lms-kernel-host.sock'
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+KEEPALIVE_INTERVAL = float(os.environ.get('KERNEL_KEEPALIVE_INTERVAL', '15'))
+
+
+def with_keepalives(produce, interval=KEEPALIVE_INTERVAL):
+    """Yield the items of the generator function produce(), run in its own thread,
+    and None whenever it has been silent for `interval` seconds.
+
+    Lets the side serving a kernel operation send keepalives while the
+    operation itself blocks. Exceptions raised by produce() are re-raised here.
+    """
+    items = Queue()
+
+    def run():
+        try:
+            for item in produce():
+                items.put(('item', item))
+            items.put(('done', None))
+        except BaseException as e:
+            items.put(('error', e))
+
+    Thread(target=run, name='kernel-op', daemon=True).start()
+    while True:
+        try:
+            kind, value = items.get(timeout=interval)
+        except Empty:
+            yield None
+            continue
+        if kind == 'done':
+            return
+        if kind == 'error':
+            raise value
+        yield value
+
+
+def send_frame(sock, message):
+    """Write one length-prefixed JSON frame"""
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(struct.pack('>I', len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    """Read one length-prefixed JSON frame, or None if the peer closed the connection"""
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    (size,) = struct.unpack('>I', header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"frame of {size} bytes exceeds limit")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        return None
+    return json.loads(payload)
+
+
+# ── Client side (used by the Flask workers) ──
+
+class KernelHostClient:
+    """Talks to the kernel host daemon, starting it on first use if needed"""
+
+    def __init__(self, socket_path=None, autostart=None, timeout=None):
+        self.socket_path = socket_path or os.environ.get('KERNEL_HOST_SOCKET', DEFAULT_SOCKET_PATH)
+        if autostart is None:
+            autostart = os.environ.get('KERNEL_HOST_AUTOSTART', 'true').lower() == 'true'
+        self.autostart = autostart
+        # Longest silence from the host; it sends keepalives during long operations
+        self.timeout = timeout or float(os.environ.get('KERNEL_HOST_TIMEOUT', '60'))
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if not self.autostart:
+                raise
+            self._start_daemon()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        return sock
+
+    def _start_daemon(self):
+        """Spawn the daemon in its own session so it outlives this worker"""
+        print(f"Starting kernel host daemon on {self.socket_path}")
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--socket', self.socket_path],
+            start_new_session=True,
+            stdin=subprocess.DEVNULL,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(self.socket_path)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                time.sleep(0.1)
+        raise TimeoutError(f"kernel host did not start on {self.socket_path}")
+
+    def request(self, op, **fields):
+        """Send one request and yield every reply frame up to and including `done`"""
+        with self._connect() as sock:
+            send_frame(sock, {'op': op, **fields})
+            while True:
+                message = recv_frame(sock)
+                if message is None:
+                    raise ConnectionError('kernel host closed the connection')
+                if message['kind'] == 'keepalive':
+                    continue
+                yield message
+                if message['kind'] == 'done':
+                    return
+
+    def call(self, op, **fields):
+        """Send one request and return the `result` of its final frame"""
+        for message in self.request(op, **fields):
+            if message['kind'] == 'done':
+                if not message['success']:
+                    raise RuntimeError(message['error'])
+                return message.get('result')
+
+
+class HostedKernel:
+    """
+    Proxy for a user's kernel living in the kernel host daemon.
+
+    Offers the NotebookExecutor methods the routes use.
+    """
+
+    def __init__(self, client, user_id):
+        self.client = client
+        self.user_id = user_id
+        self.last_used = time.time()
+
+    def execute_cell(self, code):
+        """Execute a single code cell in the daemon and return the output"""
+        try:
+            outputs, notices = split_status(self.execute_cell_stream(code))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'type': 'error'
+            }
+        result = {'success': True, 'outputs': outputs}
+        if notices:
+            result['notices'] = notices
+        return result
+
+    def execute_cell_stream(self, code):
+        """Execute a single code cell in the daemon, yielding outputs as they arrive"""
+        for message in self.client.request('execute', user_id=self.user_id, code=code):
+            if message['kind'] == 'output':
+                yield message['output']
+            elif message['kind'] == 'done' and not message['success']:
+                raise RuntimeError(message['error'])
+
+    def restart_kernel(self):
+        self.client.call('restart', user_id=self.user_id)
+
+    def interrupt(self):
+        self.client.call('interrupt', user_id=self.user_id)
+
+    def is_alive(self):
+        return True
+
+    def is_busy(self):
+        return False
+
+    def shutdown(self):
+        """The daemon is responsible for the kernel process"""
+        pass
+
+
+# ── Server side ──
+
+class KernelHostServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, kernel_manager):
+        self.kernel_manager = kernel_manager
+        super().__init__(socket_path, KernelHostHandler)
+
+
+class KernelHostHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        sock = self.request
+        manager = self.server.kernel_manager
+        try:
+            request = recv_frame(sock)
+            if request is None:
+                return
+            for frame in with_keepalives(lambda: self._run_op(manager, request)):
+                send_frame(sock, frame or {'kind': 'keepalive'})
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away mid-stream
+            pass
+        except Exception as e:
+            try:
+                send_frame(sock, {'kind': 'done', 'success': False, 'error': str(e)})
+            except OSError:
+                pass
+
+    def _run_op(self, manager, request):
+        """Yield the reply frames of one request"""
+        op = request.get('op')
+        user_id = request.get('user_id')
+        result = None
+
+        if op == 'execute':
+            kernel = manager.get_kernel(user_id, allow_remote=False)
+            for output in kernel.execute_cell_stream(request['code']):
+                yield {'kind': 'output', 'output': output}
+        elif op == 'restart':
+            manager.restart_kernel(user_id, allow_remote=False)
+        elif op == 'interrupt':
+            kernel = manager._get_local_kernel(user_id)
+            if kernel:
+                kernel.interrupt()
+        elif op == 'cleanup':
+            manager.cleanup_user_kernel(user_id)
+        elif op == 'stats':
+            result = manager.get_stats()
+        elif op != 'ping':
+            raise ValueError(f"unknown op {op!r}")
+
+        yield {'kind': 'done', 'success': True, 'result': result}
+
+
+def serve(socket_path):
+    # Only one daemon per socket, even if several workers try to autostart it
+    lock_file = open(socket_path + '.lock', 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print(f"Kernel host already running for {socket_path}")
+        return
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    from redis_kernel_manager import RedisKernelManager
+    kernel_manager = RedisKernelManager(backend='inprocess', use_redis=False)
+
+    old_umask = os.umask(0o077)  # socket is only reachable by this user
+    try:
+        server = KernelHostServer(socket_path, kernel_manager)
+    finally:
+        os.umask(old_umask)
+
+    def stop(signum, frame):
+        print("Kernel host shutting down")
+        kernel_manager.shutdown_all()
+        os.remove(socket_path)
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Kernel host listening on {socket_path} (pid {os.getpid()})")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Jupyter kernel host daemon')
+    parser.add_argument('--socket', default=os.environ.get('KERNEL_HOST_SOCKET', DEFAULT_SOCKET_PATH))
+    args = parser.parse_args()
+    serve(args.socket)
@@ -0,0 +1,183 @@
+import os
+import time
+import uuid
+import signal
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+class KernelLimits:
+    """
+    Resource limits applied to every kernel process a NotebookExecutor starts.
+
+    - rlimits are set on the kernel process right after it starts, so they
+      bind the kernel and anything it spawns but never the Gunicorn worker:
+        KERNEL_MEMORY_LIMIT_MB   address space (RLIMIT_AS), default 2048
+        KERNEL_CPU_SECONDS       CPU time over the kernel's life (RLIMIT_CPU), 0 = off
+        KERNEL_MAX_OPEN_FILES    open file descriptors (RLIMIT_NOFILE), default 1024
+        KERNEL_MAX_PROCESSES     processes for the kernel's uid (RLIMIT_NPROC), 0 = off
+    - If KERNEL_CGROUP_ROOT points at a writable cgroup v2 directory, each
+      kernel also gets its own child cgroup with memory.max, cpu.max
+      (KERNEL_CPU_QUOTA_PERCENT) and pids.max (KERNEL_MAX_PIDS). This is the
+      stronger fork bomb guard, since RLIMIT_NPROC counts every process of the
+      user, workers included.
+    """
+
+    def __init__(self):
+        self.memory_mb = int(os.environ.get('KERNEL_MEMORY_LIMIT_MB', '2048'))
+        self.cpu_seconds = int(os.environ.get('KERNEL_CPU_SECONDS', '0'))
+        self.open_files = int(os.environ.get('KERNEL_MAX_OPEN_FILES', '1024'))
+        self.processes = int(os.environ.get('KERNEL_MAX_PROCESSES', '0'))
+
+        self.cgroup_root = os.environ.get('KERNEL_CGROUP_ROOT')
+        self.cpu_quota_percent = int(os.environ.get('KERNEL_CPU_QUOTA_PERCENT', '100'))
+        self.max_pids = int(os.environ.get('KERNEL_MAX_PIDS', '256'))
+        if self.cgroup_root and not self._cgroup_usable():
+            print(f"⚠ KERNEL_CGROUP_ROOT {self.cgroup_root} is not a writable cgroup v2 directory, "
+                  f"using rlimits only")
+            self.cgroup_root = None
+
+    def _cgroup_usable(self):
+        return (os.path.exists(os.path.join(self.cgroup_root, 'cgroup.controllers'))
+                and os.access(self.cgroup_root, os.W_OK))
+
+    def _rlimits(self):
+        if resource is None:
+            return []
+        limits = []
+        if self.memory_mb > 0:
+            limits.append((resource.RLIMIT_AS, self.memory_mb * 1024 * 1024))
+        if self.cpu_seconds > 0:
+            limits.append((resource.RLIMIT_CPU, self.cpu_seconds))
+        if self.open_files > 0:
+            limits.append((resource.RLIMIT_NOFILE, self.open_files))
+        if self.processes > 0:
+            limits.append((resource.RLIMIT_NPROC, self.processes))
+        return limits
+
+    def create_cgroup(self):
+        """Create a cgroup for one kernel and return its path, or None"""
+        if not self.cgroup_root:
+            return None
+        path = os.path.join(self.cgroup_root, f"kernel-{uuid.uuid4().hex[:12]}")
+        try:
+            os.mkdir(path)
+            settings = {'pids.max': str(self.max_pids) if self.max_pids > 0 else 'max'}
+            if self.memory_mb > 0:
+                settings['memory.max'] = str(self.memory_mb * 1024 * 1024)
+                settings['memory.swap.max'] = '0'
+            if self.cpu_quota_percent > 0:
+                settings['cpu.max'] = f"{self.cpu_quota_percent * 1000} 100000"
+            for name, value in settings.items():
+                try:
+                    with open(os.path.join(path, name), 'w') as f:
+                        f.write(value)
+                except OSError as e:
+                    # Controller not enabled in the parent's cgroup.subtree_control
+                    print(f"⚠ Could not set {name} on {path}: {e}")
+        except OSError as e:
+            print(f"⚠ Could not create kernel cgroup under {self.cgroup_root}: {e}")
+            return None
+        return path
+
+    def apply(self, pid, cgroup=None):
+        """Apply the limits to a freshly started kernel process.
+
+        Done from the parent with prlimit rather than a preexec_fn, which is
+        not safe to run in a multi-threaded worker. The kernel is still
+        booting at this point, so anything it spawns inherits the limits.
+        """
+        if cgroup:
+            try:
+                with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as f:
+                    f.write(str(pid))
+            except OSError as e:
+                print(f"⚠ Could not move kernel {pid} into {cgroup}: {e}")
+
+        if resource is None or not hasattr(resource, 'prlimit'):
+            return
+        for limit, value in self._rlimits():
+            try:
+                _, hard = resource.prlimit(pid, limit)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                # RLIMIT_CPU: SIGXCPU at the soft limit, the hard limit is left alone
+                resource.prlimit(pid, limit, (value, hard if limit == resource.RLIMIT_CPU else value))
+            except (ValueError, OSError) as e:
+                print(f"⚠ Could not set rlimit {limit} on kernel {pid}: {e}")
+
+    @staticmethod
+    def remove_cgroup(path):
+        """Kill anything left in a kernel's cgroup and remove it"""
+        if not path:
+            return
+        kill_file = os.path.join(path, 'cgroup.kill')
+        try:
+            if os.path.exists(kill_file):
+                with open(kill_file, 'w') as f:
+                    f.write('1')
+            else:
+                with open(os.path.join(path, 'cgroup.procs')) as f:
+                    for pid in f.read().split():
+                        os.kill(int(pid), signal.SIGKILL)
+        except (OSError, ValueError):
+            pass
+        for _ in range(20):
+            try:
+                os.rmdir(path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.05)
+        print(f"⚠ Could not remove kernel cgroup {path}")
+
+    def describe(self):
+        """The active limits, for the stats endpoint"""
+        return {
+            'memory_mb': self.memory_mb,
+            'cpu_seconds': self.cpu_seconds,
+            'open_files': self.open_files,
+            'processes': self.processes,
+            'cgroup_root': self.cgroup_root,
+            'cpu_quota_percent': self.cpu_quota_percent if self.cgroup_root else None,
+            'max_pids': self.max_pids if self.cgroup_root else None,
+        }
+
+
+def sample_process(pid):
+    """Read a process's resident memory and CPU time from /proc.
+
+    Returns {'rss_bytes', 'peak_rss_bytes', 'cpu_seconds'} or None if the
+    process is gone or /proc is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/status") as f:
+            status = f.read()
+    except OSError:
+        return None
+
+    # Fields after the parenthesised command name; utime and stime are 14 and 15
+    fields = stat[stat.rfind(')') + 2:].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+    memory = {}
+    for line in status.splitlines():
+        if line.startswith(('VmRSS:', 'VmHWM:')):
+            name, value = line.split(':', 1)
+            memory[name] = int(value.split()[0]) * 1024
+    return {
+        'rss_bytes': memory.get('VmRSS', 0),
+        'peak_rss_bytes': memory.get('VmHWM', 0),
+        'cpu_seconds': round(cpu_seconds, 2),
+    }
+
+
+KERNEL_LIMITS = KernelLimits()
@@ -0,0 +1,115 @@
+import os
+import json
+from threading import Lock
+
+# Modules the course notebooks import in their first cells
+COURSE_MODULES = [
+    'numpy',
+    'pandas',
+    'matplotlib.pyplot',
+    'pydantic',
+    'dotenv',
+    'openai',
+    'langchain_core.prompts',
+    'langchain_core.messages',
+    'langchain_core.tools',
+    'langchain_core.output_parsers',
+    'langchain_openai',
+    'langgraph.graph',
+    'langgraph.prebuilt',
+]
+
+# Runs silently in the kernel: imports each module into sys.modules without
+# touching the learner's namespace, and prints per-module timings as JSON
+_PRELOAD_CODE = """
+def _lms_preload(modules):
+    import importlib, json, time
+    timings, failed = {}, {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            timings[name] = round(time.perf_counter() - started, 4)
+        except Exception as e:
+            failed[name] = f"{type(e).__name__}: {e}"
+    print(json.dumps({'timings': timings, 'failed': failed}))
+_lms_preload(%s)
+del _lms_preload
+"""
+
+
+class BootstrapProfile:
+    """
+    A named list of modules to import into every kernel as it starts.
+
+    Kernels in the pool are bootstrapped before they are assigned, so a
+    learner's first `import langchain_openai` finds the module already
+    loaded. Each profile keeps startup timings across the kernels it booted.
+    """
+
+    def __init__(self, name, modules):
+        self.name = name
+        self.modules = list(modules)
+        self.lock = Lock()
+        self.boots = 0
+        self.total_boot_seconds = 0.0
+        self.total_preload_seconds = 0.0
+        self.module_seconds = {}   # module -> last import time
+        self.failed = {}           # module -> last error
+
+    def preload_code(self):
+        """Code to run in a fresh kernel, or None if there is nothing to preload"""
+        return _PRELOAD_CODE % json.dumps(self.modules) if self.modules else None
+
+    def record(self, boot_seconds, preload_seconds, result):
+        """Record one kernel's startup (result is the parsed preload output, or None)"""
+        with self.lock:
+            self.boots += 1
+            self.total_boot_seconds += boot_seconds
+            self.total_preload_seconds += preload_seconds
+            if result:
+                self.module_seconds.update(result.get('timings', {}))
+                self.failed = result.get('failed', {})
+
+    def get_stats(self):
+        with self.lock:
+            boots = self.boots or 1
+            return {
+                'modules': self.modules,
+                'boots': self.boots,
+                'avg_boot_seconds': round(self.total_boot_seconds / boots, 3),
+                'avg_preload_seconds': round(self.total_preload_seconds / boots, 3),
+                'module_seconds': dict(self.module_seconds),
+                'failed': dict(self.failed),
+            }
+
+
+PROFILES = {
+    'none': BootstrapProfile('none', []),
+    'course': BootstrapProfile('course', COURSE_MODULES),
+}
+
+
+def get_profile(name=None):
+    """Return the bootstrap profile to use for new kernels.
+
+    KERNEL_BOOTSTRAP_PROFILE picks a built-in profile (default: course);
+    KERNEL_PRELOAD_MODULES, a comma-separated list, defines a custom one.
+    """
+    custom = os.environ.get('KERNEL_PRELOAD_MODULES')
+    if name is None and custom:
+        if 'custom' not in PROFILES:
+            modules = [m.strip() for m in custom.split(',') if m.strip()]
+            PROFILES['custom'] = BootstrapProfile('custom', modules)
+        return PROFILES['custom']
+
+    name = name or os.environ.get('KERNEL_BOOTSTRAP_PROFILE', 'course')
+    if name not in PROFILES:
+        print(f"⚠ Unknown kernel bootstrap profile {name!r}, using 'none'")
+        name = 'none'
+    return PROFILES[name]
+
+
+def profile_stats():
+    """Startup timings for every profile that has booted a kernel"""
+    return {name: profile.get_stats() for name, profile in PROFILES.items() if profile.boots}
@@ -0,0 +1,61 @@
+"""
+One-off migration: move the notebooks and PDFs under public/ into the
+content-addressed blob store (public/.blobs), replacing each with a relative
+symlink. Identical copies in different day folders or course buckets end up
+sharing one blob. Files that are already links are left alone, so it is
+safe to run multiple times; run it with the app stopped.
+
+Usage:
+  source venv/bin/activate && python migrate_content_blobs.py [--dry-run]
+  # or on Railway: railway run python migrate_content_blobs.py
+  # PUBLIC_FOLDER selects the tree, as for the app
+"""
+import os
+import sys
+from collections import defaultdict
+
+from blob_store import BlobStore, BLOB_EXTENSIONS
+from file_utils import sha256_file
+
+
+def _public_folder():
+    # Same lookup as routes._get_public_folder, without importing the app
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    public_folder = os.environ.get('PUBLIC_FOLDER', os.path.join(base_dir, 'public'))
+    if not os.path.exists(public_folder):
+        public_folder = os.path.join(os.path.dirname(base_dir), 'public')
+    return public_folder
+
+
+dry_run = '--dry-run' in sys.argv
+public_folder = _public_folder()
+store = BlobStore(lambda: public_folder)
+
+# 1. Hash every plain notebook and PDF (hidden folders such as .blobs and .uploads are skipped)
+by_digest = defaultdict(list)
+for folder, dirs, files in os.walk(public_folder):
+    dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+    for name in sorted(files):
+        path = os.path.join(folder, name)
+        if name.startswith('.') or not name.lower().endswith(BLOB_EXTENSIONS) or os.path.islink(path):
+            continue
+        by_digest[sha256_file(path)].append(path)
+
+files = sum(len(paths) for paths in by_digest.values())
+duplicate_bytes = sum(os.path.getsize(paths[0]) * (len(paths) - 1) for paths in by_digest.values())
+print(f"{files} file(s) in {public_folder}, {len(by_digest)} distinct, "
+      f"{duplicate_bytes / (1024 * 1024):.1f} MB in duplicates")
+for digest, paths in by_digest.items():
+    if len(paths) > 1:
+        print(f"  {digest[:12]}: " + ', '.join(os.path.relpath(p, public_folder) for p in paths))
+
+if dry_run:
+    print("Dry run, nothing changed")
+    sys.exit(0)
+
+# 2. The first copy of each becomes the blob (keeping its mtime), every copy becomes a link to it
+for digest, paths in by_digest.items():
+    for path in paths:
+        store.add(path, path, digest)
+
+print(f"✓ Stored {store.stored} blob(s), linked {files} file(s), freed {store.bytes_saved / (1024 * 1024):.1f} MB")
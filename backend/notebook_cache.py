@@ -0,0 +1,145 @@
+import os
+import gzip
+import json
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional: notebooks are then served as gzip or identity
+    brotli = None
+
+# Below this size compression is not worth a Content-Encoding header
+MIN_COMPRESS_BYTES = 1024
+
+
+def serialize_json(obj):
+    """JSON bytes exactly as Flask's jsonify would produce them"""
+    return (json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class SerializedFileCache:
+    """
+    Pre-serialized, pre-compressed JSON responses for files that only change
+    on upload (day notebooks), so a class opening the same notebook costs a
+    single parse.
+
+    - Entries are keyed by path + mtime + size; a re-uploaded file simply
+      misses and the stale entry ages out
+    - Each entry holds the identity, gzip and (if the brotli package is
+      installed) brotli encodings, each with its own strong ETag
+    - Bounded LRU by total bytes (NOTEBOOK_CACHE_MAX_BYTES)
+    - Concurrent misses for the same file wait for one build
+    - summarize(parsed), if given, is stored as the entry's 'summary', so
+      callers needing facts about the file never parse it again
+    """
+
+    def __init__(self, max_bytes=None, summarize=None):
+        self.max_bytes = max_bytes or int(os.environ.get('NOTEBOOK_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.summarize = summarize
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = Lock()
+        self._build_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, etag=None):
+        """Return the cache entry for a file, building it if needed.
+
+        etag is the file's content hash when the caller knows it; otherwise
+        the ETags are derived from the serialized body. Raises OSError or
+        ValueError if the file cannot be read or is not valid JSON.
+        """
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            build_lock = self._build_locks.setdefault(key, Lock())
+
+        with build_lock:
+            try:
+                with self.lock:
+                    entry = self.entries.get(key)
+                    if entry is not None:
+                        self.hits += 1
+                        return entry
+
+                entry = self._build(path, stat, etag)
+
+                with self.lock:
+                    self.misses += 1
+                    self.entries[key] = entry
+                    self.total_bytes += entry['bytes']
+                    while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                        _, evicted = self.entries.popitem(last=False)
+                        self.total_bytes -= evicted['bytes']
+                return entry
+            finally:
+                # Also when the file cannot be read or parsed, so failed keys do not pile up
+                with self.lock:
+                    self._build_locks.pop(key, None)
+
+    def _build(self, path, stat, etag=None):
+        with open(path, 'r', encoding='utf-8') as f:
+            parsed = json.load(f)
+        body = serialize_json(parsed)
+        digest = etag or hashlib.sha256(body).hexdigest()[:32]
+
+        encodings = {'identity': body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            encodings['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                encodings['br'] = brotli.compress(body, quality=11, mode=brotli.MODE_TEXT)
+
+        return {
+            'encodings': encodings,
+            'etags': {name: digest if name == 'identity' else f"{digest}-{name}" for name in encodings},
+            'last_modified': stat.st_mtime,
+            'summary': self.summarize(parsed) if self.summarize else None,
+            'bytes': sum(len(data) for data in encodings.values()),
+        }
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'brotli': brotli is not None,
+            }
+
+
+def negotiate_encoding(entry, accept_encodings):
+    """Pick the best encoding the client accepts (werkzeug Accept object)"""
+    for name in ('br', 'gzip'):
+        if name in entry['encodings'] and accept_encodings[name]:
+            return name
+    return 'identity'
+
+
+def cached_json_response(entry):
+    """Serve a SerializedFileCache entry: best accepted encoding, strong ETag, 304 on If-None-Match"""
+    encoding = negotiate_encoding(entry, request.accept_encodings)
+    if any(request.if_none_match.contains_weak(etag) for etag in entry['etags'].values()):
+        response = Response(status=304)
+    else:
+        response = Response(entry['encodings'][encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(entry['etags'][encoding])
+    response.last_modified = entry['last_modified']
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Access is per user, so only the browser may keep it, and must revalidate
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
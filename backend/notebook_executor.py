@@ -1,23 +1,109 @@
+import os
+import json
 import nbformat
+import zmq
 from jupyter_client import KernelManager
 import queue
 import time
-from threading import Lock
+from collections import deque
+from threading import Lock, Event, Thread
+from output_store import OutputBudget, status_output, split_status
+from kernel_limits import KERNEL_LIMITS, sample_process
+from kernel_profiles import get_profile
+from kernel_checkpoints import CheckpointStore
+
+
+class _Execution:
+    """Messages routed to one execute_request, keyed by its msg_id"""
+
+    def __init__(self, msg_id):
+        self.msg_id = msg_id
+        self.messages = queue.SimpleQueue()
 
 
 class NotebookExecutor:
-    def __init__(self, timeout=60):
+    """
+    A persistent Jupyter kernel for one user.
+
+    Message collection is event driven: a single I/O thread per kernel polls
+    the shell and iopub sockets and hands every message to the execution it
+    belongs to (by parent msg_id). An execution is complete once it has both
+    its shell execute_reply and its iopub idle status. Messages for executions
+    nobody is waiting on any more (e.g. a run that already timed out) are
+    dropped instead of leaking into later calls, and several executions can
+    be in flight on one kernel at once.
+
+    Each execution's output goes through an OutputBudget, so a cell printing
+    hundreds of megabytes cannot exhaust the worker's memory. The kernel
+    process itself runs under KernelLimits (rlimits and optionally its own
+    cgroup), and sample_usage() reports its memory and CPU.
+
+    Every new or restarted kernel first runs its bootstrap profile, silently
+    pre-importing the course libraries so the learner's first cell is warm.
+
+    With checkpoints enabled, each cell that runs without error is recorded
+    in the CheckpointStore. A kernel assigned with restore_pending set
+    rebuilds the previous session in a background thread when its first cell
+    arrives; that cell waits for the restore to finish. Notices about the
+    session (restoring, a checkpoint too long to restore) are yielded as
+    status outputs, separate from the cell's own output.
+    """
+
+    def __init__(self, timeout=60, limits=None, profile=None):
         self.timeout = timeout
+        self.limits = limits or KERNEL_LIMITS
+        self.profile = profile or get_profile()
+        self.startup = None
         self.kernel_manager = None
         self.kernel_client = None
         self.lock = Lock()
+        self.last_used = time.time()
+        # When the kernel manager last handed the kernel out, until its cell
+        # starts; set once the manager has shut the kernel down for good
+        self.handed_out = None
+        self.closed = False
+
+        # Set by the kernel manager when the kernel is assigned to a user;
+        # large outputs are spilled to output_store under the owner's id
+        self.owner = None
+        self.output_store = None
+
+        # Session checkpoints, set by the kernel manager when enabled
+        self.checkpoints = None
+        self.restore_slots = None
+        self.restore_pending = False
+        self._restored = Event()
+        self._restored.set()
+        self._restore_notice = None
+        self._last_snapshot = time.time()
+
+        # Kernel process, its cgroup (if any) and the latest usage sample
+        self.pid = None
+        self.cgroup = None
+        self.usage = None
+        self._cpu_sample = None
+
+        # In-flight executions, msg_id -> _Execution
+        self._executions = {}
+        self._outbox = deque()
+        self._io_thread = None
+        self._io_stop = False
+        self._wake_r, self._wake_w = None, None
+        self._io_lock = Lock()  # orders _submit's wake-up write against _stop_io closing the pipe
+
         self._start_kernel()
 
     def _start_kernel(self):
         """Start a persistent Jupyter kernel"""
+        started = time.time()
         try:
             self.kernel_manager = KernelManager(kernel_name='python3')
             self.kernel_manager.start_kernel()
+            self.pid = self.kernel_manager.provisioner.process.pid
+            self.cgroup = self.limits.create_cgroup()
+            self.limits.apply(self.pid, self.cgroup)
+            self.usage = None
+            self._cpu_sample = None
             self.kernel_client = self.kernel_manager.client()
             self.kernel_client.start_channels()
 
@@ -27,97 +113,407 @@ class NotebookExecutor:
             print(f"Error starting kernel: {e}")
             raise
 
+        # From here on only the I/O thread touches the shell and iopub sockets
+        self._io_stop = False
+        with self._io_lock:
+            self._wake_r, self._wake_w = os.pipe()
+        self._io_thread = Thread(target=self._io_loop, name='kernel-io', daemon=True)
+        self._io_thread.start()
+
+        boot_seconds = time.time() - started
+        self._bootstrap(boot_seconds)
+
+    def _bootstrap(self, boot_seconds):
+        """Run the bootstrap profile's preload code and record how long startup took"""
+        code = self.profile.preload_code()
+        result = None
+        started = time.time()
+        if code:
+            timeout = float(os.environ.get('KERNEL_BOOTSTRAP_TIMEOUT', '120'))
+            status, stdout = self._run_silent(code, timeout)
+            if status is None:
+                print(f"⚠ Kernel bootstrap profile {self.profile.name!r} timed out after {timeout:.0f}s")
+            try:
+                result = json.loads(stdout) if stdout else None
+            except ValueError as e:
+                print(f"⚠ Could not read kernel bootstrap result: {e}")
+
+        preload_seconds = time.time() - started
+        self.startup = {
+            'profile': self.profile.name,
+            'boot_seconds': round(boot_seconds, 3),
+            'preload_seconds': round(preload_seconds, 3),
+        }
+        if result and result.get('failed'):
+            print(f"⚠ Kernel bootstrap could not import: {', '.join(result['failed'])}")
+        self.profile.record(boot_seconds, preload_seconds, result)
+
+    def _io_loop(self):
+        """Route shell and iopub messages to their executions as soon as they arrive"""
+        session = self.kernel_client.session
+        shell = self.kernel_client.shell_channel.socket
+        iopub = self.kernel_client.iopub_channel.socket
+        wake_r = self._wake_r
+
+        poller = zmq.Poller()
+        poller.register(shell, zmq.POLLIN)
+        poller.register(iopub, zmq.POLLIN)
+        poller.register(wake_r, zmq.POLLIN)
+
+        while not self._io_stop:
+            try:
+                ready = dict(poller.poll())
+            except zmq.ZMQError:
+                break
+
+            if wake_r in ready:
+                os.read(wake_r, 4096)
+                while self._outbox:
+                    session.send(shell, self._outbox.popleft())
+
+            for socket, channel in ((iopub, 'iopub'), (shell, 'shell')):
+                if socket not in ready:
+                    continue
+                while True:
+                    _, msg = session.recv(socket, mode=zmq.NOBLOCK)
+                    if msg is None:
+                        break
+                    execution = self._executions.get(msg['parent_header'].get('msg_id'))
+                    if execution:
+                        execution.messages.put((channel, msg))
+
+        os.close(wake_r)
+
+    def _stop_io(self):
+        """Stop the I/O thread and release anyone still waiting on an execution"""
+        if self._io_thread:
+            with self._io_lock:
+                self._io_stop = True
+                os.write(self._wake_w, b'\0')
+                # Closed before the join: a submit after this point raises instead of
+                # writing to a closed (or reused) descriptor; the loop closes _wake_r
+                os.close(self._wake_w)
+                self._wake_r = self._wake_w = None
+            self._io_thread.join(timeout=5)
+            self._io_thread = None
+        for execution in list(self._executions.values()):
+            execution.messages.put(('closed', None))
+
+    def _run_silent(self, code, timeout):
+        """Run code silently and wait for it; returns (reply status or None on timeout, stdout)"""
+        execution = self._submit(code, silent=True)
+        stdout = []
+        try:
+            deadline = time.time() + timeout
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None, ''.join(stdout)
+                try:
+                    channel, msg = execution.messages.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if channel == 'closed':
+                    return None, ''.join(stdout)
+                if channel == 'shell':
+                    return msg['content'].get('status'), ''.join(stdout)
+                if msg['msg_type'] == 'stream' and msg['content']['name'] == 'stdout':
+                    stdout.append(msg['content']['text'])
+        finally:
+            self._executions.pop(execution.msg_id, None)
+
+    def _start_restore(self):
+        """Begin rebuilding the owner's checkpointed session in the background"""
+        with self.lock:
+            if not self.restore_pending:
+                return
+            self.restore_pending = False
+            checkpoint = self.checkpoints.load(self.owner) if self.checkpoints else None
+            if not checkpoint:
+                return
+            if checkpoint['truncated']:
+                # Replaying only the recorded prefix would rebuild a stale session
+                self.checkpoints.clear(self.owner)
+                self.checkpoints.record_skipped_restore()
+                self._restore_notice = ("Your previous session was too long to restore automatically "
+                                        f"(over {self.checkpoints.max_cells} cells). Please re-run your notebook.")
+                return
+            self._restored.clear()
+        Thread(target=self._restore, args=(checkpoint,), name='kernel-restore', daemon=True).start()
+
+    def _restore(self, checkpoint):
+        """Replay a checkpoint into this kernel (runs in its own thread)"""
+        try:
+            plan = CheckpointStore.restore_plan(checkpoint)
+            timeout = float(os.environ.get('KERNEL_RESTORE_CELL_TIMEOUT', str(self.timeout)))
+            # Limits how many sessions this worker rebuilds at once after a deploy
+            if self.restore_slots:
+                self.restore_slots.acquire()
+            try:
+                print(f"Restoring session for user {self.owner} ({len(plan)} cells)")
+                replayed = failed = 0
+                for code in plan:
+                    status, _ = self._run_silent(code, timeout)
+                    if status is None:
+                        # Timed out, or the kernel was restarted or shut down
+                        failed += len(plan) - replayed
+                        break
+                    replayed += 1
+                    if status != 'ok':
+                        failed += 1
+                self.checkpoints.record_restore(len(plan), failed)
+            finally:
+                if self.restore_slots:
+                    self.restore_slots.release()
+        except Exception as e:
+            print(f"⚠ Could not restore session for user {self.owner}: {e}")
+        finally:
+            self._restored.set()
+
+    def _checkpoint(self, code):
+        """Record a cell that ran cleanly, and snapshot the namespace when one is due.
+
+        Returns the new history length, as CheckpointStore.record().
+        """
+        count = None
+        try:
+            count = self.checkpoints.record(self.owner, code)
+            if (count and self.checkpoints.snapshots_enabled
+                    and time.time() - self._last_snapshot >= self.checkpoints.namespace_interval):
+                self._last_snapshot = time.time()
+                with self.lock:
+                    # Fire and forget: the kernel runs it after the cell that was just recorded
+                    execution = self._submit(self.checkpoints.snapshot_code(self.owner, count), silent=True)
+                    self._executions.pop(execution.msg_id, None)
+        except Exception as e:
+            print(f"⚠ Could not checkpoint cell for user {self.owner}: {e}")
+        return count
+
+    def _submit(self, code, silent=False):
+        """Queue an execute_request for the I/O thread to send; returns its _Execution
+
+        Silent requests do not count towards the learner's execution history.
+        Raises RuntimeError once the kernel has been shut down or is restarting.
+        """
+        with self._io_lock:
+            if self.closed or self._wake_w is None:
+                raise RuntimeError("Kernel was shut down")
+            msg = self.kernel_client.session.msg('execute_request', {
+                'code': code,
+                'silent': silent,
+                'store_history': not silent,
+                'user_expressions': {},
+                'allow_stdin': False,
+                'stop_on_error': True,
+            })
+            execution = _Execution(msg['header']['msg_id'])
+            self._executions[execution.msg_id] = execution
+            self._outbox.append(msg)
+            os.write(self._wake_w, b'\0')
+        return execution
+
     def execute_cell(self, code):
         """Execute a single code cell and return the output"""
-        # Use lock to prevent concurrent execution issues
+        try:
+            outputs, notices = split_status(self.execute_cell_stream(code))
+            outputs = self._coalesce_streams(outputs)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'type': 'error'
+            }
+        result = {'success': True, 'outputs': outputs}
+        if notices:
+            result['notices'] = notices
+        return result
+
+    @staticmethod
+    def _coalesce_streams(outputs):
+        """Merge consecutive stream outputs of the same name into one"""
+        merged = []
+        texts = []  # text chunks of the stream output currently being merged
+        for output in outputs:
+            previous = merged[-1] if merged else None
+            if (output['type'] == 'stream' and previous and previous['type'] == 'stream'
+                    and previous['name'] == output['name']):
+                texts.append(output['text'])
+                continue
+            if texts:
+                merged[-1] = {**previous, 'text': ''.join(texts)}
+            texts = [output['text']] if output['type'] == 'stream' else []
+            merged.append(output)
+        if texts:
+            merged[-1] = {**merged[-1], 'text': ''.join(texts)}
+        return merged
+
+    def execute_cell_stream(self, code):
+        """Execute a single code cell, yielding each output as soon as the kernel sends it"""
+        self.last_used = time.time()
+        if self.restore_pending:
+            self._start_restore()
+        if self._restore_notice:
+            yield status_output(self._restore_notice)
+            self._restore_notice = None
+        if not self._restored.is_set():
+            yield status_output('Restoring your previous session...')
+            self._restored.wait(float(os.environ.get('KERNEL_RESTORE_TIMEOUT', '300')))
+
         with self.lock:
-            if not self.kernel_client or not self.kernel_client.is_alive():
+            if self.closed:
+                # Reaped or evicted: a kernel started here would be one the manager no longer tracks
+                raise RuntimeError("Kernel was shut down, please run the cell again")
+            if not self.is_alive():
                 print("Kernel is not alive, restarting...")
+                self._stop_io()
                 self._start_kernel()
-            else:
-                print("Kernel is alive and ready")
+            execution = self._submit(code)
+            self.handed_out = None
 
-            try:
-                # Execute the code
-                msg_id = self.kernel_client.execute(code, allow_stdin=False)
-
-                outputs = []
-                execution_done = False
-
-                # Collect all output messages with proper timeout
-                start_time = time.time()
-                while not execution_done and (time.time() - start_time) < self.timeout:
-                    try:
-                        # Use shorter timeout for get_iopub_msg to check execution_done more frequently
-                        msg = self.kernel_client.get_iopub_msg(timeout=1)
-
-                        # Only process messages that belong to this execution
-                        if msg['parent_header'].get('msg_id') != msg_id:
-                            continue
-
-                        msg_type = msg['msg_type']
-                        content = msg['content']
-
-                        if msg_type == 'stream':
-                            outputs.append({
-                                'type': 'stream',
-                                'name': content['name'],
-                                'text': content['text']
-                            })
-                        elif msg_type == 'execute_result':
-                            outputs.append({
-                                'type': 'execute_result',
-                                'data': content['data'],
-                                'execution_count': content.get('execution_count')
-                            })
-                        elif msg_type == 'display_data':
-                            outputs.append({
-                                'type': 'display_data',
-                                'data': content['data']
-                            })
-                        elif msg_type == 'error':
-                            outputs.append({
-                                'type': 'error',
-                                'ename': content['ename'],
-                                'evalue': content['evalue'],
-                                'traceback': content['traceback']
-                            })
-                        elif msg_type == 'status' and content['execution_state'] == 'idle':
-                            # Execution finished
-                            execution_done = True
-
-                    except queue.Empty:
-                        # Continue waiting for messages until timeout or execution is done
-                        continue
-
-                return {'success': True, 'outputs': outputs}
-
-            except Exception as e:
-                return {
-                    'success': False,
-                    'error': str(e),
-                    'type': 'error'
-                }
+        budget = OutputBudget(store=self.output_store, owner=self.owner)
+        clean = True
+        try:
+            replied = False
+            idle = False
+            deadline = time.time() + self.timeout
+            while not (replied and idle):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    channel, msg = execution.messages.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+                if channel == 'closed':
+                    # Kernel was restarted or shut down underneath us
+                    break
+                if channel == 'shell':
+                    replied = True
+                    clean = clean and msg['content'].get('status') == 'ok'
+                    # Aborted requests (after an earlier error) get no idle status
+                    if msg['content'].get('status') == 'aborted':
+                        break
+                    continue
+
+                msg_type = msg['msg_type']
+                content = msg['content']
+                if msg_type == 'status':
+                    if content['execution_state'] == 'idle':
+                        idle = True
+                    continue
+
+                output = self._format_output(msg_type, content)
+                if output:
+                    output = budget.apply(output)
+                if output:
+                    yield output
+        finally:
+            # Late messages for this execution are dropped from now on
+            self._executions.pop(execution.msg_id, None)
+            self.last_used = time.time()
+
+        if self.checkpoints and replied and idle and clean and self._checkpoint(code) == 0:
+            yield status_output(f"This session is now over {self.checkpoints.max_cells} cells long and will "
+                                "not be restored automatically after a server restart.")
+
+    @staticmethod
+    def _format_output(msg_type, content):
+        """Convert an iopub message into an output dict, or None if it is not an output"""
+        if msg_type == 'stream':
+            return {
+                'type': 'stream',
+                'name': content['name'],
+                'text': content['text']
+            }
+        elif msg_type == 'execute_result':
+            return {
+                'type': 'execute_result',
+                'data': content['data'],
+                'execution_count': content.get('execution_count')
+            }
+        elif msg_type == 'display_data':
+            return {
+                'type': 'display_data',
+                'data': content['data']
+            }
+        elif msg_type == 'error':
+            return {
+                'type': 'error',
+                'ename': content['ename'],
+                'evalue': content['evalue'],
+                'traceback': content['traceback']
+            }
+        return None
+
+    def sample_usage(self):
+        """Sample the kernel's memory and CPU; returns the usage dict or None"""
+        pid = self.pid
+        sample = sample_process(pid) if pid else None
+        if sample is None:
+            return None
+
+        now = time.time()
+        previous = self._cpu_sample
+        if previous and now > previous[0]:
+            sample['cpu_percent'] = round(100 * (sample['cpu_seconds'] - previous[1]) / (now - previous[0]), 1)
+        else:
+            sample['cpu_percent'] = None
+        self._cpu_sample = (now, sample['cpu_seconds'])
+        sample['pid'] = pid
+        sample['sampled_at'] = now
+        self.usage = sample
+        return sample
+
+    def interrupt(self):
+        """Interrupt the running cell"""
+        if self.kernel_manager:
+            self.kernel_manager.interrupt_kernel()
+
+    def is_alive(self):
+        """True if the kernel process is running"""
+        return bool(self.kernel_client) and self.kernel_client.is_alive()
+
+    def is_busy(self):
+        """True while a cell is executing or the kernel is restarting"""
+        return bool(self._executions) or self.lock.locked()
 
     def restart_kernel(self):
         """Restart the kernel to clear all state"""
         with self.lock:
-            try:
-                if self.kernel_client:
-                    self.kernel_client.stop_channels()
-                if self.kernel_manager:
-                    self.kernel_manager.shutdown_kernel(now=True)
-            except Exception as e:
-                print(f"Error shutting down kernel: {e}")
-
+            if self.closed:
+                raise RuntimeError("Kernel was shut down")
+            # A restart is a deliberate clean slate, never restored
+            self.restore_pending = False
+            self._stop_kernel()
             self._start_kernel()
+            self.last_used = time.time()
+            self.handed_out = None
+
+    def shutdown(self):
+        """Shut the kernel down for good; later cells raise instead of starting a new one"""
+        self.closed = True
+        self._stop_kernel()
+
+    def _stop_kernel(self):
+        """Stop the channels and shut the kernel process down"""
+        self._stop_io()
+        kernel_client, self.kernel_client = self.kernel_client, None
+        kernel_manager, self.kernel_manager = self.kernel_manager, None
+        try:
+            if kernel_client:
+                kernel_client.stop_channels()
+            if kernel_manager:
+                kernel_manager.shutdown_kernel(now=True)
+        except Exception as e:
+            print(f"Error shutting down kernel: {e}")
+        cgroup, self.cgroup = self.cgroup, None
+        self.limits.remove_cgroup(cgroup)
+        self.pid = None
 
     def __del__(self):
         """Cleanup when the executor is destroyed"""
         try:
-            if self.kernel_client:
-                self.kernel_client.stop_channels()
-            if self.kernel_manager:
-                self.kernel_manager.shutdown_kernel(now=True)
+            self.shutdown()
         except:
             pass
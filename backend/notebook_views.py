@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import base64
+import hashlib
+import tempfile
+from threading import Lock
+
+from execution_cache import notebook_hash
+from file_utils import write_atomic
+
+# Saved raster images are moved out to asset files; other large bundles
+# (HTML tables, widget state, plotly JSON...) are dropped, since learners
+# re-run the cells anyway. text/plain is always kept, truncated if need be,
+# so every output still has a form the viewer can show
+IMAGE_EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/gif': 'gif', 'image/webp': 'webp'}
+ASSET_MIME_TYPES = {ext: mime for mime, ext in IMAGE_EXTENSIONS.items()}
+_ASSET_NAME = re.compile(r'[0-9a-f]{64}\.(png|jpg|gif|webp)')
+
+# Where routes.get_notebook_asset serves them
+ASSET_URL_PREFIX = '/api/notebook-assets/'
+
+# Part of every view's file name: bumped whenever slim() changes, so views
+# built by older code are rebuilt instead of served
+VIEW_FORMAT = 2
+
+
+class NotebookViews:
+    """
+    Slim copies of the course notebooks, as served to the notebook viewer.
+
+    Output MIME bundles larger than NOTEBOOK_INLINE_OUTPUT_BYTES are taken
+    out of the notebook: images are written once to content-addressed asset
+    files (referenced from output.metadata.lms.assets), text/plain is cut to
+    the limit with a marker (listed in output.metadata.lms.truncated), and
+    anything else is listed in output.metadata.lms.omitted. An output left
+    without text/plain gets a short placeholder saying what was omitted, so
+    ?view=full only ever differs in size. Source, small outputs and
+    notebook metadata are untouched.
+
+    Views live under CONTENT_CACHE_DIR, named by the source notebook's
+    sha256 and VIEW_FORMAT, so a re-uploaded notebook gets a new view and
+    the old one is simply never read again. They are built at upload time; a notebook that
+    reached public/ another way gets its view on first request.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('CONTENT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'lms-content-cache')
+        self.inline_max_bytes = int(os.environ.get('NOTEBOOK_INLINE_OUTPUT_BYTES', '4096'))
+        self.lock = Lock()
+        self.built = 0
+        self.assets_written = 0
+        self.bytes_saved = 0
+
+    def view_path(self, notebook_path):
+        """Path of a notebook's slim view, building it if it does not exist yet"""
+        digest = notebook_hash(notebook_path)
+        path = self._view_file(digest)
+        if not os.path.exists(path):
+            self.build(notebook_path, digest)
+        return path
+
+    def build(self, notebook_path, digest=None):
+        """Write the slim view of a notebook; returns its path"""
+        digest = digest or notebook_hash(notebook_path)
+        with open(notebook_path, 'rb') as f:
+            raw = f.read()
+        slim = json.dumps(self.slim(json.loads(raw)), ensure_ascii=False).encode('utf-8')
+        path = self._view_file(digest)
+        write_atomic(path, lambda f: f.write(slim))
+        with self.lock:
+            self.built += 1
+            self.bytes_saved += max(len(raw) - len(slim), 0)
+        return path
+
+    def _view_file(self, digest):
+        return os.path.join(self.root, 'notebooks', f'{digest}-v{VIEW_FORMAT}.json')
+
+    def slim(self, notebook):
+        """Strip large output bundles from a parsed notebook (in place) and return it"""
+        for cell in notebook.get('cells', []):
+            for output in cell.get('outputs') or []:
+                data = output.get('data')
+                if isinstance(data, dict):
+                    self._slim_bundle(output, data)
+        return notebook
+
+    def _slim_bundle(self, output, data):
+        assets, omitted, truncated = {}, [], []
+        for mime in list(data):
+            value = data[mime]
+            if isinstance(value, list):
+                value = ''.join(value)
+            elif not isinstance(value, str):
+                value = json.dumps(value)
+            if len(value) <= self.inline_max_bytes:
+                continue
+
+            if mime == 'text/plain':
+                hidden = len(value) - self.inline_max_bytes
+                data[mime] = value[:self.inline_max_bytes] + f"\n[output truncated: {hidden} more characters in the full notebook]"
+                truncated.append(mime)
+                continue
+
+            del data[mime]
+            payload = None
+            if mime in IMAGE_EXTENSIONS:
+                try:
+                    payload = base64.b64decode(value)
+                except ValueError:
+                    pass
+            if payload:
+                assets[mime] = self._store_asset(payload, IMAGE_EXTENSIONS[mime])
+            else:
+                omitted.append(mime)
+
+        if omitted and 'text/plain' not in data:
+            data['text/plain'] = f"[{', '.join(omitted)} output omitted, shown in the full notebook]"
+
+        if assets or omitted or truncated:
+            lms = output.setdefault('metadata', {}).setdefault('lms', {})
+            if assets:
+                lms['assets'] = assets
+            if omitted:
+                lms['omitted'] = omitted
+            if truncated:
+                lms['truncated'] = truncated
+
+    def _store_asset(self, payload, ext):
+        name = f"{hashlib.sha256(payload).hexdigest()}.{ext}"
+        path = os.path.join(self.root, 'assets', name)
+        if not os.path.exists(path):
+            write_atomic(path, lambda f: f.write(payload))
+            with self.lock:
+                self.assets_written += 1
+        return {'url': ASSET_URL_PREFIX + name, 'bytes': len(payload)}
+
+    def asset(self, name):
+        """(path, mimetype) of a stored asset, or (None, None) for unknown or malformed names"""
+        if not _ASSET_NAME.fullmatch(name):
+            return None, None
+        path = os.path.join(self.root, 'assets', name)
+        if not os.path.exists(path):
+            return None, None
+        return path, ASSET_MIME_TYPES[name.rsplit('.', 1)[1]]
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'root': self.root,
+                'inline_max_bytes': self.inline_max_bytes,
+                'built': self.built,
+                'assets_written': self.assets_written,
+                'bytes_saved': self.bytes_saved,
+            }
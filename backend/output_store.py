@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import base64
+import shutil
+import hashlib
+import mimetypes
+import tempfile
+
+# MIME types whose payload is base64 in the Jupyter message and binary on disk
+BINARY_MIME_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'application/pdf'}
+
+_REF_PATTERN = re.compile(r'^[0-9a-f]{32}\.[a-z0-9+.-]{1,16}$')
+
+
+class OutputSpillStore:
+    """
+    Temp-file store for cell output payloads too large to return inline.
+
+    Files live under OUTPUT_SPILL_DIR/<owner>/<content hash>.<ext> and are
+    served back through /api/execute/outputs/<ref>. An owner's files are
+    removed when their kernel is shut down or restarted.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('OUTPUT_SPILL_DIR') or os.path.join(tempfile.gettempdir(), 'lms-outputs')
+        os.makedirs(self.root, exist_ok=True)
+
+    def put(self, owner, mime, payload):
+        """Write one MIME payload to disk and return its ref"""
+        if mime in BINARY_MIME_TYPES and isinstance(payload, str):
+            data = base64.b64decode(payload)
+        elif isinstance(payload, str):
+            data = payload.encode('utf-8')
+        else:
+            data = json.dumps(payload).encode('utf-8')
+
+        ext = (mimetypes.guess_extension(mime) or '.bin').lstrip('.')
+        ref = f"{hashlib.sha256(data).hexdigest()[:32]}.{ext}"
+        owner_dir = os.path.join(self.root, str(owner))
+        os.makedirs(owner_dir, exist_ok=True)
+
+        path = os.path.join(owner_dir, ref)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return ref
+
+    def path(self, owner, ref):
+        """Return the file for an owner's ref, or None"""
+        if not _REF_PATTERN.match(ref):
+            return None
+        path = os.path.join(self.root, str(owner), ref)
+        return path if os.path.exists(path) else None
+
+    def purge(self, owner):
+        """Delete every spilled payload belonging to owner"""
+        shutil.rmtree(os.path.join(self.root, str(owner)), ignore_errors=True)
+
+
+def status_output(text):
+    """A notice about the session (e.g. a restore), sent alongside a cell's outputs.
+
+    Status outputs are not cell output: they bypass the OutputBudget and are
+    never cached or stored with a job; see split_status().
+    """
+    return {'type': 'status', 'text': text}
+
+
+def split_status(outputs):
+    """Separate an execution's outputs into (cell outputs, status texts)"""
+    cell_outputs, notices = [], []
+    for output in outputs:
+        if output['type'] == 'status':
+            notices.append(output['text'])
+        else:
+            cell_outputs.append(output)
+    return cell_outputs, notices
+
+
+class OutputBudget:
+    """
+    Caps how much output one execution may return.
+
+    - MIME payloads larger than spill_threshold are written to the spill store
+      and replaced with a fetchable reference under output['spilled']
+    - Inline output is counted against max_bytes; stream text past the budget
+      is truncated once with a notice, and later outputs are dropped
+    """
+
+    def __init__(self, max_bytes=None, spill_threshold=None, store=None, owner=None):
+        self.max_bytes = max_bytes or int(os.environ.get('EXECUTION_OUTPUT_BUDGET', str(2 * 1024 * 1024)))
+        self.spill_threshold = spill_threshold or int(os.environ.get('OUTPUT_SPILL_THRESHOLD', str(100 * 1024)))
+        self.store = store
+        self.owner = owner
+        self.used = 0
+        self.dropped = 0
+        self.exhausted = False
+
+    def apply(self, output):
+        """Return the output to send (possibly trimmed), or None to drop it"""
+        if output['type'] == 'stream':
+            return self._apply_stream(output)
+        if output['type'] in ('display_data', 'execute_result'):
+            return self._apply_bundle(output)
+        # Errors are small and always worth showing
+        self.used += sum(len(line) for line in output.get('traceback', []))
+        return output
+
+    def _apply_stream(self, output):
+        text = output['text']
+        if self.exhausted:
+            self.dropped += len(text)
+            return None
+
+        remaining = self.max_bytes - self.used
+        if len(text) <= remaining:
+            self.used += len(text)
+            return output
+
+        self.exhausted = True
+        self.dropped += len(text) - remaining
+        self.used = self.max_bytes
+        notice = f"\n[output truncated: exceeded the {self.max_bytes // 1024} KB output limit]\n"
+        return {**output, 'text': text[:remaining] + notice}
+
+    def _apply_bundle(self, output):
+        if self.exhausted:
+            self.dropped += sum(_payload_size(v) for v in output['data'].values())
+            return None
+
+        data = {}
+        spilled = {}
+        for mime, payload in output['data'].items():
+            size = _payload_size(payload)
+            if size > self.spill_threshold and self.store is not None and mime != 'text/plain':
+                ref = self.store.put(self.owner, mime, payload)
+                spilled[mime] = {'url': f"/api/execute/outputs/{ref}", 'size': size}
+            else:
+                data[mime] = payload
+
+        inline_size = sum(_payload_size(v) for v in data.values())
+        if self.used + inline_size > self.max_bytes:
+            self.exhausted = True
+            self.dropped += inline_size
+            data = {'text/plain': f"[output omitted: exceeded the {self.max_bytes // 1024} KB output limit]"}
+            inline_size = len(data['text/plain'])
+
+        self.used += inline_size
+        trimmed = {**output, 'data': data}
+        if spilled:
+            trimmed['spilled'] = spilled
+        return trimmed
+
+
+def _payload_size(payload):
+    return len(payload) if isinstance(payload, str) else len(json.dumps(payload))
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from file_utils import sha256_file, write_atomic
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional: falls back to poppler's pdftotext
+    PdfReader = None
+
+MAX_ATTEMPTS = 3
+
+
+def sidecar_path(pdf_path):
+    """The page index of `deck.pdf` is the hidden file `.deck.pdf.pages.json` next to it"""
+    folder, name = os.path.split(pdf_path)
+    return os.path.join(folder, f'.{name}.pages.json')
+
+
+def _load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_page_index(pdf_path, stat=None):
+    """A PDF's page index ({'pages', 'text', 'sha256', ...}), or None if missing or stale"""
+    index = _load(sidecar_path(pdf_path))
+    if not index:
+        return None
+    try:
+        stat = stat or os.stat(pdf_path)
+    except OSError:
+        return None
+    if index.get('size') != stat.st_size or index.get('mtime_ns') != stat.st_mtime_ns:
+        return None
+    return index
+
+
+def extract_pages(pdf_path):
+    """Text of each page of a PDF, with pypdf or else pdftotext"""
+    if PdfReader is not None:
+        return [page.extract_text() or '' for page in PdfReader(pdf_path).pages]
+    if shutil.which('pdftotext'):
+        out = subprocess.run(['pdftotext', '-enc', 'UTF-8', pdf_path, '-'],
+                             capture_output=True, check=True).stdout.decode('utf-8', 'replace')
+        pages = out.split('\f')
+        return pages[:-1] if pages and not pages[-1].strip() else pages
+    raise RuntimeError('no PDF text extractor available (install pypdf or poppler-utils)')
+
+
+def _write_json(path, data):
+    write_atomic(path, lambda f: f.write(json.dumps(data).encode('utf-8')))
+
+
+class PdfPageIndexer:
+    """
+    Background extraction of PDF page text into sidecar files.
+
+    - enqueue() records a job file under CONTENT_CACHE_DIR/pdf-jobs and hands
+      it to a pool of PDF_EXTRACT_WORKERS threads; the request returns at once
+    - Each job extracts in a child process (PDF_EXTRACT_TIMEOUT seconds), so
+      a slow or malformed deck never holds the GIL or hangs a worker
+    - Jobs are keyed by PDF path and locked with flock while running, so
+      several workers can share the job directory; job files left behind by
+      a crash are picked up again when the indexer starts in a new process
+    - Idempotent by content hash: extracted pages are also kept under
+      CONTENT_CACHE_DIR/pdf-text/<sha256>.json, so a re-uploaded or renamed
+      copy of a deck only gets a new sidecar, it is not extracted again
+    """
+
+    def __init__(self, root=None, thumbnails=None):
+        self.thumbnails = thumbnails   # optional PdfThumbnails, rendered by the same job
+        content_dir = root or os.environ.get('CONTENT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'lms-content-cache')
+        self.jobs_dir = os.path.join(content_dir, 'pdf-jobs')
+        self.text_dir = os.path.join(content_dir, 'pdf-text')   # extracted pages by sha256
+        self.workers = int(os.environ.get('PDF_EXTRACT_WORKERS', '1'))
+        self.timeout = int(os.environ.get('PDF_EXTRACT_TIMEOUT', '300'))
+        self.lock = Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = set()
+        self._given_up = set()     # (path, mtime) of PDFs that failed MAX_ATTEMPTS times
+        self._ensured_days = None
+        self.extracted = 0
+        self.reused = 0
+        self.failed = 0
+
+    def _pool(self):
+        with self.lock:
+            if self._pid == os.getpid():
+                return self._executor
+            # First use in this process (or after a fork): thread pools do not survive fork
+            self._pid = os.getpid()
+            self._pending = set()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf-pages')
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            os.makedirs(self.text_dir, exist_ok=True)
+            leftover = [os.path.join(self.jobs_dir, name) for name in os.listdir(self.jobs_dir) if name.endswith('.json')]
+        for job_path in leftover:
+            self._submit(job_path)
+        if leftover:
+            print(f"✓ Resuming {len(leftover)} PDF page extraction job(s)")
+        return self._executor
+
+    def _submit(self, job_path):
+        with self.lock:
+            if job_path in self._pending:
+                return
+            self._pending.add(job_path)
+        self._executor.submit(self._run, job_path)
+
+    def enqueue(self, pdf_path):
+        """Queue a PDF for page extraction"""
+        self._pool()
+        job_path = os.path.join(self.jobs_dir, hashlib.sha256(pdf_path.encode('utf-8')).hexdigest()[:32] + '.json')
+        if not os.path.exists(job_path):
+            _write_json(job_path, {'path': pdf_path, 'queued_at': time.time(), 'attempts': 0})
+        self._submit(job_path)
+
+    def ensure(self, days):
+        """Queue every PDF in a content catalog snapshot that has no current page index"""
+        if days is self._ensured_days:
+            return
+        self._ensured_days = days
+        for entry in days.values():
+            for file in entry['files']:
+                if file['type'] != 'pdf':
+                    continue
+                pdf_path = os.path.join(entry['path'], file['name'])
+                missing = file['pages'] is None or (
+                    self.thumbnails and self.thumbnails.enabled and self.thumbnails.rendered(file['sha256']) is None)
+                if missing and (pdf_path, file['mtime']) not in self._given_up:
+                    self.enqueue(pdf_path)
+
+    def _run(self, job_path):
+        try:
+            f = open(job_path, 'r+', encoding='utf-8')
+        except FileNotFoundError:
+            return self._done(job_path)  # finished by another worker
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return self._done(job_path)  # another worker is on it
+            try:
+                job = json.load(f)
+            except ValueError:
+                os.unlink(job_path)
+                return self._done(job_path)
+
+            retry = False
+            try:
+                self._index(job['path'])
+                os.unlink(job_path)
+            except FileNotFoundError:
+                os.unlink(job_path)  # the PDF was deleted meanwhile
+            except Exception as e:
+                job['attempts'] = job.get('attempts', 0) + 1
+                print(f"⚠ PDF page extraction failed for {job['path']} (attempt {job['attempts']}): {e}")
+                retry = job['attempts'] < MAX_ATTEMPTS
+                if retry:
+                    _write_json(job_path, job)
+                else:
+                    os.unlink(job_path)
+                    with self.lock:
+                        self.failed += 1
+                        self._given_up.add((job['path'], os.path.getmtime(job['path'])))
+            finally:
+                self._done(job_path)
+        if retry:
+            self._submit(job_path)
+
+    def _done(self, job_path):
+        with self.lock:
+            self._pending.discard(job_path)
+
+    def _index(self, pdf_path):
+        stat = os.stat(pdf_path)
+        index = read_page_index(pdf_path, stat)
+        digest = index['sha256'] if index else self._extract(pdf_path, stat)
+        if self.thumbnails and self.thumbnails.enabled:
+            self.thumbnails.render(pdf_path, digest, self.timeout)
+
+    def _extract(self, pdf_path, stat):
+        """Write a PDF's sidecar page index; returns its sha256"""
+        digest = sha256_file(pdf_path)
+        # The same deck may already have been extracted, here or under another name
+        previous = _load(sidecar_path(pdf_path))
+        if not previous or previous.get('sha256') != digest:
+            previous = _load(os.path.join(self.text_dir, f'{digest}.json'))
+        if previous and previous.get('sha256') == digest:
+            pages, extractor = previous['text'], previous.get('extractor')
+            with self.lock:
+                self.reused += 1
+        else:
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), pdf_path],
+                                    capture_output=True, timeout=self.timeout)
+            if result.returncode != 0:
+                lines = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+                raise RuntimeError(lines[-1] if lines else f'extractor exited with {result.returncode}')
+            pages = json.loads(result.stdout)
+            extractor = 'pypdf' if PdfReader is not None else 'pdftotext'
+            with self.lock:
+                self.extracted += 1
+
+            _write_json(os.path.join(self.text_dir, f'{digest}.json'),
+                          {'sha256': digest, 'text': pages, 'extractor': extractor})
+
+        _write_json(sidecar_path(pdf_path), {
+            'sha256': digest,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'pages': len(pages),
+            'text': pages,
+            'extractor': extractor,
+            'extracted_at': time.time(),
+        })
+        return digest
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'queued': len(self._pending),
+                'extracted': self.extracted,
+                'reused': self.reused,
+                'failed': self.failed,
+                'extractor': 'pypdf' if PdfReader is not None else ('pdftotext' if shutil.which('pdftotext') else None),
+            }
+
+
+if __name__ == '__main__':
+    # Child process of PdfPageIndexer._index: print the page texts as JSON
+    json.dump(extract_pages(sys.argv[1]), sys.stdout)
@@ -0,0 +1,117 @@
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+try:
+    import pypdfium2
+except ImportError:  # optional: falls back to poppler's pdftoppm
+    pypdfium2 = None
+
+_DIGEST = re.compile(r'[0-9a-f]{64}')
+
+
+def renderer():
+    """Name of the available page renderer, or None"""
+    if pypdfium2 is not None:
+        return 'pypdfium2'
+    return 'pdftoppm' if shutil.which('pdftoppm') else None
+
+
+def render_pages(pdf_path, folder, pages, width):
+    """Write <n>.jpg for the first `pages` pages of a PDF into folder, then manifest.json"""
+    os.makedirs(folder, exist_ok=True)
+    if pypdfium2 is not None:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        count = min(pages, len(pdf))
+        for number in range(1, count + 1):
+            page = pdf[number - 1]
+            image = page.render(scale=width / page.get_width()).to_pil().convert('RGB')
+            tmp = os.path.join(folder, f'.{number}.jpg')
+            image.save(tmp, 'JPEG', quality=75, optimize=True)
+            os.replace(tmp, os.path.join(folder, f'{number}.jpg'))
+    elif shutil.which('pdftoppm'):
+        with tempfile.TemporaryDirectory(dir=folder) as tmp:
+            subprocess.run(['pdftoppm', '-jpeg', '-jpegopt', 'quality=75', '-f', '1', '-l', str(pages),
+                            '-scale-to-x', str(width), '-scale-to-y', '-1', pdf_path, os.path.join(tmp, 'page')],
+                           capture_output=True, check=True)
+            # pdftoppm zero-pads page numbers to the width of the page count
+            rendered = sorted(os.listdir(tmp), key=lambda name: int(re.findall(r'\d+', name)[-1]))
+            for number, name in enumerate(rendered, start=1):
+                os.replace(os.path.join(tmp, name), os.path.join(folder, f'{number}.jpg'))
+            count = len(rendered)
+    else:
+        raise RuntimeError('no PDF renderer available (install pypdfium2 or poppler-utils)')
+
+    # Written last: its presence means the folder is complete
+    with open(os.path.join(folder, '.manifest.tmp'), 'w') as f:
+        json.dump({'pages': count, 'width': width}, f)
+    os.replace(os.path.join(folder, '.manifest.tmp'), os.path.join(folder, 'manifest.json'))
+
+
+class PdfThumbnails:
+    """
+    JPEG previews of the first PDF_THUMBNAIL_PAGES pages of each PDF,
+    PDF_THUMBNAIL_WIDTH pixels wide.
+
+    Stored under CONTENT_CACHE_DIR/pdf-thumbnails/<sha256>/<width>/, so they
+    are shared by identical decks and never go stale. Rendered by the
+    PdfPageIndexer job of each PDF, in a child process, right after its text
+    is extracted. PDF_THUMBNAIL_PAGES=0 turns them off.
+    """
+
+    def __init__(self, root=None):
+        content_dir = root or os.environ.get('CONTENT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'lms-content-cache')
+        self.root = os.path.join(content_dir, 'pdf-thumbnails')
+        self.pages = int(os.environ.get('PDF_THUMBNAIL_PAGES', '3'))
+        self.width = int(os.environ.get('PDF_THUMBNAIL_WIDTH', '320'))
+        self.rendered_count = 0
+
+    @property
+    def enabled(self):
+        return self.pages > 0 and renderer() is not None
+
+    def _folder(self, digest):
+        return os.path.join(self.root, digest, str(self.width))
+
+    def rendered(self, digest):
+        """Number of thumbnails available for a PDF (by sha256), or None if not rendered"""
+        try:
+            with open(os.path.join(self._folder(digest), 'manifest.json'), 'r') as f:
+                return json.load(f)['pages']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def render(self, pdf_path, digest, timeout):
+        """Render a PDF's thumbnails unless they already exist"""
+        if self.rendered(digest) is not None:
+            return
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), pdf_path, self._folder(digest),
+                                 str(self.pages), str(self.width)], capture_output=True, timeout=timeout)
+        if result.returncode != 0:
+            lines = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f'renderer exited with {result.returncode}')
+        self.rendered_count += 1
+
+    def path(self, digest, page):
+        """File of one thumbnail, or None"""
+        if not _DIGEST.fullmatch(digest):
+            return None
+        path = os.path.join(self._folder(digest), f'{page}.jpg')
+        return path if os.path.exists(path) else None
+
+    def get_stats(self):
+        return {
+            'renderer': renderer(),
+            'pages': self.pages,
+            'width': self.width,
+            'rendered': self.rendered_count,
+        }
+
+
+if __name__ == '__main__':
+    # Child process of PdfThumbnails.render
+    render_pages(sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
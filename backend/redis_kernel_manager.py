@@ -1,8 +1,46 @@
 import os
+import re
+import time
+import uuid
 import redis
 import json
-from threading import Lock
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+from threading import Lock, Event, Thread, BoundedSemaphore
 from notebook_executor import NotebookExecutor
+from kernel_host import KernelHostClient, HostedKernel, with_keepalives
+from output_store import OutputSpillStore, split_status
+from kernel_limits import KERNEL_LIMITS
+from kernel_profiles import profile_stats
+from kernel_checkpoints import CheckpointStore
+
+
+# Operations a worker accepts from its request list, and the ids forward() gives them
+FORWARDED_OPS = ('execute', 'restart', 'interrupt')
+_REQUEST_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def _parse_forwarded_request(raw):
+    """Decode and validate a forwarded request payload; raises ValueError if it is malformed"""
+    try:
+        request = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"not JSON: {e}")
+    if not isinstance(request, dict):
+        raise ValueError("not an object")
+    if request.get('op') not in FORWARDED_OPS:
+        raise ValueError(f"unknown op {request.get('op')!r}")
+    if not isinstance(request.get('request_id'), str) or not _REQUEST_ID.fullmatch(request['request_id']):
+        raise ValueError("missing or invalid request_id")
+    if 'user_id' not in request:
+        raise ValueError("missing user_id")
+    if request['op'] == 'execute' and not isinstance(request.get('code'), str):
+        raise ValueError("execute without code")
+    return request
+
+
+class ForwardAckTimeout(TimeoutError):
+    """The worker owning a kernel did not acknowledge a forwarded request (it is presumed dead)"""
 
 
 class RedisKernelManager:
@@ -12,21 +50,65 @@ class RedisKernelManager:
     Architecture:
     - Each worker maintains its own local kernels in memory
     - Redis stores which worker owns which user's kernel
-    - If a request lands on the wrong worker, it creates a new kernel
-    - This is acceptable because notebook state is per-session, not persistent
+    - If a request lands on another worker, get_kernel returns a RemoteKernel
+      that forwards execution to the owner over Redis request/reply lists, so
+      the user keeps their state and the host runs one kernel per user
+    - Each worker advertises a heartbeat key; kernels owned by a worker whose
+      heartbeat has expired are re-created locally
 
     For 200 concurrent users with 4 workers:
     - Each worker handles ~50 users
     - Sticky session behavior through Redis tracking
+
+    Kernel pool:
+    - Each worker keeps KERNEL_POOL_SIZE booted, idle kernels ready to hand out
+    - A background filler thread tops the pool back up after every hand-out
+    - A user's first cell therefore skips the multi-second kernel boot
+
+    Kernel reaping:
+    - local_kernels is kept in least-recently-used order
+    - A background reaper shuts down kernels idle for KERNEL_IDLE_TIMEOUT seconds
+    - At most KERNEL_MAX_PER_WORKER kernels live per worker; assigning one more
+      evicts the least recently used idle kernel
+    - A kernel handed out by get_kernel is neither reaped nor evicted until
+      its cell starts (or KERNEL_HANDOUT_GRACE seconds pass), so a request
+      waiting for an execution slot never holds a kernel that was shut down
+
+    Locking:
+    - self.lock only ever guards the dictionaries and counters, never a boot
+    - The first request for a user registers a "booting" future and starts the
+      kernel outside the lock; concurrent requests for that user wait on it,
+      while other users' requests proceed unblocked
+
+    Resource accounting:
+    - Kernels run under KernelLimits (see kernel_limits.py) and are warmed
+      with a bootstrap profile before use (see kernel_profiles.py)
+    - A sampler thread records every local kernel's RSS and CPU each
+      KERNEL_SAMPLE_INTERVAL seconds; get_stats() reports them per kernel
+
+    Session checkpoints (KERNEL_CHECKPOINTS, opt-in):
+    - Kernels record each cleanly executed cell (see kernel_checkpoints.py)
+    - A kernel created for a user who has a checkpoint (after a deploy, a
+      worker recycle, or reaping) restores it when their next cell arrives;
+      at most KERNEL_RESTORE_CONCURRENCY restores run at once per worker
+    - An explicit restart discards the checkpoint
+
+    Backends (KERNEL_BACKEND):
+    - inprocess (default): kernels are children of this worker, as above
+    - daemon: kernels live in the kernel_host.py daemon and this manager is a
+      thin client talking to it over a unix socket; worker restarts no longer
+      kill learners' sessions and all workers share one set of kernels
     """
 
-    def __init__(self):
+    def __init__(self, executor_factory=NotebookExecutor, backend=None, use_redis=True):
         # Try to connect to Redis, but fall back gracefully if not available
-        redis_url = os.environ.get('REDIS_URL')
+        redis_url = os.environ.get('REDIS_URL') if use_redis else None
         self.redis_available = False
         self.redis_client = None
 
-        if redis_url:
+        if not use_redis:
+            pass
+        elif redis_url:
             try:
                 self.redis_client = redis.from_url(redis_url, decode_responses=True)
                 # Test connection
@@ -40,95 +122,626 @@ class RedisKernelManager:
         else:
             print(f"⚠ REDIS_URL not set, using in-memory kernel storage (single worker mode)")
 
-        # Local kernel storage (in-memory for this worker)
-        self.local_kernels = {}
-        self.lock = Lock()
-
         # Worker ID (unique per process)
         self.worker_id = os.getpid()
 
-        print(f"RedisKernelManager initialized for worker {self.worker_id}")
+        # Large cell outputs spilled to disk (shared by every worker on this host)
+        self.output_store = OutputSpillStore()
+
+        self.backend = backend or os.environ.get('KERNEL_BACKEND', 'inprocess')
+        self.host = KernelHostClient() if self.backend == 'daemon' else None
+        if self.host:
+            print(f"RedisKernelManager initialized for worker {self.worker_id} (kernel host at {self.host.socket_path})")
+            return
+
+        # Local kernel storage (in-memory for this worker), least recently used first
+        self.local_kernels = OrderedDict()
+        self.lock = Lock()
+        self.executor_factory = executor_factory
+
+        # Kernels currently starting, user_id -> Future resolving to the kernel
+        self._booting = {}
+
+        # Pre-warmed kernels waiting to be assigned to a user
+        self.pool_size = max(0, int(os.environ.get('KERNEL_POOL_SIZE', '2')))
+        self.kernel_pool = deque()
+        self.pool_hits = 0
+        self.pool_misses = 0
+        self._pool_wakeup = Event()
+        if self.pool_size:
+            Thread(target=self._fill_pool, name='kernel-pool-filler', daemon=True).start()
+
+        # Idle reaping and the per-worker kernel cap
+        self.idle_timeout = int(os.environ.get('KERNEL_IDLE_TIMEOUT', '1800'))
+        self.max_kernels = max(1, int(os.environ.get('KERNEL_MAX_PER_WORKER', '50')))
+        self.reap_interval = int(os.environ.get('KERNEL_REAP_INTERVAL', '60'))
+        self.handout_grace = float(os.environ.get('KERNEL_HANDOUT_GRACE', '180'))
+        self.reaped_idle = 0
+        self.evicted_lru = 0
+        if self.idle_timeout > 0:
+            Thread(target=self._reap_idle_kernels, name='kernel-reaper', daemon=True).start()
+
+        # Session checkpoints and the limit on concurrent restores
+        self.checkpoints = CheckpointStore(self.redis_client if self.redis_available else None)
+        self.restore_slots = BoundedSemaphore(max(1, int(os.environ.get('KERNEL_RESTORE_CONCURRENCY', '2'))))
+
+        # Per-kernel memory and CPU sampling
+        self.sample_interval = float(os.environ.get('KERNEL_SAMPLE_INTERVAL', '15'))
+        if self.sample_interval > 0:
+            Thread(target=self._sample_kernel_usage, name='kernel-usage-sampler', daemon=True).start()
+
+        # Cross-worker forwarding (Redis only)
+        self.forward_ack_timeout = float(os.environ.get('KERNEL_FORWARD_ACK_TIMEOUT', '5'))
+        self.forward_reply_timeout = float(os.environ.get('KERNEL_FORWARD_REPLY_TIMEOUT', '90'))
+        self.forwarded_in = 0
+        self.forwarded_out = 0
+        if self.redis_available and self.redis_client:
+            Thread(target=self._serve_forwarded_requests, name='kernel-forward-listener', daemon=True).start()
+
+        print(f"RedisKernelManager initialized for worker {self.worker_id} (kernel pool size {self.pool_size})")
+
+    def _fill_pool(self):
+        """Background loop that keeps the pool topped up to pool_size kernels"""
+        while True:
+            self._pool_wakeup.clear()
+            with self.lock:
+                missing = self.pool_size - len(self.kernel_pool)
+            if missing <= 0:
+                self._pool_wakeup.wait()
+                continue
+
+            try:
+                kernel = self.executor_factory()
+            except Exception as e:
+                print(f"⚠ Worker {self.worker_id}: Could not pre-warm kernel: {e}")
+                time.sleep(5)
+                continue
+
+            with self.lock:
+                self.kernel_pool.append(kernel)
+
+    def _take_pooled_kernel(self):
+        """Pop a live pooled kernel, or return None if the pool is empty.
+
+        Must be called with self.lock held.
+        """
+        kernel = None
+        while self.kernel_pool:
+            candidate = self.kernel_pool.popleft()
+            if candidate.is_alive():
+                kernel = candidate
+                break
+
+        if kernel is not None:
+            self.pool_hits += 1
+        else:
+            self.pool_misses += 1
+
+        if self.pool_size:
+            self._pool_wakeup.set()
+        return kernel
+
+    def _evict_lru_kernels(self):
+        """Make room for one more kernel by evicting least recently used idle ones.
+
+        Must be called with self.lock held. Returns the evicted (user_id, kernel)
+        pairs; the caller shuts them down after releasing the lock.
+        """
+        evicted = []
+        for user_id in list(self.local_kernels.keys()):
+            # Kernels still booting (including the one being made room for) count too
+            if len(self.local_kernels) + len(self._booting) <= self.max_kernels:
+                break
+            kernel = self.local_kernels[user_id]
+            if self._in_use(kernel):
+                continue
+            del self.local_kernels[user_id]
+            evicted.append((user_id, kernel))
+            self.evicted_lru += 1
+        return evicted
+
+    def _reap_idle_kernels(self):
+        """Background loop that shuts down kernels idle longer than idle_timeout"""
+        while True:
+            time.sleep(self.reap_interval)
+            cutoff = time.time() - self.idle_timeout
+            with self.lock:
+                idle = [(user_id, kernel) for user_id, kernel in self.local_kernels.items()
+                        if kernel.last_used < cutoff and not self._in_use(kernel)]
+                for user_id, _ in idle:
+                    del self.local_kernels[user_id]
+                self.reaped_idle += len(idle)
+
+            if idle:
+                print(f"Worker {self.worker_id}: Reaping {len(idle)} idle kernel(s)")
+                self._shutdown_kernels(idle)
+
+    def _in_use(self, kernel):
+        """True while a kernel is executing, or handed out and waiting for its cell to start"""
+        handed_out = getattr(kernel, 'handed_out', None)
+        if handed_out is not None and time.time() - handed_out < self.handout_grace:
+            return True
+        return kernel.is_busy()
+
+    def _hand_out(self, kernel):
+        """Mark a local kernel used and reserved until its cell starts"""
+        kernel.last_used = kernel.handed_out = time.time()
+        return kernel
+
+    def _sample_kernel_usage(self):
+        """Background loop that records each local kernel's RSS and CPU"""
+        while True:
+            time.sleep(self.sample_interval)
+            with self.lock:
+                kernels = list(self.local_kernels.values()) + list(self.kernel_pool)
+            for kernel in kernels:
+                sample_usage = getattr(kernel, 'sample_usage', None)
+                if sample_usage:
+                    try:
+                        sample_usage()
+                    except Exception as e:
+                        print(f"⚠ Worker {self.worker_id}: Could not sample kernel usage: {e}")
+
+    def _shutdown_kernels(self, kernels):
+        """Shut down (user_id, kernel) pairs and drop their Redis ownership records"""
+        for user_id, kernel in kernels:
+            kernel.shutdown()
+            self.output_store.purge(user_id)
+            self._forget_owner(user_id)
+
+    def _forget_owner(self, user_id):
+        """Remove the Redis record saying this worker owns a user's kernel"""
+        if self.redis_available and self.redis_client:
+            try:
+                redis_key = f"kernel:user:{user_id}"
+                if str(self.redis_client.get(redis_key)) == str(self.worker_id):
+                    self.redis_client.delete(redis_key)
+            except Exception as e:
+                print(f"⚠ Redis error in cleanup: {e}")
+
+    def get_kernel(self, user_id, allow_remote=True):
+        """Get or create a kernel for a user
+
+        Returns a RemoteKernel proxy when another live worker owns the user's
+        kernel, unless allow_remote is False.
+        """
+        if self.host:
+            return HostedKernel(self.host, user_id)
+
+        kernel = self._get_local_kernel(user_id)
+        if kernel:
+            return kernel
+
+        if allow_remote:
+            owner = self._claim_owner(user_id)
+            if owner is not None:
+                print(f"Worker {self.worker_id}: Forwarding user {user_id} to worker {owner}")
+                return RemoteKernel(self, user_id, owner)
 
-    def get_kernel(self, user_id):
-        """Get or create a kernel for a user"""
         with self.lock:
-            # Check if we already have this kernel locally
+            # Check again, the kernel may have been assigned while claiming ownership
             if user_id in self.local_kernels:
-                print(f"Worker {self.worker_id}: Using existing local kernel for user {user_id}")
-                return self.local_kernels[user_id]
-
-            # Check Redis only if available
-            if self.redis_available and self.redis_client:
-                try:
-                    redis_key = f"kernel:user:{user_id}"
-                    stored_worker = self.redis_client.get(redis_key)
-
-                    if stored_worker:
-                        if str(stored_worker) == str(self.worker_id):
-                            # This worker should have it but doesn't (maybe restarted)
-                            print(f"Worker {self.worker_id}: Recreating kernel for user {user_id}")
-                        else:
-                            # Another worker has it, but we'll create our own
-                            print(f"Worker {self.worker_id}: Creating new kernel for user {user_id} (was on worker {stored_worker})")
-                    else:
-                        print(f"Worker {self.worker_id}: Creating first kernel for user {user_id}")
-                except Exception as e:
-                    print(f"⚠ Redis error in get_kernel: {e}, continuing without Redis")
-
-            # Create new kernel
-            kernel = NotebookExecutor()
-            self.local_kernels[user_id] = kernel
-
-            # Store in Redis that this worker owns this user's kernel (if available)
-            if self.redis_available and self.redis_client:
-                try:
-                    redis_key = f"kernel:user:{user_id}"
-                    self.redis_client.set(redis_key, self.worker_id, ex=3600)  # Expire after 1 hour
-                except Exception as e:
-                    print(f"⚠ Redis error storing kernel info: {e}")
+                return self._hand_out(self.local_kernels[user_id])
+
+            # Another request is already starting this user's kernel
+            booting = self._booting.get(user_id)
+            if booting is None:
+                booting = Future()
+                self._booting[user_id] = booting
+                evicted = self._evict_lru_kernels()
+                # Assign a pre-warmed kernel if one is ready
+                kernel = self._take_pooled_kernel()
+                is_owner = True
+            else:
+                is_owner = False
+
+        if not is_owner:
+            print(f"Worker {self.worker_id}: Waiting for kernel boot for user {user_id}")
+            kernel = booting.result()
+            with self.lock:
+                return self._hand_out(kernel)
+
+        # Shut down evicted kernels outside the lock
+        if evicted:
+            print(f"Worker {self.worker_id}: Kernel cap {self.max_kernels} reached, evicting {len(evicted)} kernel(s)")
+            self._shutdown_kernels(evicted)
+
+        if kernel is None:
+            # Pool was empty, boot a fresh kernel without holding the shared lock
+            try:
+                kernel = self.executor_factory()
+            except Exception as e:
+                with self.lock:
+                    del self._booting[user_id]
+                booting.set_exception(e)
+                raise
+
+        kernel.owner = user_id
+        kernel.output_store = self.output_store
+        if self.checkpoints.enabled:
+            kernel.checkpoints = self.checkpoints
+            kernel.restore_slots = self.restore_slots
+            kernel.restore_pending = True
+        with self.lock:
+            del self._booting[user_id]
+            self.local_kernels[user_id] = self._hand_out(kernel)
+        booting.set_result(kernel)
 
+        # Store in Redis that this worker owns this user's kernel (if available)
+        self._record_owner(user_id)
+        return kernel
+
+    def _get_local_kernel(self, user_id):
+        """Return this worker's kernel for a user (marking it used), or None"""
+        with self.lock:
+            kernel = self.local_kernels.get(user_id)
+            if kernel:
+                print(f"Worker {self.worker_id}: Using existing local kernel for user {user_id}")
+                self._hand_out(kernel)
+                self.local_kernels.move_to_end(user_id)
             return kernel
 
-    def restart_kernel(self, user_id):
+    def _claim_owner(self, user_id):
+        """Claim ownership of a user's kernel in Redis.
+
+        Returns None if this worker may start the kernel, or the id of another
+        live worker that already owns it.
+        """
+        if not (self.redis_available and self.redis_client):
+            return None
+        try:
+            redis_key = f"kernel:user:{user_id}"
+            if self.redis_client.set(redis_key, self.worker_id, nx=True, ex=3600):
+                print(f"Worker {self.worker_id}: Creating first kernel for user {user_id}")
+                return None
+
+            stored_worker = self.redis_client.get(redis_key)
+            if not stored_worker or str(stored_worker) == str(self.worker_id):
+                # This worker should have it but doesn't (maybe restarted)
+                print(f"Worker {self.worker_id}: Recreating kernel for user {user_id}")
+                return None
+
+            if self.redis_client.exists(f"kernel:worker:{stored_worker}:alive"):
+                return stored_worker
+
+            # The owning worker is gone, take over
+            print(f"Worker {self.worker_id}: Creating new kernel for user {user_id} (worker {stored_worker} is gone)")
+            self.redis_client.set(redis_key, self.worker_id, ex=3600)
+        except Exception as e:
+            print(f"⚠ Redis error in get_kernel: {e}, continuing without Redis")
+        return None
+
+    def _release_dead_owner(self, user_id, owner):
+        """Drop a user's ownership record if it still points at an unresponsive worker"""
+        try:
+            redis_key = f"kernel:user:{user_id}"
+            if str(self.redis_client.get(redis_key)) == str(owner):
+                self.redis_client.delete(redis_key)
+            self.redis_client.delete(f"kernel:worker:{owner}:alive")
+        except Exception as e:
+            print(f"⚠ Redis error releasing owner: {e}")
+
+    # ── Cross-worker forwarding ──
+
+    def _serve_forwarded_requests(self):
+        """Background loop: keep this worker's heartbeat alive and serve requests forwarded to it"""
+        queue_key = f"kernel:worker:{self.worker_id}:requests"
+        alive_key = f"kernel:worker:{self.worker_id}:alive"
+        last_refresh = 0
+        while True:
+            try:
+                self.redis_client.set(alive_key, 1, ex=15)
+                if time.time() - last_refresh > 60:
+                    self._refresh_ownership()
+                    last_refresh = time.time()
+
+                item = self.redis_client.blpop(queue_key, timeout=5)
+            except Exception as e:
+                print(f"⚠ Redis error in forward listener: {e}")
+                time.sleep(5)
+                continue
+            if not item:
+                continue
+
+            # Nothing a caller pushes may stop this loop: it also keeps the heartbeat alive
+            try:
+                request = _parse_forwarded_request(item[1])
+            except ValueError as e:
+                print(f"⚠ Worker {self.worker_id}: Dropping malformed forwarded request: {e}")
+                continue
+            try:
+                if request['op'] == 'interrupt':
+                    # Must not queue behind the execution it is meant to stop
+                    self._handle_forwarded_request(request)
+                else:
+                    Thread(target=self._handle_forwarded_request, args=(request,), daemon=True).start()
+            except Exception as e:
+                print(f"⚠ Worker {self.worker_id}: Could not serve forwarded request: {e}")
+
+    def _refresh_ownership(self):
+        """Keep ownership records alive for kernels that are still running here"""
+        with self.lock:
+            user_ids = list(self.local_kernels.keys())
+        if user_ids:
+            pipe = self.redis_client.pipeline()
+            for user_id in user_ids:
+                pipe.expire(f"kernel:user:{user_id}", 3600)
+            pipe.execute()
+
+    def _handle_forwarded_request(self, request):
+        """Run a forwarded operation on the local kernel and push replies to the caller"""
+        reply_key = f"kernel:reply:{request['request_id']}"
+
+        def reply(message):
+            pipe = self.redis_client.pipeline()
+            pipe.rpush(reply_key, json.dumps(message))
+            pipe.expire(reply_key, 300)
+            pipe.execute()
+
+        try:
+            reply({'kind': 'ack'})
+            with self.lock:
+                self.forwarded_in += 1
+
+            # Keepalives while booting, restoring or running a silent cell, so the caller waits
+            for message in with_keepalives(lambda: self._run_forwarded(request)):
+                reply(message or {'kind': 'keepalive'})
+        except Exception as e:
+            try:
+                reply({'kind': 'done', 'success': False, 'error': str(e)})
+            except Exception as redis_error:
+                print(f"⚠ Redis error replying to forwarded request: {redis_error}")
+
+    def _run_forwarded(self, request):
+        """Yield the reply messages of a forwarded operation"""
+        user_id = request['user_id']
+        if request['op'] == 'interrupt':
+            kernel = self._get_local_kernel(user_id)
+            if kernel:
+                kernel.interrupt()
+        elif request['op'] == 'restart':
+            self.restart_kernel(user_id, allow_remote=False)
+        else:
+            kernel = self.get_kernel(user_id, allow_remote=False)
+            for output in kernel.execute_cell_stream(request['code']):
+                yield {'kind': 'output', 'output': output}
+        yield {'kind': 'done', 'success': True}
+
+    def forward(self, owner, user_id, op, code=None):
+        """Send an operation to the worker that owns a user's kernel.
+
+        Yields reply messages. Raises ForwardAckTimeout if the owner never
+        acknowledges, and TimeoutError if it goes silent afterwards: it
+        sends keepalives while it works, so silence means it is gone.
+        """
+        request_id = uuid.uuid4().hex
+        reply_key = f"kernel:reply:{request_id}"
+        queue_key = f"kernel:worker:{owner}:requests"
+        pipe = self.redis_client.pipeline()
+        pipe.rpush(queue_key, json.dumps({
+            'request_id': request_id,
+            'user_id': user_id,
+            'op': op,
+            'code': code,
+        }))
+        pipe.expire(queue_key, 60)  # don't pile up requests for a worker that died
+        pipe.execute()
+        with self.lock:
+            self.forwarded_out += 1
+
+        item = self.redis_client.blpop(reply_key, timeout=self.forward_ack_timeout)
+        if not item:
+            raise ForwardAckTimeout(f"worker {owner} did not acknowledge within {self.forward_ack_timeout}s")
+
+        while True:
+            item = self.redis_client.blpop(reply_key, timeout=self.forward_reply_timeout)
+            if not item:
+                raise TimeoutError(f"worker {owner} stopped responding")
+            message = json.loads(item[1])
+            if message['kind'] == 'keepalive':
+                continue
+            yield message
+            if message['kind'] == 'done':
+                return
+
+    def _record_owner(self, user_id):
+        """Store in Redis that this worker owns a user's kernel"""
+        if self.redis_available and self.redis_client:
+            try:
+                redis_key = f"kernel:user:{user_id}"
+                self.redis_client.set(redis_key, self.worker_id, ex=3600)  # Expire after 1 hour
+            except Exception as e:
+                print(f"⚠ Redis error storing kernel info: {e}")
+
+    def restart_kernel(self, user_id, allow_remote=True):
         """Restart a user's kernel"""
+        if self.host:
+            self.host.call('restart', user_id=user_id)
+            return
+
+        if self.checkpoints.enabled:
+            self.checkpoints.clear(user_id)
+
         with self.lock:
-            if user_id in self.local_kernels:
-                print(f"Worker {self.worker_id}: Restarting kernel for user {user_id}")
-                self.local_kernels[user_id].restart_kernel()
-            else:
-                # Create new kernel
-                print(f"Worker {self.worker_id}: Creating new kernel for user {user_id} (restart)")
-                kernel = NotebookExecutor()
-                self.local_kernels[user_id] = kernel
+            kernel = self.local_kernels.get(user_id)
+            if kernel:
+                self.local_kernels.move_to_end(user_id)
 
-                # Update Redis (if available)
-                if self.redis_available and self.redis_client:
-                    try:
-                        redis_key = f"kernel:user:{user_id}"
-                        self.redis_client.set(redis_key, self.worker_id, ex=3600)
-                    except Exception as e:
-                        print(f"⚠ Redis error in restart_kernel: {e}")
+        if kernel is None:
+            print(f"Worker {self.worker_id}: Creating new kernel for user {user_id} (restart)")
+            kernel = self.get_kernel(user_id, allow_remote=allow_remote)
+            if not isinstance(kernel, RemoteKernel):
+                # A freshly assigned kernel is already a clean slate
+                return
+
+        # The executor's own lock serializes the restart with that user's cells
+        print(f"Worker {self.worker_id}: Restarting kernel for user {user_id}")
+        kernel.restart_kernel()
+        self.output_store.purge(user_id)
 
     def cleanup_user_kernel(self, user_id):
         """Clean up a user's kernel (called on logout or timeout)"""
+        if self.host:
+            self.host.call('cleanup', user_id=user_id)
+            return
+
         with self.lock:
-            if user_id in self.local_kernels:
-                print(f"Worker {self.worker_id}: Cleaning up kernel for user {user_id}")
-                del self.local_kernels[user_id]
+            kernel = self.local_kernels.pop(user_id, None)
 
-            # Remove from Redis (if available)
-            if self.redis_available and self.redis_client:
-                try:
-                    redis_key = f"kernel:user:{user_id}"
-                    self.redis_client.delete(redis_key)
-                except Exception as e:
-                    print(f"⚠ Redis error in cleanup: {e}")
+        if kernel:
+            print(f"Worker {self.worker_id}: Cleaning up kernel for user {user_id}")
+            kernel.shutdown()
+        self.output_store.purge(user_id)
+
+        # Remove from Redis (if available)
+        if self.redis_available and self.redis_client:
+            try:
+                redis_key = f"kernel:user:{user_id}"
+                self.redis_client.delete(redis_key)
+            except Exception as e:
+                print(f"⚠ Redis error in cleanup: {e}")
+
+    def shutdown_all(self):
+        """Shut down every kernel this manager owns, including pooled ones"""
+        with self.lock:
+            kernels = list(self.local_kernels.items())
+            self.local_kernels.clear()
+            pooled = list(self.kernel_pool)
+            self.kernel_pool.clear()
+            self.pool_size = 0
+        self._shutdown_kernels(kernels)
+        for kernel in pooled:
+            kernel.shutdown()
 
     def get_stats(self):
         """Get statistics about kernel usage"""
+        if self.host:
+            return {**self.host.call('stats'), 'backend': 'daemon', 'worker_id': self.worker_id}
+
+        with self.lock:
+            local = list(self.local_kernels.items())
+            pooled = list(self.kernel_pool)
+
+        now = time.time()
+        kernels = []
+        for user_id, kernel in local:
+            usage = getattr(kernel, 'usage', None) or {}
+            kernels.append({
+                'user_id': user_id,
+                'busy': kernel.is_busy(),
+                'idle_seconds': round(now - kernel.last_used, 1),
+                **usage,
+            })
+        pooled_rss = sum((getattr(k, 'usage', None) or {}).get('rss_bytes', 0) for k in pooled)
+
         with self.lock:
             return {
+                'backend': self.backend,
                 'worker_id': self.worker_id,
                 'local_kernels': len(self.local_kernels),
-                'user_ids': list(self.local_kernels.keys())
+                'booting_kernels': len(self._booting),
+                'user_ids': list(self.local_kernels.keys()),
+                'max_kernels': self.max_kernels,
+                'idle_timeout': self.idle_timeout,
+                'reaped_idle': self.reaped_idle,
+                'evicted_lru': self.evicted_lru,
+                'forwarded_in': self.forwarded_in,
+                'forwarded_out': self.forwarded_out,
+                'pool': {
+                    'target_size': self.pool_size,
+                    'ready': len(self.kernel_pool),
+                    'hits': self.pool_hits,
+                    'misses': self.pool_misses,
+                },
+                'limits': KERNEL_LIMITS.describe(),
+                'bootstrap': profile_stats(),
+                'checkpoints': self.checkpoints.get_stats(),
+                'sample_interval': self.sample_interval,
+                'kernels': kernels,
+                'total_rss_bytes': sum(k.get('rss_bytes', 0) for k in kernels) + pooled_rss,
             }
+
+
+class RemoteKernel:
+    """
+    Proxy for a user's kernel that lives in another worker.
+
+    Offers the NotebookExecutor methods the routes use and forwards each call
+    through RedisKernelManager.forward(). If the owning worker does not
+    acknowledge, its ownership record is dropped and the call runs on a kernel
+    in this worker instead.
+    """
+
+    def __init__(self, manager, user_id, owner):
+        self.manager = manager
+        self.user_id = user_id
+        self.owner = owner
+        self.last_used = time.time()
+
+    def execute_cell(self, code):
+        """Execute a single code cell on the owning worker and return the output"""
+        try:
+            outputs, notices = split_status(self.execute_cell_stream(code))
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'type': 'error'
+            }
+        result = {'success': True, 'outputs': outputs}
+        if notices:
+            result['notices'] = notices
+        return result
+
+    def execute_cell_stream(self, code):
+        """Execute a single code cell on the owning worker, yielding outputs as they are relayed"""
+        replies = self.manager.forward(self.owner, self.user_id, 'execute', code=code)
+        try:
+            message = next(replies)
+        except ForwardAckTimeout as e:
+            # Only a missing ack means the owner is gone; a later timeout is an error
+            print(f"⚠ Forwarding to worker {self.owner} failed ({e}), running locally")
+            yield from self._take_over().execute_cell_stream(code)
+            return
+
+        while True:
+            if message['kind'] == 'output':
+                yield message['output']
+            elif message['kind'] == 'done':
+                if not message['success']:
+                    raise RuntimeError(message['error'])
+                return
+            message = next(replies)
+
+    def restart_kernel(self):
+        """Restart the kernel on the owning worker"""
+        try:
+            for message in self.manager.forward(self.owner, self.user_id, 'restart'):
+                if message['kind'] == 'done' and not message['success']:
+                    raise RuntimeError(message['error'])
+        except ForwardAckTimeout:
+            # A fresh local kernel is already a clean slate
+            self._take_over()
+
+    def interrupt(self):
+        """Interrupt the running cell on the owning worker"""
+        try:
+            for _ in self.manager.forward(self.owner, self.user_id, 'interrupt'):
+                pass
+        except TimeoutError as e:
+            print(f"⚠ Could not interrupt kernel on worker {self.owner}: {e}")
+
+    def is_alive(self):
+        return True
+
+    def is_busy(self):
+        return False
+
+    def shutdown(self):
+        """The owning worker is responsible for the kernel process"""
+        pass
+
+    def _take_over(self):
+        """Start this user's kernel in the current worker after the owner stopped responding"""
+        self.manager._release_dead_owner(self.user_id, self.owner)
+        return self.manager.get_kernel(self.user_id, allow_remote=False)
@@ -2,7 +2,8 @@ import os
 import re
 import io
 import json
-from flask import Blueprint, request, jsonify, send_file
+from urllib.parse import quote
+from flask import Blueprint, Response, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import (db, User, UserProgress, UserProfile, Company, UserCompany, CompanyDayAccess,
                      Event, FreeResource, UserFreeResourceEnrollment,
@@ -20,6 +21,18 @@ from email_service import send_password_reset_email, send_verification_email
 from datetime import datetime
 import secrets
 from redis_kernel_manager import RedisKernelManager
+from execution_jobs import ExecutionJobManager, TooManyQueuedJobs
+from execution_scheduler import FairShareScheduler, ExecutionQueueTimeout
+from execution_cache import ExecutionCache, code_cells, notebook_hash
+from content_catalog import ContentCatalog
+from notebook_cache import SerializedFileCache, cached_json_response
+from notebook_views import NotebookViews
+from search_index import SearchIndex
+from pdf_pages import PdfPageIndexer, sidecar_path
+from pdf_thumbnails import PdfThumbnails
+from chunked_upload import ChunkedUploads, UploadError
+from file_utils import write_atomic
+from blob_store import BlobStore, link_digest
 
 api = Blueprint('api', __name__)
 
@@ -28,6 +41,15 @@ api = Blueprint('api', __name__)
 # Redis-based kernel manager (works across multiple Gunicorn workers)
 kernel_manager = RedisKernelManager()
 
+# Fair-share admission of cell executions on this worker
+scheduler = FairShareScheduler()
+
+# Background cell execution jobs (state in Redis when available)
+job_manager = ExecutionJobManager(kernel_manager, scheduler)
+
+# Memoized outputs of notebook cells flagged as cacheable
+execution_cache = ExecutionCache(kernel_manager.redis_client if kernel_manager.redis_available else None)
+
 
 @api.route('/auth/register', methods=['POST'])
 def register():
@@ -228,98 +250,106 @@ def _get_public_folder():
     return public_folder
 
 
-def _discover_day_folders():
-    """Return a mapping {day_number: absolute_folder_path}.
+# Cached index of public/ (day folders, files, metadata), shared by this process
+content_catalog = ContentCatalog(_get_public_folder)
 
-    Discovery rules:
-      1. Top-level `public/dayN/` folders — day_number from the folder name.
-      2. Any other top-level folder is treated as a *course bucket* and is
-         walked one level deep. Each sub-folder containing a `metadata.json`
-         with a numeric `day_number` is registered. This lets nested courses
-         (e.g. `public/student_course/module1_.../`) plug in without touching
-         the existing `dayN` numbering.
-    """
-    public_folder = _get_public_folder()
-    if not os.path.exists(public_folder):
-        return {}
+# Pre-serialized, pre-compressed notebook JSON, with each notebook's code cells
+notebook_cache = SerializedFileCache(summarize=code_cells)
 
-    mapping = {}
-    for item in sorted(os.listdir(public_folder)):
-        item_path = os.path.join(public_folder, item)
-        if not os.path.isdir(item_path):
-            continue
+# Notebooks without their large saved outputs (images become asset URLs)
+notebook_views = NotebookViews()
+
+# Full-text index of day content and free resources
+search_index = SearchIndex()
+
+# Background extraction of PDF page text (sidecar files next to each PDF) and page previews
+pdf_thumbnails = PdfThumbnails()
+pdf_indexer = PdfPageIndexer(thumbnails=pdf_thumbnails)
+
+
+def _sync_content_indexes():
+    """Bring the search index and PDF page indexes in line with the content catalog"""
+    days = content_catalog.days()
+    pdf_indexer.ensure(days)
+    search_index.sync_days(days)
+    return days
 
-        # Case 1 — legacy top-level dayN folder.
-        if item.startswith('day'):
-            try:
-                mapping[int(item.replace('day', ''))] = item_path
-                continue
-            except ValueError:
-                pass  # fall through to bucket scan
 
-        # Case 2 — course bucket, recurse one level for explicit day_number.
+# Course files stored once by sha256 under public/.blobs, linked from the day folders
+blob_store = BlobStore(_get_public_folder)
+
+
+def _after_content_change(filepath=None):
+    """Refresh everything derived from public/ after an admin change; filepath is a new or replaced file"""
+    blob_store.collect_unlinked()  # blobs of deleted or replaced files, if there are any
+    content_catalog.invalidate()
+    _sync_content_indexes()  # also queues page extraction and thumbnails for new PDFs
+    if filepath and filepath.endswith('.ipynb'):
+        # So the first learner to open it does not pay for slimming it
         try:
-            sub_items = sorted(os.listdir(item_path))
-        except OSError:
-            continue
-        for sub in sub_items:
-            sub_path = os.path.join(item_path, sub)
-            if not os.path.isdir(sub_path):
-                continue
-            meta_path = os.path.join(sub_path, 'metadata.json')
-            if not os.path.exists(meta_path):
-                continue
-            try:
-                with open(meta_path, 'r') as f:
-                    meta = json.load(f)
-            except (OSError, json.JSONDecodeError):
-                continue
-            n = meta.get('day_number')
-            if isinstance(n, int):
-                mapping[n] = sub_path
-    return mapping
+            notebook_views.build(filepath)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not build slim view of {filepath}: {e}")
+
+
+# Resumable chunked uploads of course files (sessions under public/.uploads)
+chunked_uploads = ChunkedUploads(_get_public_folder, blobs=blob_store)
+
+# Who transfers protected files once access has been checked:
+# direct (this worker) | x-accel (nginx X-Accel-Redirect) | x-sendfile (Apache/lighttpd)
+FILE_DELIVERY = os.environ.get('FILE_DELIVERY', 'direct').lower()
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/protected-content/')
+
+
+def _send_content_file(path, mimetype, etag=None):
+    """Send a file from public/ after the caller's access checks.
+
+    Direct delivery answers Range (206), If-None-Match and If-Modified-Since
+    itself, with etag (the content hash, when known) as the ETag. The proxy modes return an empty response naming the file, and the
+    front proxy does the transfer (including ranges) with sendfile.
+    """
+    if FILE_DELIVERY == 'x-accel':
+        relative = os.path.relpath(path, _get_public_folder()).replace(os.sep, '/')
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative)
+        return response
+    if FILE_DELIVERY == 'x-sendfile':
+        response = Response(mimetype=mimetype)
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+        return response
+
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=etag or True)
+    # Access is per user: browsers may keep a copy but must revalidate it
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 def _resolve_day_path(day_number):
-    """Return the on-disk folder for a day_number, or None if unknown."""
-    return _discover_day_folders().get(day_number)
+    """Return the on-disk folder for a day_number, or None if unknown.
+
+    See content_catalog.build() for the discovery rules.
+    """
+    return content_catalog.resolve(day_number)
 
 
 def _scan_days(allowed_day_numbers=None):
-    """Scan filesystem for day folders. If allowed_day_numbers is None, return all days.
+    """List day summaries from the content catalog. If allowed_day_numbers is None, return all days.
     If it's a set, filter to only those days."""
-    folders = _discover_day_folders()
     days = []
-    for day_number in sorted(folders.keys()):
-        if allowed_day_numbers is not None and day_number not in allowed_day_numbers:
-            continue
-        item_path = folders[day_number]
-
-        notebooks = []
-        pdfs = []
-        for file in os.listdir(item_path):
-            if file.endswith('.ipynb'):
-                notebooks.append(file)
-            elif file.endswith('.pdf'):
-                pdfs.append(file)
-
-        metadata_path = os.path.join(item_path, 'metadata.json')
-        metadata = {}
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-
-        videos = metadata.get('videos', [])
+    for entry in content_catalog.list_days(allowed_day_numbers):
+        notebooks = entry['notebooks']
+        pdfs = entry['pdfs']
+        videos = entry['videos']
 
         days.append({
-            'day_number': day_number,
-            'title': metadata.get('title', f'Day {day_number}'),
-            'description': metadata.get('description', ''),
+            'day_number': entry['day_number'],
+            'title': entry['title'],
+            'description': entry['description'],
             'notebooks': len(notebooks),
             'pdfs': len(pdfs),
             'videos': len(videos),
             'total_resources': len(notebooks) + len(pdfs) + len(videos),
-            'level': metadata.get('level', ''),
+            'level': entry['level'],
         })
     return days
 
@@ -390,73 +420,129 @@ def get_day_content(day_number):
     if access_error:
         return access_error
 
-    day_folder = _resolve_day_path(day_number)
-    if not day_folder or not os.path.exists(day_folder):
+    entry = content_catalog.day(day_number)
+    if not entry:
         return jsonify({'error': 'Day not found'}), 404
 
     # Auto-track progress on content access
     _auto_track_progress(user_id, day_number)
-
-    notebooks = []
-    pdfs = []
-
-    for file in os.listdir(day_folder):
-        if file.endswith('.ipynb'):
-            notebooks.append({
-                'filename': file,
-                'name': file.replace('.ipynb', '').replace('_', ' ').title(),
-                'type': 'notebook'
-            })
-        elif file.endswith('.pdf'):
-            pdfs.append({
-                'filename': file,
-                'name': file.replace('.pdf', '').replace('_', ' ').title(),
-                'type': 'pdf'
-            })
-
-    metadata_path = os.path.join(day_folder, 'metadata.json')
-    metadata = {}
-    if os.path.exists(metadata_path):
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-
-    videos = metadata.get('videos', [])
+    pdf_indexer.ensure(content_catalog.days())
+
+    notebooks = [{
+        'filename': file,
+        'name': file.replace('.ipynb', '').replace('_', ' ').title(),
+        'type': 'notebook'
+    } for file in entry['notebooks']]
+    pdfs = [{
+        'filename': file['name'],
+        'name': file['name'].replace('.pdf', '').replace('_', ' ').title(),
+        'type': 'pdf',
+        'pages': file['pages'],
+        'thumbnails': _pdf_thumbnail_urls(day_number, file),
+    } for file in entry['files'] if file['type'] == 'pdf']
 
     return jsonify({
         'day_number': day_number,
-        'title': metadata.get('title', f'Day {day_number}'),
-        'description': metadata.get('description', ''),
-        'level': metadata.get('level', ''),
+        'title': entry['title'],
+        'description': entry['description'],
+        'level': entry['level'],
         'notebooks': notebooks,
         'pdfs': pdfs,
-        'videos': videos
+        'videos': entry['videos']
     }), 200
 
 
+def _pdf_thumbnail_urls(day_number, file):
+    """Thumbnail URLs of a catalog PDF, relative to the API root (empty until rendered)"""
+    count = pdf_thumbnails.rendered(file['sha256']) if file['sha256'] else None
+    return [f"/days/{day_number}/pdf-thumbnails/{file['sha256']}/{page}.jpg" for page in range(1, (count or 0) + 1)]
+
+
+@api.route('/days/<int:day_number>/pdf-thumbnails/<digest>/<int:page>.jpg', methods=['GET'])
+@jwt_required()
+def get_pdf_thumbnail(day_number, digest, page):
+    """Preview image of a PDF page; the URL names the PDF's content hash, so it never changes"""
+    user_id = int(get_jwt_identity())
+    access_error = _check_day_access(user_id, day_number)
+    if access_error:
+        return access_error
+
+    entry = content_catalog.day(day_number)
+    if not entry or not any(f['sha256'] == digest for f in entry['files'] if f['type'] == 'pdf'):
+        return jsonify({'error': 'PDF not found'}), 404
+    thumbnail_path = pdf_thumbnails.path(digest, page)
+    if not thumbnail_path:
+        return jsonify({'error': 'Thumbnail not available'}), 404
+
+    response = send_file(thumbnail_path, mimetype='image/jpeg', conditional=True, etag=f'{digest}-{page}')
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
 @api.route('/days/<int:day_number>/notebook/<filename>', methods=['GET'])
 @jwt_required()
 def get_notebook(day_number, filename):
-    """Get notebook content"""
+    """Get notebook content (large saved outputs stripped; ?view=full for the file as uploaded)"""
     user_id = int(get_jwt_identity())
+    notebook_path, error = _resolve_notebook_path(user_id, day_number, filename)
+    if error:
+        return error
+
+    try:
+        if request.args.get('view') != 'full':
+            entry = notebook_cache.get(notebook_views.view_path(notebook_path))
+        else:
+            entry = _notebook_entry(notebook_path)
+    except (OSError, ValueError) as e:
+        print(f"⚠ Could not read notebook {notebook_path}: {e}")
+        return jsonify({'error': 'Notebook could not be read'}), 500
+    return cached_json_response(entry)
+
+
+def _notebook_entry(notebook_path):
+    """notebook_cache entry of a day notebook as uploaded"""
+    # Blob-stored copies in several days share one entry, tagged with their content hash
+    digest = link_digest(notebook_path)
+    if digest:
+        return notebook_cache.get(blob_store.blob_path(digest), etag=digest)
+    return notebook_cache.get(notebook_path)
+
+
+@api.route('/notebook-assets/<name>', methods=['GET'])
+def get_notebook_asset(name):
+    """Image taken out of a notebook's saved outputs.
+
+    Not behind auth: the name is the sha256 of the image, only learners who
+    could load the notebook know it, and the content can never change.
+    """
+    asset_path, mimetype = notebook_views.asset(name)
+    if not asset_path:
+        return jsonify({'error': 'Asset not found'}), 404
+
+    response = send_file(asset_path, mimetype=mimetype, conditional=True, etag=name.split('.')[0])
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def _resolve_notebook_path(user_id, day_number, filename):
+    """Validate access and filename for a day's notebook.
+
+    Returns (path, None) on success or (None, error_response).
+    """
     access_error = _check_day_access(user_id, day_number)
     if access_error:
-        return access_error
+        return None, access_error
 
     # Security: validate filename to prevent directory traversal
     if not filename.endswith('.ipynb') or '/' in filename or '\\' in filename:
-        return jsonify({'error': 'Invalid filename'}), 400
+        return None, (jsonify({'error': 'Invalid filename'}), 400)
 
     day_folder = _resolve_day_path(day_number)
     if not day_folder:
-        return jsonify({'error': 'Day not found'}), 404
-    notebook_path = os.path.join(day_folder, filename)
-    if not os.path.exists(notebook_path):
-        return jsonify({'error': 'Notebook not found'}), 404
-
-    with open(notebook_path, 'r', encoding='utf-8') as f:
-        notebook_content = json.load(f)
-
-    return jsonify(notebook_content), 200
+        return None, (jsonify({'error': 'Day not found'}), 404)
+    if not content_catalog.has_file(day_number, filename):
+        return None, (jsonify({'error': 'Notebook not found'}), 404)
+    return os.path.join(day_folder, filename), None
 
 
 @api.route('/days/<int:day_number>/pdf/<filename>', methods=['GET'])
@@ -475,11 +561,11 @@ def get_pdf(day_number, filename):
     day_folder = _resolve_day_path(day_number)
     if not day_folder:
         return jsonify({'error': 'Day not found'}), 404
-    pdf_path = os.path.join(day_folder, filename)
-    if not os.path.exists(pdf_path):
+    if not content_catalog.has_file(day_number, filename):
         return jsonify({'error': 'PDF not found'}), 404
+    pdf_path = os.path.join(day_folder, filename)
 
-    return send_file(pdf_path, mimetype='application/pdf')
+    return _send_content_file(pdf_path, 'application/pdf', etag=link_digest(pdf_path))
 
 
 @api.route('/progress', methods=['GET'])
@@ -617,45 +703,14 @@ def admin_list_content_days():
     if not user or not user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
 
-    public_folder = _get_public_folder()
-    if not os.path.exists(public_folder):
-        return jsonify({'days': []}), 200
-
-    days = []
-    for item in sorted(os.listdir(public_folder)):
-        item_path = os.path.join(public_folder, item)
-        if os.path.isdir(item_path) and item.startswith('day'):
-            try:
-                day_number = int(item.replace('day', ''))
-            except ValueError:
-                continue
-
-            files = []
-            for f in sorted(os.listdir(item_path)):
-                if f == 'metadata.json':
-                    continue
-                fpath = os.path.join(item_path, f)
-                if os.path.isfile(fpath):
-                    files.append({
-                        'name': f,
-                        'size': os.path.getsize(fpath),
-                        'type': 'notebook' if f.endswith('.ipynb') else 'pdf' if f.endswith('.pdf') else 'other',
-                    })
-
-            metadata = {}
-            meta_path = os.path.join(item_path, 'metadata.json')
-            if os.path.exists(meta_path):
-                with open(meta_path, 'r') as mf:
-                    metadata = json.load(mf)
-
-            days.append({
-                'day_number': day_number,
-                'folder': item,
-                'title': metadata.get('title', f'Day {day_number}'),
-                'description': metadata.get('description', ''),
-                'files': files,
-                'metadata': metadata,
-            })
+    days = [{
+        'day_number': entry['day_number'],
+        'folder': entry['folder'],
+        'title': entry['title'],
+        'description': entry['description'],
+        'files': [{'name': f['name'], 'size': f['size'], 'type': f['type'], 'pages': f['pages']} for f in entry['files']],
+        'metadata': entry['metadata'],
+    } for entry in content_catalog.list_days()]
 
     return jsonify({'days': days}), 200
 
@@ -676,30 +731,134 @@ def admin_upload_content(day_number):
     if not file.filename:
         return jsonify({'error': 'No file selected'}), 400
 
-    # Validate file extension
+    filename, error = _upload_filename(file.filename)
+    if error:
+        return error
+
+    # Written aside and renamed (or linked) into place, so a partial file is never served
+    filepath = _upload_target(day_number, filename)
+    if blob_store.enabled:
+        blob_store.save(filepath, file.save)
+    else:
+        write_atomic(filepath, file.save)
+    _after_content_change(filepath)
+
+    return jsonify({'message': f'File {filename} uploaded successfully', 'filename': filename}), 201
+
+
+def _upload_filename(name):
+    """Validate an uploaded file name; returns (safe filename, None) or (None, error response)"""
     allowed_extensions = {'.ipynb', '.pdf'}
-    _, ext = os.path.splitext(file.filename.lower())
+    _, ext = os.path.splitext(name.lower())
     if ext not in allowed_extensions:
-        return jsonify({'error': f'Only .ipynb and .pdf files are allowed, got {ext}'}), 400
+        return None, (jsonify({'error': f'Only .ipynb and .pdf files are allowed, got {ext}'}), 400)
 
     from werkzeug.utils import secure_filename
-    filename = secure_filename(file.filename)
+    filename = secure_filename(name)
     if not filename:
-        return jsonify({'error': 'Invalid filename'}), 400
+        return None, (jsonify({'error': 'Invalid filename'}), 400)
+    return filename, None
+
 
+def _upload_target(day_number, filename):
+    """Final path of an uploaded file"""
     # Resolve existing folder (handles nested modules); fall back to creating
     # a fresh top-level dayN/ when this is a brand-new day_number.
     day_folder = _resolve_day_path(day_number)
     if not day_folder:
         day_folder = os.path.join(_get_public_folder(), f'day{day_number}')
     os.makedirs(day_folder, exist_ok=True)
+    return os.path.join(day_folder, filename)
 
-    filepath = os.path.join(day_folder, filename)
-    file.save(filepath)
 
+@api.route('/admin/content/days/<int:day_number>/uploads', methods=['POST'])
+@jwt_required()
+def admin_start_chunked_upload(day_number):
+    """Start a resumable upload: JSON {filename, size, sha256 (optional, whole file)}.
+
+    Returns the upload_id, chunk_size and number of chunks. Each chunk is then
+    PUT as the raw request body, optionally with an X-Chunk-SHA256 header.
+    """
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    data = request.get_json() or {}
+    filename, error = _upload_filename(data.get('filename') or '')
+    if error:
+        return error
+    try:
+        status = chunked_uploads.create(day_number, filename, data.get('size'), data.get('sha256'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(status), 201
+
+
+@api.route('/admin/content/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def admin_chunked_upload_status(upload_id):
+    """Chunks received so far, to resume an interrupted upload"""
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    try:
+        return jsonify(chunked_uploads.status(chunked_uploads.load(upload_id))), 200
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+
+
+@api.route('/admin/content/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@jwt_required()
+def admin_put_upload_chunk(upload_id, index):
+    """Store one chunk, streamed from the request body"""
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    try:
+        session = chunked_uploads.load(upload_id)
+        status = chunked_uploads.write_chunk(session, index, request.stream, request.content_length,
+                                             request.headers.get('X-Chunk-SHA256'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify({'received': len(status['received']), 'chunks': status['chunks']}), 200
+
+
+@api.route('/admin/content/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def admin_complete_chunked_upload(upload_id):
+    """Move a fully received upload into its day folder"""
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    try:
+        session = chunked_uploads.load(upload_id)
+        filepath = chunked_uploads.complete(session, lambda: _upload_target(session['day_number'], session['filename']))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    _after_content_change(filepath)
+
+    filename = session['filename']
     return jsonify({'message': f'File {filename} uploaded successfully', 'filename': filename}), 201
 
 
+@api.route('/admin/content/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def admin_abort_chunked_upload(upload_id):
+    """Discard an upload session"""
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    try:
+        chunked_uploads.abort(chunked_uploads.load(upload_id))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify({'message': 'Upload discarded'}), 200
+
+
 @api.route('/admin/content/days/<int:day_number>/files/<filename>', methods=['DELETE'])
 @jwt_required()
 def admin_delete_content_file(day_number, filename):
@@ -717,10 +876,13 @@ def admin_delete_content_file(day_number, filename):
     if not day_folder:
         return jsonify({'error': 'Day not found'}), 404
     filepath = os.path.join(day_folder, filename)
-    if not os.path.exists(filepath):
+    if not os.path.lexists(filepath):
         return jsonify({'error': 'File not found'}), 404
 
-    os.remove(filepath)
+    blob_store.remove(filepath)
+    if filename.endswith('.pdf') and os.path.exists(sidecar_path(filepath)):
+        os.remove(sidecar_path(filepath))
+    _after_content_change()
     return jsonify({'message': f'File {filename} deleted'}), 200
 
 
@@ -752,14 +914,46 @@ def admin_update_metadata(day_number):
 
     with open(meta_path, 'w') as f:
         json.dump(existing, f, indent=2)
+    _after_content_change()
 
     return jsonify({'message': 'Metadata updated', 'metadata': existing}), 200
 
 
+def _cell_cache_key(user_id, data, code):
+    """Execution cache key for a cell run from a day notebook, or None.
+
+    Only applies when the request names the notebook cell (day_number,
+    filename, cell_index), that cell is flagged as cacheable, and the code
+    is the cell's own source: an edited cell may depend on the learner's
+    state, so its outputs must never be shared.
+    """
+    day_number = data.get('day_number')
+    filename = data.get('filename')
+    cell_index = data.get('cell_index')
+    if not isinstance(day_number, int) or not isinstance(cell_index, int) or not filename:
+        return None
+
+    notebook_path, error = _resolve_notebook_path(user_id, day_number, filename)
+    if error:
+        return None
+    try:
+        cell = _notebook_entry(notebook_path)['summary']['code'].get(cell_index)
+    except (OSError, ValueError):
+        return None  # an unreadable notebook just means no caching
+    if not cell or not cell[1] or cell[0] != code:
+        return None
+    return ExecutionCache.key(notebook_hash(notebook_path), cell_index, code)
+
+
 @api.route('/execute/cell', methods=['POST'])
 @jwt_required()
 def execute_cell():
-    """Execute a notebook cell on the server"""
+    """Execute a notebook cell on the server
+
+    If the body also names the notebook cell (day_number, filename,
+    cell_index) and the cell is flagged cacheable, stored outputs are
+    returned without running the kernel.
+    """
     user_id = int(get_jwt_identity())
     data = request.get_json()
     code = data.get('code')
@@ -767,15 +961,245 @@ def execute_cell():
     if not code:
         return jsonify({'error': 'No code provided'}), 400
 
+    cache_key = _cell_cache_key(user_id, data, code)
+    if cache_key:
+        outputs = execution_cache.get(cache_key)
+        if outputs is not None:
+            return jsonify({'success': True, 'outputs': outputs, 'cached': True}), 200
+
     # Get kernel for this user (Redis-managed)
     kernel = kernel_manager.get_kernel(user_id)
 
     print(f"Executing code for user {user_id}: {code[:50]}...")
-    result = kernel.execute_cell(code)
+    try:
+        with scheduler.slot(user_id):
+            result = kernel.execute_cell(code)
+    except ExecutionQueueTimeout as e:
+        return jsonify({'success': False, 'error': str(e), 'type': 'error'}), 503
     print(f"Execution result: {result.get('success')}")
+    if cache_key and result.get('success'):
+        execution_cache.put(cache_key, result['outputs'])
     return jsonify(result), 200
 
 
+def _sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@api.route('/execute/cell/stream', methods=['POST'])
+@jwt_required()
+def execute_cell_stream():
+    """Execute a notebook cell, streaming outputs as Server-Sent Events
+
+    Each output is sent as an event named after its type (stream,
+    display_data, execute_result, error), followed by a final `done` event.
+    Notices about the session (such as a restore) arrive as `status` events.
+    Cacheable notebook cells are served from the execution cache as in
+    /execute/cell.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    code = data.get('code')
+
+    if not code:
+        return jsonify({'error': 'No code provided'}), 400
+
+    cache_key = _cell_cache_key(user_id, data, code)
+    cached = execution_cache.get(cache_key) if cache_key else None
+    kernel = kernel_manager.get_kernel(user_id) if cached is None else None
+    print(f"Streaming execution for user {user_id}: {code[:50]}...")
+
+    def generate():
+        if cached is not None:
+            for output in cached:
+                yield _sse_event(output['type'], output)
+            yield _sse_event('done', {'success': True, 'cached': True})
+            return
+
+        outputs = []
+        try:
+            with scheduler.slot(user_id):
+                for output in kernel.execute_cell_stream(code):
+                    if output['type'] != 'status':  # session notices are not cell output
+                        outputs.append(output)
+                    yield _sse_event(output['type'], output)
+        except Exception as e:
+            yield _sse_event('done', {'success': False, 'error': str(e)})
+            return
+        if cache_key:
+            execution_cache.put(cache_key, outputs)
+        yield _sse_event('done', {'success': True})
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@api.route('/execute/notebook', methods=['POST'])
+@jwt_required()
+def execute_notebook():
+    """Run a range of a day notebook's code cells back-to-back in the user's kernel
+
+    Body: day_number, filename, optional start/end cell indexes (end exclusive),
+    stop_on_error (default true) and overrides ({cell_index: edited source}).
+    Streams Server-Sent Events: cell_start, the cell's outputs (tagged with
+    cell_index), cell_done, and a final done event. Cells flagged cacheable
+    are answered from the execution cache when possible (cell_done has
+    cached: true); the kernel is only started once a cell actually runs.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    day_number = data.get('day_number')
+    filename = data.get('filename') or ''
+    if not isinstance(day_number, int):
+        return jsonify({'error': 'day_number is required'}), 400
+
+    notebook_path, error = _resolve_notebook_path(user_id, day_number, filename)
+    if error:
+        return error
+
+    try:
+        cells = _notebook_entry(notebook_path)['summary']
+    except (OSError, ValueError) as e:
+        print(f"⚠ Could not read notebook {notebook_path}: {e}")
+        return jsonify({'error': 'Notebook could not be read'}), 500
+
+    start = data.get('start', 0)
+    end = data.get('end', cells['count'])
+    if not isinstance(start, int) or not isinstance(end, int) or not 0 <= start <= end:
+        return jsonify({'error': 'Invalid cell range'}), 400
+    stop_on_error = data.get('stop_on_error', True)
+    overrides = data.get('overrides') or {}
+    if not isinstance(overrides, dict) or not all(isinstance(source, str) for source in overrides.values()):
+        return jsonify({'error': 'overrides must map cell indexes to source strings'}), 400
+
+    digest = notebook_hash(notebook_path)
+    to_run = []
+    for index in range(start, min(end, cells['count'])):
+        if index not in cells['code']:
+            continue
+        source, cacheable = cells['code'][index]
+        if str(index) in overrides:
+            # Edited by the learner: may depend on their state, so never cached
+            source, cacheable = overrides[str(index)], False
+        if source.strip():
+            cache_key = ExecutionCache.key(digest, index, source) if cacheable else None
+            to_run.append((index, source, cache_key))
+
+    print(f"Running {len(to_run)} cells of {filename} for user {user_id}")
+
+    def generate():
+        executed = 0
+        kernel = None
+        for index, source, cache_key in to_run:
+            yield _sse_event('cell_start', {'cell_index': index})
+            cached = execution_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                for output in cached:
+                    yield _sse_event(output['type'], {**output, 'cell_index': index})
+                executed += 1
+                yield _sse_event('cell_done', {'cell_index': index, 'success': True, 'has_error': False, 'cached': True})
+                continue
+
+            has_error = False
+            outputs = []
+            try:
+                if kernel is None:
+                    kernel = kernel_manager.get_kernel(user_id)
+                # One slot per cell, so a long notebook run takes turns with other users
+                with scheduler.slot(user_id):
+                    for output in kernel.execute_cell_stream(source):
+                        has_error = has_error or output['type'] == 'error'
+                        if output['type'] != 'status':  # session notices are not cell output
+                            outputs.append(output)
+                        yield _sse_event(output['type'], {**output, 'cell_index': index})
+            except Exception as e:
+                yield _sse_event('cell_done', {'cell_index': index, 'success': False, 'error': str(e)})
+                yield _sse_event('done', {'success': False, 'executed': executed, 'stopped_at': index})
+                return
+            executed += 1
+            if cache_key:
+                execution_cache.put(cache_key, outputs)
+            yield _sse_event('cell_done', {'cell_index': index, 'success': True, 'has_error': has_error})
+            if has_error and stop_on_error:
+                yield _sse_event('done', {'success': True, 'executed': executed, 'stopped_at': index})
+                return
+        yield _sse_event('done', {'success': True, 'executed': executed, 'stopped_at': None})
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@api.route('/execute/jobs', methods=['POST'])
+@jwt_required()
+def submit_execution_job():
+    """Queue a notebook cell for background execution and return its job id"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    code = data.get('code')
+
+    if not code:
+        return jsonify({'error': 'No code provided'}), 400
+
+    try:
+        job = job_manager.submit(user_id, code)
+    except TooManyQueuedJobs as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify({'job_id': job['job_id'], 'status': job['status']}), 202
+
+
+@api.route('/execute/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_execution_job(job_id):
+    """Get a job's status and outputs
+
+    Query params: `since` skips outputs already received, `wait` (seconds, max 25)
+    long-polls until the job finishes or produces new output.
+    """
+    user_id = int(get_jwt_identity())
+    since = max(0, request.args.get('since', 0, type=int))
+    wait = min(max(0.0, request.args.get('wait', 0, type=float)), 25.0)
+
+    job = job_manager.get(job_id)
+    if not job or job['user_id'] != user_id:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if wait:
+        job = job_manager.wait(job_id, wait, since)
+    else:
+        job = job_manager.get(job_id, since)
+    return jsonify(job), 200
+
+
+@api.route('/execute/jobs/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_execution_job(job_id):
+    """Cancel a queued job, or interrupt the kernel if it is running"""
+    user_id = int(get_jwt_identity())
+    job = job_manager.get(job_id)
+    if not job or job['user_id'] != user_id:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] not in job_manager.FINISHED_STATES:
+        job_manager.cancel(job_id)
+    return jsonify({'job_id': job_id, 'status': job_manager.get(job_id)['status']}), 200
+
+
+@api.route('/execute/outputs/<ref>', methods=['GET'])
+@jwt_required()
+def get_spilled_output(ref):
+    """Fetch a large cell output that was spilled to disk (supports Range requests)"""
+    user_id = int(get_jwt_identity())
+    path = kernel_manager.output_store.path(user_id, ref)
+    if not path:
+        return jsonify({'error': 'Output not found'}), 404
+    return send_file(path, conditional=True, max_age=0)
+
+
 @api.route('/execute/restart', methods=['POST'])
 @jwt_required()
 def restart_kernel():
@@ -867,6 +1291,23 @@ def admin_required(fn):
     return wrapper
 
 
+@api.route('/admin/kernels/stats', methods=['GET'])
+@admin_required
+def get_kernel_stats():
+    """Get notebook kernel usage for this worker (live kernels, pool hits/misses, execution queue)"""
+    return jsonify({
+        **kernel_manager.get_stats(),
+        'scheduler': scheduler.get_stats(),
+        'execution_cache': execution_cache.get_stats(),
+        'notebook_cache': notebook_cache.get_stats(),
+        'notebook_views': notebook_views.get_stats(),
+        'search_index': search_index.get_stats(),
+        'pdf_pages': pdf_indexer.get_stats(),
+        'pdf_thumbnails': pdf_thumbnails.get_stats(),
+        'blob_store': blob_store.get_stats(),
+    }), 200
+
+
 @api.route('/admin/analytics', methods=['GET'])
 @admin_required
 def get_analytics():
@@ -2110,6 +2551,16 @@ def update_item_progress(day_number):
     if not item_type or not item_identifier:
         return jsonify({'error': 'item_type and item_identifier required'}), 400
 
+    if item_type == 'pdf_page':
+        # "<filename>#page=<n>", checked against the PDF's page index when it has one
+        filename, _, page = item_identifier.partition('#page=')
+        entry = content_catalog.day(day_number)
+        pdf = next((f for f in entry['files'] if f['name'] == filename), None) if entry else None
+        if not pdf or pdf['type'] != 'pdf' or not page.isdigit():
+            return jsonify({'error': 'pdf_page item_identifier must be "<filename>#page=<n>" for a PDF of this day'}), 400
+        if pdf['pages'] is not None and not 1 <= int(page) <= pdf['pages']:
+            return jsonify({'error': f"{filename} has {pdf['pages']} pages"}), 400
+
     item = ContentItemProgress.query.filter_by(
         user_id=user_id, day_number=day_number,
         item_type=item_type, item_identifier=item_identifier
@@ -2212,56 +2663,35 @@ def search():
 
     accessible_days = get_accessible_days_for_user(user_id)
 
-    # Search days via metadata
-    day_results = []
-    public_folder = _get_public_folder()
-    if os.path.exists(public_folder):
-        for item in sorted(os.listdir(public_folder)):
-            item_path = os.path.join(public_folder, item)
-            if not os.path.isdir(item_path) or not item.startswith('day'):
-                continue
-            try:
-                day_num = int(item.replace('day', ''))
-            except ValueError:
-                continue
-            if accessible_days is not None and day_num not in accessible_days:
-                continue
+    days = _sync_content_indexes()
+    # Cheap change check, so the resource table is only read when it changed
+    search_index.sync_resources(
+        tuple(db.session.query(db.func.count(FreeResource.id), db.func.max(FreeResource.id),
+                               db.func.max(FreeResource.updated_at)).one()),
+        FreeResource.query.all)
+    matches = search_index.search(query)
 
-            meta_path = os.path.join(item_path, 'metadata.json')
-            title = f'Day {day_num}'
-            description = ''
-            if os.path.exists(meta_path):
-                with open(meta_path, 'r') as f:
-                    meta = json.load(f)
-                    title = meta.get('title', title)
-                    description = meta.get('description', '')
-
-            if query in title.lower() or query in description.lower():
-                day_results.append({
-                    'day_number': day_num,
-                    'title': title,
-                    'description': description,
-                    'type': 'day',
-                })
-
-    # Search free resources
-    resource_results = []
-    resources = FreeResource.query.all()
-    for r in resources:
-        searchable = f"{r.title} {r.description or ''} {r.instructor or ''} {r.category or ''}".lower()
-        if query in searchable:
-            resource_results.append({
-                'id': r.id,
-                'title': r.title,
-                'description': r.description,
-                'instructor': r.instructor,
-                'type': 'resource',
-            })
+    day_results = [{
+        'day_number': day_number,
+        'title': days[day_number]['title'],
+        'description': days[day_number]['description'],
+        'type': 'day',
+    } for day_number in matches['days'] if day_number in days
+       and (accessible_days is None or day_number in accessible_days)]
+
+    resources = {r.id: r for r in FreeResource.query.filter(FreeResource.id.in_(matches['resources'][:10])).all()}
+    resource_results = [{
+        'id': r.id,
+        'title': r.title,
+        'description': r.description,
+        'instructor': r.instructor,
+        'type': 'resource',
+    } for r in (resources.get(i) for i in matches['resources'][:10]) if r]
 
     return jsonify({
         'days': day_results[:10],
-        'resources': resource_results[:10],
-        'total': len(day_results) + len(resource_results),
+        'resources': resource_results,
+        'total': len(day_results) + len(matches['resources']),
     }), 200
 
 
@@ -2333,39 +2763,15 @@ def get_recommendations():
     completed_set = {p.day_number for p in completed_progress if p.completed}
     started_set = {p.day_number for p in completed_progress}
 
-    # Scan available days
-    public_folder = _get_public_folder()
-    available_days = []
-    if os.path.exists(public_folder):
-        for item in sorted(os.listdir(public_folder)):
-            if not item.startswith('day') or not os.path.isdir(os.path.join(public_folder, item)):
-                continue
-            try:
-                day_num = int(item.replace('day', ''))
-            except ValueError:
-                continue
-            if accessible_days is not None and day_num not in accessible_days:
-                continue
-
-            meta_path = os.path.join(public_folder, item, 'metadata.json')
-            title = f'Day {day_num}'
-            description = ''
-            level = ''
-            if os.path.exists(meta_path):
-                with open(meta_path, 'r') as f:
-                    meta = json.load(f)
-                    title = meta.get('title', title)
-                    description = meta.get('description', '')
-                    level = meta.get('level', '')
-
-            available_days.append({
-                'day_number': day_num,
-                'title': title,
-                'description': description,
-                'level': level,
-                'completed': day_num in completed_set,
-                'started': day_num in started_set,
-            })
+    # Available days from the content catalog
+    available_days = [{
+        'day_number': entry['day_number'],
+        'title': entry['title'],
+        'description': entry['description'],
+        'level': entry['level'],
+        'completed': entry['day_number'] in completed_set,
+        'started': entry['day_number'] in started_set,
+    } for entry in content_catalog.list_days(accessible_days)]
 
     recommendations = []
 
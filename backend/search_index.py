@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import sqlite3
+import tempfile
+import threading
+from threading import Lock
+
+from pdf_pages import read_page_index
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+    title, body,
+    kind UNINDEXED, ref UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    doc_rowid INTEGER NOT NULL
+);
+"""
+
+# bm25() column weights: a hit in a title counts for more than one in the body
+_TITLE_WEIGHT = 5.0
+_BODY_WEIGHT = 1.0
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def notebook_text(path):
+    """Markdown and code of a notebook, as one string"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            notebook = json.load(f)
+    except (OSError, ValueError):
+        return ''
+    parts = []
+    for cell in notebook.get('cells', []):
+        if cell.get('cell_type') in ('markdown', 'code'):
+            source = cell.get('source', '')
+            parts.append(''.join(source) if isinstance(source, list) else source)
+    return '\n'.join(parts)
+
+
+def pdf_text(path):
+    """Text of every page of a PDF, from its page index (empty until extracted)"""
+    index = read_page_index(path)
+    return '\n'.join(index['text']) if index else ''
+
+
+def match_query(query):
+    """FTS5 query for user input: every word must match, as a prefix"""
+    return ' '.join(f'"{token}"*' for token in _TOKEN.findall(query.lower()))
+
+
+class SearchIndex:
+    """
+    Full-text index of the course content, in an SQLite FTS5 table.
+
+    Holds one document per day metadata.json (title, description, level),
+    per notebook (markdown and code cells), per PDF (page text from its
+    page index, see pdf_pages) and per free resource. Queries match every word as a
+    prefix and rank with BM25, titles weighted above bodies.
+
+    Every indexed source keeps a signature (file size and mtime, or the
+    indexed fields), so syncing with a new catalog snapshot only re-reads
+    what changed. The database file (SEARCH_INDEX_PATH, default under
+    CONTENT_CACHE_DIR) is shared by all workers on the host.
+    """
+
+    def __init__(self, path=None):
+        content_dir = os.environ.get('CONTENT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'lms-content-cache')
+        self.path = path or os.environ.get('SEARCH_INDEX_PATH') or os.path.join(content_dir, 'search.sqlite3')
+        self._local = threading.local()
+        self._sync_lock = Lock()
+        self._synced_days = None
+        self._resources_signature = None
+        self.documents_indexed = 0
+
+    # ── Storage ──
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _signatures(self, prefix):
+        rows = self._connection().execute("SELECT source, signature FROM sources WHERE source LIKE ?", (prefix + '%',))
+        return dict(rows)
+
+    def _put(self, source, signature, kind, ref, title, body):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("SELECT signature, doc_rowid FROM sources WHERE source = ?", (source,)).fetchone()
+            if row and row[0] == signature:
+                conn.execute('COMMIT')  # another worker got there first
+                return
+            if row:
+                conn.execute("DELETE FROM documents WHERE rowid = ?", (row[1],))
+            cursor = conn.execute("INSERT INTO documents (title, body, kind, ref) VALUES (?, ?, ?, ?)",
+                                  (title, body, kind, str(ref)))
+            conn.execute("INSERT OR REPLACE INTO sources (source, signature, doc_rowid) VALUES (?, ?, ?)",
+                         (source, signature, cursor.lastrowid))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self.documents_indexed += 1
+
+    def _drop(self, sources):
+        if not sources:
+            return
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for source in sources:
+                row = conn.execute("SELECT doc_rowid FROM sources WHERE source = ?", (source,)).fetchone()
+                if row:
+                    conn.execute("DELETE FROM documents WHERE rowid = ?", (row[0],))
+                    conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ── Syncing ──
+
+    def sync_days(self, days):
+        """Bring the day documents in line with a content catalog snapshot ({day_number: entry})"""
+        if days is self._synced_days:
+            return
+        with self._sync_lock:
+            if days is self._synced_days:
+                return
+            indexed = self._signatures('day:')
+            wanted = set()
+            for day_number, entry in days.items():
+                source = f"day:{day_number}:metadata"
+                signature = json.dumps([entry['title'], entry['description'], entry['level']])
+                wanted.add(source)
+                if indexed.get(source) != signature:
+                    self._put(source, signature, 'day', day_number, entry['title'],
+                              f"{entry['description']}\n{entry['level']}")
+
+                for file in entry['files']:
+                    if file['type'] not in ('notebook', 'pdf'):
+                        continue
+                    source = f"day:{day_number}:file:{file['name']}"
+                    signature = f"{file['size']}:{file['mtime']}:{file['pages']}"
+                    wanted.add(source)
+                    if indexed.get(source) != signature:
+                        path = os.path.join(entry['path'], file['name'])
+                        body = notebook_text(path) if file['type'] == 'notebook' else pdf_text(path)
+                        self._put(source, signature, 'day', day_number, os.path.splitext(file['name'])[0], body)
+
+            self._drop([source for source in indexed if source not in wanted])
+            self._synced_days = days
+
+    def sync_resources(self, signature, load_resources):
+        """Re-index free resources when their table signature changed.
+
+        load_resources() returns the resources; it is only called when needed.
+        """
+        if signature == self._resources_signature:
+            return
+        with self._sync_lock:
+            if signature == self._resources_signature:
+                return
+            indexed = self._signatures('resource:')
+            wanted = set()
+            for resource in load_resources():
+                source = f"resource:{resource.id}"
+                fields = [resource.title, resource.description or '', resource.instructor or '', resource.category or '']
+                resource_signature = json.dumps(fields)
+                wanted.add(source)
+                if indexed.get(source) != resource_signature:
+                    self._put(source, resource_signature, 'resource', resource.id, fields[0], '\n'.join(fields[1:]))
+            self._drop([source for source in indexed if source not in wanted])
+            self._resources_signature = signature
+
+    # ── Querying ──
+
+    def search(self, query):
+        """Matching day numbers and resource ids, best match first: {'days': [...], 'resources': [...]}"""
+        results = {'days': [], 'resources': []}
+        expression = match_query(query)
+        if not expression:
+            return results
+        rows = self._connection().execute(
+            "SELECT kind, ref FROM documents WHERE documents MATCH ? ORDER BY bm25(documents, ?, ?)",
+            (expression, _TITLE_WEIGHT, _BODY_WEIGHT))
+        seen = set()
+        for kind, ref in rows:
+            # A day matches through several documents; its best one decides its place
+            if (kind, ref) not in seen:
+                seen.add((kind, ref))
+                results['days' if kind == 'day' else 'resources'].append(int(ref))
+        return results
+
+    def get_stats(self):
+        try:
+            documents = self._connection().execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        except sqlite3.Error:
+            documents = None
+        return {
+            'path': self.path,
+            'documents': documents,
+            'documents_indexed': self.documents_indexed,
+        }
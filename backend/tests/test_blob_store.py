@@ -0,0 +1,102 @@
+import hashlib
+import os
+
+import pytest
+
+from blob_store import BlobStore, link_digest
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('CONTENT_BLOB_STORE', 'on')
+    for day in ('day1', 'day2'):
+        (tmp_path / day).mkdir()
+    return BlobStore(lambda: str(tmp_path))
+
+
+def save(store, path, data):
+    return store.save(str(path), lambda f: f.write(data))
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_save_links_the_file_to_its_blob(tmp_path, store):
+    digest = save(store, tmp_path / 'day1' / 'deck.pdf', b'slides')
+    assert digest == hashlib.sha256(b'slides').hexdigest()
+
+    link = tmp_path / 'day1' / 'deck.pdf'
+    assert os.path.islink(link)
+    assert not os.path.isabs(os.readlink(link))
+    assert link_digest(str(link)) == digest
+    assert read(link) == b'slides'
+    assert os.stat(store.blob_path(digest)).st_mode & 0o777 == 0o644
+
+
+def test_identical_files_share_one_blob(tmp_path, store):
+    save(store, tmp_path / 'day1' / 'deck.pdf', b'slides')
+    save(store, tmp_path / 'day2' / 'copy.pdf', b'slides')
+    stats = store.get_stats()
+    assert (stats['blobs'], stats['stored'], stats['deduplicated'], stats['bytes_saved']) == (1, 1, 1, 6)
+
+
+def test_add_converts_a_file_in_place(tmp_path, store):
+    path = tmp_path / 'day1' / 'lesson.ipynb'
+    path.write_bytes(b'{}')
+    digest = store.add(str(path), str(path))
+    assert link_digest(str(path)) == digest
+    assert read(path) == b'{}'
+
+
+def test_link_digest_of_plain_files_and_other_links(tmp_path):
+    plain = tmp_path / 'plain.pdf'
+    plain.write_bytes(b'x')
+    other = tmp_path / 'other.pdf'
+    os.symlink('plain.pdf', other)
+    assert link_digest(str(plain)) is None
+    assert link_digest(str(other)) is None
+    assert link_digest(str(tmp_path / 'missing.pdf')) is None
+
+
+def test_garbage_is_collected_only_after_a_link_is_dropped(tmp_path, store):
+    deck = tmp_path / 'day1' / 'deck.pdf'
+    save(store, deck, b'v1')
+    save(store, tmp_path / 'day2' / 'other.pdf', b'other')
+    assert store.collect_unlinked() == 0
+
+    # Re-uploading the same content drops no link
+    save(store, deck, b'v1')
+    assert store.collect_unlinked() == 0
+
+    old = link_digest(str(deck))
+    save(store, deck, b'v2')
+    assert read(deck) == b'v2'
+    assert store.collect_unlinked() == 1
+    assert not os.path.exists(store.blob_path(old))
+
+    store.remove(str(deck))
+    assert store.collect_unlinked() == 1
+    assert store.collect_unlinked() == 0
+    assert store.get_stats()['blobs'] == 1
+
+
+def test_shared_blob_survives_removing_one_link(tmp_path, store):
+    digest = save(store, tmp_path / 'day1' / 'deck.pdf', b'slides')
+    save(store, tmp_path / 'day2' / 'deck.pdf', b'slides')
+    store.remove(str(tmp_path / 'day1' / 'deck.pdf'))
+    assert store.collect_unlinked() == 0
+    assert read(tmp_path / 'day2' / 'deck.pdf') == b'slides'
+    assert os.path.exists(store.blob_path(digest))
+
+
+def test_failed_save_leaves_nothing_behind(tmp_path, store):
+    def fail(f):
+        f.write(b'partial')
+        raise OSError('client went away')
+
+    with pytest.raises(OSError):
+        store.save(str(tmp_path / 'day1' / 'deck.pdf'), fail)
+    assert not os.path.lexists(tmp_path / 'day1' / 'deck.pdf')
+    assert os.listdir(tmp_path / '.blobs' / 'tmp') == []
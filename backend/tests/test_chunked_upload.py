@@ -0,0 +1,108 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from blob_store import BlobStore, link_digest
+from chunked_upload import ChunkedUploads, UploadError
+
+DATA = bytes(range(256)) * 40  # 10240 bytes: three 4 KB chunks, the last one short
+
+
+@pytest.fixture
+def public(tmp_path, monkeypatch):
+    monkeypatch.setenv('UPLOAD_CHUNK_SIZE', '4096')
+    monkeypatch.setenv('UPLOAD_MAX_BYTES', '65536')
+    (tmp_path / 'day1').mkdir()
+    return tmp_path
+
+
+def send(uploads, session, index, data=DATA, sha256=None):
+    chunk = data[index * 4096:(index + 1) * 4096]
+    return uploads.write_chunk(session, index, io.BytesIO(chunk), len(chunk), sha256)
+
+
+def test_chunks_in_any_order_complete_to_the_file(public):
+    uploads = ChunkedUploads(lambda: str(public))
+    status = uploads.create(1, 'deck.pdf', len(DATA), hashlib.sha256(DATA).hexdigest())
+    assert (status['chunks'], status['missing']) == (3, [0, 1, 2])
+
+    session = uploads.load(status['upload_id'])
+    send(uploads, session, 2)
+    assert send(uploads, session, 0)['missing'] == [1]
+    with pytest.raises(UploadError) as error:
+        uploads.complete(session, lambda: str(public / 'day1' / 'deck.pdf'))
+    assert error.value.status == 409
+
+    send(uploads, session, 1)
+    destination = uploads.complete(session, lambda: str(public / 'day1' / 'deck.pdf'))
+    with open(destination, 'rb') as f:
+        assert f.read() == DATA
+    assert os.stat(destination).st_mode & 0o777 == 0o644
+    assert not os.path.exists(public / '.uploads' / session['upload_id'])
+
+
+def test_rejects_bad_chunks(public):
+    uploads = ChunkedUploads(lambda: str(public))
+    session = uploads.load(uploads.create(1, 'deck.pdf', len(DATA))['upload_id'])
+    with pytest.raises(UploadError):
+        uploads.write_chunk(session, 3, io.BytesIO(b''), 0)
+    with pytest.raises(UploadError):
+        uploads.write_chunk(session, 0, io.BytesIO(DATA[:100]), 100)
+    with pytest.raises(UploadError):
+        uploads.write_chunk(session, 0, io.BytesIO(DATA[:100]), 4096)  # body ends early
+    with pytest.raises(UploadError):
+        send(uploads, session, 0, sha256='0' * 64)
+    assert uploads.status(session)['received'] == []
+
+
+def test_checksum_mismatch_discards_the_upload(public):
+    uploads = ChunkedUploads(lambda: str(public))
+    session = uploads.load(uploads.create(1, 'deck.pdf', len(DATA), '0' * 64)['upload_id'])
+    for index in range(3):
+        send(uploads, session, index)
+    final = []
+    with pytest.raises(UploadError) as error:
+        uploads.complete(session, lambda: final.append(1))
+    assert error.value.status == 422
+    assert final == []
+    with pytest.raises(UploadError):
+        uploads.load(session['upload_id'])
+
+
+def test_load_validates_the_id(public):
+    uploads = ChunkedUploads(lambda: str(public))
+    for upload_id in ('../../etc', 'f' * 32):
+        with pytest.raises(UploadError) as error:
+            uploads.load(upload_id)
+        assert error.value.status == 404
+
+
+def test_size_limit(public):
+    uploads = ChunkedUploads(lambda: str(public))
+    with pytest.raises(UploadError):
+        uploads.create(1, 'big.pdf', 65537)
+
+
+def test_complete_into_the_blob_store(public, monkeypatch):
+    monkeypatch.setenv('CONTENT_BLOB_STORE', 'on')
+    uploads = ChunkedUploads(lambda: str(public), blobs=BlobStore(lambda: str(public)))
+    digest = hashlib.sha256(DATA).hexdigest()
+    session = uploads.load(uploads.create(1, 'deck.pdf', len(DATA), digest)['upload_id'])
+    for index in range(3):
+        send(uploads, session, index)
+    destination = uploads.complete(session, lambda: str(public / 'day1' / 'deck.pdf'))
+    assert link_digest(destination) == digest
+    with open(destination, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_prune_removes_stale_sessions(public):
+    uploads = ChunkedUploads(lambda: str(public))
+    stale = uploads.create(1, 'old.pdf', 10)['upload_id']
+    old = time.time() - 2 * uploads.ttl
+    os.utime(public / '.uploads' / stale / 'data', (old, old))
+    fresh = uploads.create(1, 'new.pdf', 10)['upload_id']  # create() prunes
+    assert sorted(os.listdir(public / '.uploads')) == [fresh]
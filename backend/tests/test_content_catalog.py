@@ -0,0 +1,75 @@
+import json
+import time
+
+import pytest
+
+from content_catalog import ContentCatalog
+
+
+@pytest.fixture
+def public(tmp_path):
+    day1 = tmp_path / 'day1'
+    day1.mkdir()
+    (day1 / 'metadata.json').write_text(json.dumps({'title': 'Intro'}))
+    (day1 / 'intro.ipynb').write_text('{}')
+    module = tmp_path / 'student_course' / 'module1'
+    module.mkdir(parents=True)
+    (module / 'metadata.json').write_text(json.dumps({'day_number': 101, 'title': 'Module 1'}))
+    (tmp_path / '.uploads' / 'day9').mkdir(parents=True)
+    return tmp_path
+
+
+def catalog(public, monkeypatch, watch='mtime', interval='3600'):
+    monkeypatch.setenv('CONTENT_CATALOG_WATCH', watch)
+    monkeypatch.setenv('CONTENT_CATALOG_CHECK_INTERVAL', interval)
+    return ContentCatalog(lambda: str(public))
+
+
+def test_discovers_day_folders_and_course_buckets(public, monkeypatch):
+    c = catalog(public, monkeypatch)
+    assert sorted(c.days()) == [1, 101]
+    assert c.resolve(101) == str(public / 'student_course' / 'module1')
+    assert c.has_file(1, 'intro.ipynb')
+    assert not c.has_file(1, 'metadata.json')
+    assert c.day(1)['notebooks'] == ['intro.ipynb']
+    assert c.day(9) is None
+
+
+def test_reads_share_one_snapshot(public, monkeypatch):
+    c = catalog(public, monkeypatch)
+    first = c.days()
+    assert c.days() is first
+    assert c.refreshes == 1
+
+
+def test_invalidate_rebuilds_on_next_read(public, monkeypatch):
+    c = catalog(public, monkeypatch)
+    before = c.days()
+    (public / 'day1' / 'slides.pdf').write_bytes(b'%PDF')
+    # Within the check interval nothing is re-read...
+    assert not c.has_file(1, 'slides.pdf')
+    c.invalidate()
+    # ...until a writer invalidates it; the old snapshot is left untouched
+    assert c.has_file(1, 'slides.pdf')
+    assert 'slides.pdf' not in before[1]['file_names']
+
+
+def test_mtime_checks_notice_changes(public, monkeypatch):
+    c = catalog(public, monkeypatch, interval='0')
+    c.days()
+    (public / 'day2').mkdir()
+    assert 2 in c.days()
+    (public / 'student_course' / 'module1' / 'metadata.json').write_text(json.dumps({'day_number': 102}))
+    assert sorted(c.days()) == [1, 2, 102]
+
+
+def test_inotify_notices_changes(public, monkeypatch):
+    c = catalog(public, monkeypatch, watch='inotify')
+    c.days()
+    if c.get_stats()['watch'] != 'inotify':
+        pytest.skip('inotify unavailable')
+    (public / 'day1' / 'notes.ipynb').write_text('{}')
+    deadline = time.time() + 5
+    while not c.has_file(1, 'notes.ipynb') and time.time() < deadline:
+        time.sleep(0.05)
+    assert c.has_file(1, 'notes.ipynb')
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from execution_cache import ExecutionCache, code_cells, is_cacheable_cell, notebook_hash
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv('EXECUTION_CACHE_MAX_ENTRIES', '2')
+    monkeypatch.setenv('EXECUTION_CACHE_MAX_ENTRY_BYTES', '1024')
+    return ExecutionCache()
+
+
+def stream(text):
+    return {'type': 'stream', 'name': 'stdout', 'text': text}
+
+
+def test_cacheable_cells():
+    assert is_cacheable_cell({'cell_type': 'code', 'metadata': {'lms': {'cacheable': True}}})
+    assert is_cacheable_cell({'cell_type': 'code', 'metadata': {'tags': ['cacheable']}})
+    assert not is_cacheable_cell({'cell_type': 'code', 'metadata': {'lms': {'cacheable': 'yes'}}})
+    assert not is_cacheable_cell({'cell_type': 'markdown', 'metadata': {'tags': ['cacheable']}})
+
+
+def test_code_cells():
+    notebook = {'cells': [
+        {'cell_type': 'markdown', 'source': '# Title'},
+        {'cell_type': 'code', 'source': ['x = 1\n', 'x'], 'metadata': {'tags': ['cacheable']}},
+        {'cell_type': 'code', 'source': 'print(x)', 'metadata': {}},
+    ]}
+    assert code_cells(notebook) == {'count': 3, 'code': {1: ('x = 1\nx', True), 2: ('print(x)', False)}}
+    assert code_cells(None) == {'count': 0, 'code': {}}
+
+
+def test_key_changes_with_notebook_cell_and_source():
+    key = ExecutionCache.key('a' * 64, 1, 'x = 1')
+    assert key == ExecutionCache.key('a' * 64, 1, 'x = 1')
+    assert key != ExecutionCache.key('b' * 64, 1, 'x = 1')
+    assert key != ExecutionCache.key('a' * 64, 2, 'x = 1')
+    assert key != ExecutionCache.key('a' * 64, 1, 'x = 2')
+
+
+def test_put_and_get(cache):
+    assert cache.get('k') is None
+    cache.put('k', [{'type': 'execute_result', 'data': {'text/plain': '1'}, 'execution_count': 3}])
+    assert cache.get('k') == [{'type': 'execute_result', 'data': {'text/plain': '1'}, 'execution_count': None}]
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stored']) == (1, 1, 1)
+
+
+def test_unshareable_outputs_are_not_stored(cache):
+    cache.put('error', [{'type': 'error', 'ename': 'E', 'evalue': '', 'traceback': []}])
+    cache.put('spilled', [{'type': 'display_data', 'data': {}, 'spilled': {'image/png': {}}}])
+    cache.put('large', [stream('x' * 2048)])
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.put('a', [stream('a')])
+    cache.put('b', [stream('b')])
+    cache.get('a')
+    cache.put('c', [stream('c')])
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+
+def test_notebook_hash_follows_content(tmp_path):
+    path = tmp_path / 'day.ipynb'
+    path.write_text(json.dumps({'cells': []}))
+    first = notebook_hash(str(path))
+    assert notebook_hash(str(path)) == first
+    path.write_text(json.dumps({'cells': [{'cell_type': 'code', 'source': 'x'}]}))
+    assert notebook_hash(str(path)) != first
+
+
+def test_notebook_hash_of_a_blob_link_is_its_name(tmp_path):
+    digest = 'c' * 64
+    blob = tmp_path / '.blobs' / 'sha256' / 'cc' / digest
+    blob.parent.mkdir(parents=True)
+    blob.write_text('{}')
+    link = tmp_path / 'day.ipynb'
+    os.symlink(os.path.relpath(blob, tmp_path), link)
+    assert notebook_hash(str(link)) == digest
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from execution_scheduler import ExecutionQueueTimeout, FairShareScheduler
+
+
+def scheduler(**kwargs):
+    options = {'max_concurrent': 1, 'max_per_user': 1, 'quantum': 1.0}
+    options.update(kwargs)
+    return FairShareScheduler(**options)
+
+
+def test_submit_is_granted_right_away_when_a_slot_is_free():
+    s = scheduler()
+    granted = []
+    s.submit('a', granted.append)
+    assert len(granted) == 1
+    assert s.get_stats()['running'] == 1
+
+
+def test_queued_work_runs_when_a_slot_is_released():
+    s = scheduler()
+    started = s.acquire('a')
+    granted = []
+    s.submit('b', granted.append)
+    assert granted == []
+    assert s.get_stats()['queued'] == 1
+
+    s.release('a', started)
+    assert len(granted) == 1
+    assert s.get_stats()['queued'] == 0
+
+
+def test_per_user_cap_leaves_free_slots_to_others():
+    s = scheduler(max_concurrent=4)
+    order = []
+    s.submit('a', lambda started: order.append('a1'))
+    s.submit('a', lambda started: order.append('a2'))
+    s.submit('b', lambda started: order.append('b1'))
+    assert order == ['a1', 'b1']
+    assert s.get_stats()['queued_by_user'] == {'a': 1}
+
+
+def test_user_in_debt_waits_behind_others():
+    s = scheduler()
+    # 'a' held a slot for ten seconds and owes for it
+    s.release('a', s.acquire('a') - 10)
+    assert s.get_stats()['deficits']['a'] < 0
+
+    holder = s.acquire('c')
+    order = []
+    s.submit('a', lambda started: order.append('a'))
+    s.submit('b', lambda started: order.append('b'))
+    s.release('c', holder)
+    assert order == ['b']
+
+
+def test_debt_is_capped(monkeypatch):
+    monkeypatch.setenv('EXECUTION_SCHEDULER_MAX_DEBT', '5')
+    s = scheduler()
+    s.release('a', s.acquire('a') - 100)
+    assert s.get_stats()['deficits']['a'] == -5
+
+
+def test_acquire_times_out_and_leaves_the_queue():
+    s = scheduler()
+    holder = s.acquire('a')
+    with pytest.raises(ExecutionQueueTimeout):
+        s.acquire('b', timeout=0.05)
+    stats = s.get_stats()
+    assert stats['timeouts'] == 1
+    assert stats['queued'] == 0
+    s.release('a', holder)
+    assert s.get_stats()['running'] == 0
+
+
+def test_withdraw():
+    s = scheduler()
+    holder = s.acquire('a')
+    granted = []
+    waiter = s.submit('b', granted.append)
+    assert s.withdraw(waiter)
+    s.release('a', holder)
+    assert granted == []
+    assert not s.withdraw(s.submit('b', granted.append))
+
+
+def test_slot_releases_on_error():
+    s = scheduler()
+    with pytest.raises(RuntimeError):
+        with s.slot('a'):
+            raise RuntimeError('cell failed')
+    assert s.get_stats()['running'] == 0
+    started = time.time()
+    with s.slot('b', timeout=1):
+        pass
+    assert time.time() - started < 1
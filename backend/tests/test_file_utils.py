@@ -0,0 +1,38 @@
+import hashlib
+import os
+import stat
+
+import pytest
+
+from file_utils import sha256_file, write_atomic
+
+
+def test_write_atomic_creates_the_folder_and_replaces_the_file(tmp_path):
+    path = tmp_path / 'cache' / 'view.json'
+    write_atomic(str(path), lambda f: f.write(b'old'))
+    write_atomic(str(path), lambda f: f.write(b'new'))
+
+    assert path.read_bytes() == b'new'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert os.listdir(path.parent) == ['view.json']
+
+
+def test_write_atomic_keeps_the_old_file_when_save_fails(tmp_path):
+    path = tmp_path / 'deck.pdf'
+    path.write_bytes(b'slides')
+
+    def fail(f):
+        f.write(b'partial')
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        write_atomic(str(path), fail)
+    assert path.read_bytes() == b'slides'
+    assert os.listdir(tmp_path) == ['deck.pdf']
+
+
+def test_sha256_file_matches_hashlib(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    path = tmp_path / 'blob'
+    path.write_bytes(data)
+    assert sha256_file(str(path)) == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,123 @@
+import functools
+import os
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import kernel_host
+from kernel_host import HostedKernel, KernelHostClient, KernelHostServer, recv_frame, send_frame
+
+
+def test_frames_round_trip():
+    a, b = socket.socketpair()
+    with a, b:
+        send_frame(a, {'op': 'execute', 'code': 'print("é")'})
+        send_frame(a, {'op': 'ping'})
+        assert recv_frame(b) == {'op': 'execute', 'code': 'print("é")'}
+        assert recv_frame(b) == {'op': 'ping'}
+
+
+def test_recv_frame_returns_none_when_the_peer_closes():
+    a, b = socket.socketpair()
+    with b:
+        a.sendall(struct.pack('>I', 10) + b'{"op"')  # truncated payload
+        a.close()
+        assert recv_frame(b) is None
+
+
+def test_recv_frame_rejects_oversized_frames():
+    a, b = socket.socketpair()
+    with a, b:
+        a.sendall(struct.pack('>I', kernel_host.MAX_FRAME_BYTES + 1))
+        with pytest.raises(ValueError):
+            recv_frame(b)
+
+
+class FakeKernel:
+    def __init__(self, delay=0):
+        self.delay = delay
+
+    def execute_cell_stream(self, code):
+        if code == 'fail':
+            raise RuntimeError('kernel died')
+        time.sleep(self.delay)
+        yield {'type': 'stream', 'name': 'stdout', 'text': code}
+
+
+class FakeManager:
+    def __init__(self, delay=0):
+        self.kernel = FakeKernel(delay)
+
+    def get_kernel(self, user_id, allow_remote=True):
+        return self.kernel
+
+    def get_stats(self):
+        return {'kernels': 1}
+
+
+@pytest.fixture
+def host(tmp_path):
+    servers = []
+
+    def start(manager):
+        path = str(tmp_path / 'host.sock')
+        server = KernelHostServer(path, manager)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return path
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_execute_streams_outputs_then_done(host):
+    client = KernelHostClient(socket_path=host(FakeManager()), autostart=False, timeout=5)
+    kernel = HostedKernel(client, 7)
+    assert list(kernel.execute_cell_stream('hi')) == [{'type': 'stream', 'name': 'stdout', 'text': 'hi'}]
+    assert kernel.execute_cell('fail') == {'success': False, 'error': 'kernel died', 'type': 'error'}
+    assert client.call('stats') == {'kernels': 1}
+    assert client.call('ping') is None
+    with pytest.raises(RuntimeError):
+        client.call('format_disk')
+
+
+def test_client_without_daemon_does_not_autostart(tmp_path):
+    client = KernelHostClient(socket_path=str(tmp_path / 'missing.sock'), autostart=False)
+    with pytest.raises(FileNotFoundError):
+        client.call('ping')
+    assert not os.path.exists(tmp_path / 'missing.sock')
+
+
+def test_with_keepalives_fills_silences():
+    def produce():
+        time.sleep(0.35)
+        yield 'a'
+        yield 'b'
+
+    items = list(kernel_host.with_keepalives(produce, interval=0.1))
+    assert items[-2:] == ['a', 'b']
+    assert items[:-2] and set(items[:-2]) == {None}
+
+
+def test_with_keepalives_reraises():
+    def produce():
+        yield 'a'
+        raise KeyError('boom')
+
+    items = kernel_host.with_keepalives(produce, interval=0.1)
+    assert next(items) == 'a'
+    with pytest.raises(KeyError):
+        next(items)
+
+
+def test_silent_operation_outlasts_the_client_timeout(host, monkeypatch):
+    monkeypatch.setattr(kernel_host, 'with_keepalives',
+                        functools.partial(kernel_host.with_keepalives, interval=0.1))
+    client = KernelHostClient(socket_path=host(FakeManager(delay=1.0)), autostart=False, timeout=0.5)
+    # Keepalive frames are consumed by the client, never surfaced
+    assert [m['kind'] for m in client.request('execute', user_id=7, code='slow')] == ['output', 'done']
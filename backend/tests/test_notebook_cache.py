@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+import notebook_cache
+from notebook_cache import SerializedFileCache, cached_json_response, serialize_json
+
+NOTEBOOK = {'cells': [{'cell_type': 'code', 'source': 'print("hello")\n' * 200}], 'metadata': {}}
+
+app = Flask(__name__)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'lesson.ipynb'
+    path.write_text(json.dumps(NOTEBOOK))
+    return str(path)
+
+
+def respond(entry, **headers):
+    with app.test_request_context(headers=headers):
+        return cached_json_response(entry)
+
+
+def test_entry_is_built_once_per_file_version(path):
+    cache = SerializedFileCache(summarize=lambda parsed: len(parsed['cells']))
+    entry = cache.get(path)
+    assert cache.get(path) is entry
+    assert entry['summary'] == 1
+    assert entry['encodings']['identity'] == serialize_json(NOTEBOOK)
+    assert gzip.decompress(entry['encodings']['gzip']) == entry['encodings']['identity']
+    assert (cache.get_stats()['hits'], cache.get_stats()['misses']) == (1, 1)
+
+    with open(path, 'w') as f:
+        json.dump({'cells': []}, f)
+    assert cache.get(path) is not entry
+
+
+def test_known_content_hash_is_the_etag(path):
+    entry = SerializedFileCache().get(path, etag='abc123')
+    assert entry['etags']['identity'] == 'abc123'
+    assert entry['etags']['gzip'] == 'abc123-gzip'
+
+
+def test_small_files_are_not_compressed(tmp_path):
+    path = tmp_path / 'tiny.ipynb'
+    path.write_text('{"cells": []}')
+    assert list(SerializedFileCache().get(str(path))['encodings']) == ['identity']
+
+
+def test_lru_is_bounded_by_bytes(tmp_path, path):
+    cache = SerializedFileCache(max_bytes=1)
+    other = tmp_path / 'other.ipynb'
+    other.write_text(json.dumps(NOTEBOOK))
+    cache.get(path)
+    cache.get(str(other))
+    assert cache.get_stats()['entries'] == 1
+
+
+def test_malformed_file_raises_and_leaves_no_build_lock(tmp_path):
+    cache = SerializedFileCache()
+    broken = tmp_path / 'broken.ipynb'
+    broken.write_text('{"cells": [')
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.get(str(broken))
+    broken.write_bytes(b'\xff\xfe{}')
+    with pytest.raises(ValueError):
+        cache.get(str(broken))
+    assert cache._build_locks == {}
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_response_picks_the_best_accepted_encoding(path, monkeypatch):
+    monkeypatch.setattr(notebook_cache, 'brotli', None)
+    entry = SerializedFileCache().get(path)
+
+    response = respond(entry, **{'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_etag() == (entry['etags']['gzip'], False)
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    response = respond(entry)
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.get_data()) == NOTEBOOK
+
+
+def test_brotli_is_preferred_when_installed(path):
+    if notebook_cache.brotli is None:
+        pytest.skip('brotli not installed')
+    entry = SerializedFileCache().get(path)
+    assert respond(entry, **{'Accept-Encoding': 'gzip, br'}).headers['Content-Encoding'] == 'br'
+
+
+def test_matching_etag_gets_304(path):
+    entry = SerializedFileCache().get(path)
+    response = respond(entry, **{'If-None-Match': f'"{entry["etags"]["identity"]}"'})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    # An ETag of any encoding of the same body still matches
+    response = respond(entry, **{'If-None-Match': f'"{entry["etags"]["gzip"]}"', 'Accept-Encoding': 'identity'})
+    assert response.status_code == 304
+    assert respond(entry, **{'If-None-Match': '"stale"'}).status_code == 200
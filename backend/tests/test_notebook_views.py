@@ -0,0 +1,99 @@
+import base64
+import json
+import os
+
+import pytest
+
+from notebook_views import ASSET_URL_PREFIX, NotebookViews
+
+PNG = b'\x89PNG\r\n' + bytes(range(256)) * 32
+
+
+@pytest.fixture
+def views(tmp_path, monkeypatch):
+    monkeypatch.setenv('NOTEBOOK_INLINE_OUTPUT_BYTES', '1024')
+    return NotebookViews(root=str(tmp_path / 'cache'))
+
+
+def notebook(*outputs):
+    return {
+        'cells': [{'cell_type': 'code', 'source': ['df.head()'], 'metadata': {}, 'outputs': list(outputs)}],
+        'metadata': {'kernelspec': {'name': 'python3'}},
+    }
+
+
+def display(data):
+    return {'output_type': 'display_data', 'data': data, 'metadata': {}}
+
+
+def test_small_outputs_are_untouched(views):
+    nb = notebook(display({'text/plain': '42'}), {'output_type': 'stream', 'name': 'stdout', 'text': 'x' * 5000})
+    assert views.slim(json.loads(json.dumps(nb))) == nb
+
+
+def test_large_images_become_assets(views):
+    png = base64.b64encode(PNG).decode()
+    nb = views.slim(notebook(display({'image/png': png, 'text/plain': '<Figure>'}),
+                             display({'image/png': [png[:100], png[100:]]})))
+    first, second = nb['cells'][0]['outputs']
+
+    assert first['data'] == {'text/plain': '<Figure>'}
+    asset = first['metadata']['lms']['assets']['image/png']
+    assert asset == second['metadata']['lms']['assets']['image/png']
+    assert asset['bytes'] == len(PNG)
+    name = asset['url'][len(ASSET_URL_PREFIX):]
+    path, mimetype = views.asset(name)
+    assert mimetype == 'image/png'
+    with open(path, 'rb') as f:
+        assert f.read() == PNG
+    assert views.get_stats()['assets_written'] == 1
+
+
+def test_large_non_image_bundles_are_listed_as_omitted(views):
+    nb = views.slim(notebook(display({'text/html': '<table>' + '<tr></tr>' * 500, 'text/plain': 'DataFrame'})))
+    output = nb['cells'][0]['outputs'][0]
+    assert output['data'] == {'text/plain': 'DataFrame'}
+    assert output['metadata']['lms'] == {'omitted': ['text/html']}
+
+
+def test_large_text_plain_is_truncated_not_dropped(views):
+    text = 'row\n' * 1000
+    nb = views.slim(notebook(display({'text/plain': text, 'text/html': '<table>' + '<tr></tr>' * 500}),
+                             {'output_type': 'execute_result', 'data': {'text/plain': list(text)}, 'metadata': {}}))
+    for output in nb['cells'][0]['outputs']:
+        kept = output['data']['text/plain']
+        assert kept.startswith(text[:1024])
+        assert kept.endswith(f'[output truncated: {len(text) - 1024} more characters in the full notebook]')
+        assert output['metadata']['lms']['truncated'] == ['text/plain']
+    assert nb['cells'][0]['outputs'][0]['metadata']['lms']['omitted'] == ['text/html']
+
+
+def test_output_without_text_plain_gets_a_placeholder(views):
+    nb = views.slim(notebook(display({'text/html': 'x' * 5000, 'application/json': {'rows': ['y'] * 2000}})))
+    output = nb['cells'][0]['outputs'][0]
+    assert output['data'] == {'text/plain': '[text/html, application/json output omitted, shown in the full notebook]'}
+
+    # Images stay renderable through their asset, without a placeholder
+    png = base64.b64encode(PNG).decode()
+    output = views.slim(notebook(display({'image/png': png})))['cells'][0]['outputs'][0]
+    assert output['data'] == {}
+    assert 'image/png' in output['metadata']['lms']['assets']
+
+
+def test_asset_names_are_validated(views):
+    assert views.asset('../../etc/passwd') == (None, None)
+    assert views.asset('0' * 64 + '.png') == (None, None)
+
+
+def test_view_is_built_once_per_notebook_content(tmp_path, views):
+    path = tmp_path / 'lesson.ipynb'
+    path.write_text(json.dumps(notebook(display({'text/html': 'x' * 5000}))))
+    view = views.view_path(str(path))
+    assert views.view_path(str(path)) == view
+    assert views.get_stats()['built'] == 1
+    with open(view) as f:
+        assert f.read().find('x' * 5000) == -1
+
+    path.write_text(json.dumps(notebook()))
+    assert views.view_path(str(path)) != view
+    assert os.path.exists(view)
@@ -0,0 +1,69 @@
+import base64
+
+from output_store import OutputBudget, OutputSpillStore, split_status, status_output
+
+
+def stream(text):
+    return {'type': 'stream', 'name': 'stdout', 'text': text}
+
+
+def test_stream_within_budget_is_unchanged():
+    budget = OutputBudget(max_bytes=100)
+    output = stream('hello\n')
+    assert budget.apply(output) is output
+    assert budget.used == 6
+
+
+def test_stream_past_budget_is_truncated_once_then_dropped():
+    budget = OutputBudget(max_bytes=2048)
+    first = budget.apply(stream('a' * 2000))
+    second = budget.apply(stream('b' * 100))
+    assert first['text'] == 'a' * 2000
+    assert second['text'].startswith('b' * 48)
+    assert 'output truncated' in second['text']
+    assert budget.apply(stream('c' * 10)) is None
+    assert budget.exhausted
+    assert budget.dropped == 52 + 10
+
+
+def test_large_bundle_is_spilled(tmp_path):
+    store = OutputSpillStore(root=str(tmp_path))
+    budget = OutputBudget(max_bytes=10_000, spill_threshold=100, store=store, owner=7)
+    png = base64.b64encode(b'\x89PNG' + b'\0' * 500).decode()
+    trimmed = budget.apply({'type': 'display_data', 'data': {'image/png': png, 'text/plain': '<Figure>'}})
+
+    assert trimmed['data'] == {'text/plain': '<Figure>'}
+    ref = trimmed['spilled']['image/png']['url'].rsplit('/', 1)[1]
+    with open(store.path(7, ref), 'rb') as f:
+        assert f.read() == base64.b64decode(png)
+    assert budget.used == len('<Figure>')
+
+
+def test_bundle_past_budget_is_replaced_with_a_notice():
+    budget = OutputBudget(max_bytes=1024, spill_threshold=10_000)
+    trimmed = budget.apply({'type': 'execute_result', 'data': {'text/html': 'x' * 2000}})
+    assert list(trimmed['data']) == ['text/plain']
+    assert 'output omitted' in trimmed['data']['text/plain']
+    assert budget.apply({'type': 'execute_result', 'data': {'text/plain': 'y'}}) is None
+
+
+def test_errors_always_pass():
+    budget = OutputBudget(max_bytes=1024)
+    budget.apply(stream('a' * 5000))
+    error = {'type': 'error', 'ename': 'ValueError', 'evalue': '', 'traceback': ['line']}
+    assert budget.apply(error) is error
+
+
+def test_spill_store_rejects_bad_refs_and_purges(tmp_path):
+    store = OutputSpillStore(root=str(tmp_path))
+    ref = store.put('u1', 'text/html', '<b>hi</b>')
+    assert store.path('u1', ref)
+    assert store.path('u1', '../u2/' + ref) is None
+    assert store.path('u2', ref) is None
+    store.purge('u1')
+    assert store.path('u1', ref) is None
+
+
+def test_split_status():
+    outputs = [status_output('Restoring...'), stream('1\n'), status_output('Restored')]
+    assert split_status(outputs) == ([stream('1\n')], ['Restoring...', 'Restored'])
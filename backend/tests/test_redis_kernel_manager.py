@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from redis_kernel_manager import _parse_forwarded_request
+
+REQUEST_ID = 'a' * 32
+
+
+def test_valid_requests_are_returned():
+    request = {'request_id': REQUEST_ID, 'user_id': 7, 'op': 'execute', 'code': 'print(1)'}
+    assert _parse_forwarded_request(json.dumps(request)) == request
+    interrupt = {'request_id': REQUEST_ID, 'user_id': 7, 'op': 'interrupt', 'code': None}
+    assert _parse_forwarded_request(json.dumps(interrupt).encode()) == interrupt
+
+
+@pytest.mark.parametrize('raw', [
+    '{"request_id": "' + REQUEST_ID + '", "user_id": 7, "op": "exec',  # truncated
+    b'\xff\xfe',
+    '[1, 2]',
+    '"execute"',
+    json.dumps({'request_id': REQUEST_ID, 'user_id': 7, 'op': 'shutdown_all'}),
+    json.dumps({'user_id': 7, 'op': 'restart'}),
+    json.dumps({'request_id': '../../x', 'user_id': 7, 'op': 'restart'}),
+    json.dumps({'request_id': REQUEST_ID, 'op': 'restart'}),
+    json.dumps({'request_id': REQUEST_ID, 'user_id': 7, 'op': 'execute', 'code': None}),
+])
+def test_malformed_requests_raise_value_error(raw):
+    with pytest.raises(ValueError):
+        _parse_forwarded_request(raw)
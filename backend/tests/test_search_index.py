@@ -0,0 +1,87 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import content_catalog
+from search_index import SearchIndex, match_query
+
+
+def write_day(public, number, title, description='', notebook_cells=None):
+    day = public / f'day{number}'
+    day.mkdir(exist_ok=True)
+    (day / 'metadata.json').write_text(json.dumps({'title': title, 'description': description, 'level': 'Beginner'}))
+    if notebook_cells is not None:
+        cells = [{'cell_type': kind, 'source': source, 'metadata': {}} for kind, source in notebook_cells]
+        (day / 'lesson.ipynb').write_text(json.dumps({'cells': cells}))
+
+
+def days(public):
+    return content_catalog.build(str(public))['days']
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(path=str(tmp_path / 'cache' / 'search.sqlite3'))
+
+
+def test_match_query():
+    assert match_query('Vector  stores!') == '"vector"* "stores"*'
+    assert match_query('"; DROP TABLE') == '"drop"* "table"*'
+    assert match_query('  ?! ') == ''
+
+
+def test_finds_days_by_metadata_and_notebook_text(tmp_path, index):
+    public = tmp_path / 'public'
+    public.mkdir()
+    write_day(public, 1, 'Prompting basics', 'Zero-shot and few-shot prompts')
+    write_day(public, 2, 'Retrieval', notebook_cells=[('markdown', '# Embeddings'), ('code', 'from langchain_core import vectorstores')])
+    index.sync_days(days(public))
+
+    assert index.search('few-shot') == {'days': [1], 'resources': []}
+    assert index.search('vectorst')['days'] == [2]
+    assert index.search('embeddings')['days'] == [2]
+    assert index.search('nothing like this') == {'days': [], 'resources': []}
+
+
+def test_title_match_ranks_first(tmp_path, index):
+    public = tmp_path / 'public'
+    public.mkdir()
+    write_day(public, 1, 'Agents', 'Tools and memory')
+    write_day(public, 2, 'Chains', 'Chains come before agents')
+    index.sync_days(days(public))
+    assert index.search('agents')['days'] == [1, 2]
+
+
+def test_sync_follows_changes_and_removals(tmp_path, index):
+    public = tmp_path / 'public'
+    public.mkdir()
+    write_day(public, 1, 'Prompting', notebook_cells=[('markdown', 'temperature')])
+    write_day(public, 2, 'Agents')
+    index.sync_days(days(public))
+    indexed = index.documents_indexed
+
+    # An unchanged snapshot re-reads nothing
+    index.sync_days(days(public))
+    assert index.documents_indexed == indexed
+
+    write_day(public, 1, 'Prompting', notebook_cells=[('markdown', 'top_p sampling')])
+    (public / 'day2' / 'metadata.json').unlink()
+    (public / 'day2').rmdir()
+    index.sync_days(days(public))
+
+    assert index.search('temperature')['days'] == []
+    assert index.search('sampling')['days'] == [1]
+    assert index.search('agents')['days'] == []
+    assert index.get_stats()['documents'] == 2
+
+
+def test_resources(index):
+    resources = [SimpleNamespace(id=5, title='Prompt cheatsheet', description='Patterns', instructor='Ada', category='guides')]
+    index.sync_resources(('v1',), lambda: resources)
+    assert index.search('cheatsheet') == {'days': [], 'resources': [5]}
+
+    # Same signature: the loader is not called again
+    index.sync_resources(('v1',), lambda: pytest.fail('resources reloaded'))
+    index.sync_resources(('v2',), lambda: [])
+    assert index.search('cheatsheet')['resources'] == []
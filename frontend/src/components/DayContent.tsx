@@ -4,6 +4,7 @@ import { daysAPI, progressAPI, quizAPI, assignmentAPI } from '../utils/api';
 import { DayContent as DayContentType, VideoContent, QuizData, AssignmentData, ContentItemProgressData } from '../types';
 import NotebookViewer from './NotebookViewer';
 import PDFViewer from './PDFViewer';
+import PDFThumbnail from './PDFThumbnail';
 import QuizViewer from './QuizViewer';
 import AssignmentSubmit from './AssignmentSubmit';
 import CommentSection from './CommentSection';
@@ -262,9 +263,13 @@ const DayContent: React.FC = () => {
               {content.pdfs.map((pdf) => (
                 <div key={pdf.filename} onClick={() => { setSelectedPDF(pdf.filename); setSelectedNotebook(null); setSelectedVideo(null); }}
                   className="glass-card-hover p-4 flex items-center gap-4 cursor-pointer group">
-                  <div className="bg-amber-500/10 rounded-xl p-3">
-                    <FileText className="w-5 h-5 text-amber-400" />
-                  </div>
+                  {pdf.thumbnails?.length ? (
+                    <PDFThumbnail path={pdf.thumbnails[0]} alt={pdf.name} />
+                  ) : (
+                    <div className="bg-amber-500/10 rounded-xl p-3">
+                      <FileText className="w-5 h-5 text-amber-400" />
+                    </div>
+                  )}
                   <p className="flex-1 font-medium text-slate-100 group-hover:text-white transition-colors">{pdf.name}</p>
                   <ChevronRight className="w-5 h-5 text-slate-600 group-hover:text-indigo-400 transition-colors" />
                 </div>
@@ -38,11 +38,12 @@ const NotebookViewer: React.FC<NotebookViewerProps> = ({ dayNumber, filename, on
   const executeCell = async (cellIndex: number, code: string) => {
     setExecutingCell(cellIndex);
     try {
-      const result = await daysAPI.executeCell(code);
+      const result = await daysAPI.executeCell(code, { dayNumber, filename, cellIndex });
       if (!result.success) {
         setCellOutputs({ ...cellOutputs, [cellIndex]: { output: result.error || 'Execution failed', error: true } });
       } else {
-        let outputText = '';
+        // Session notices (e.g. a restored session) come before the cell's own output
+        let outputText = (result.notices || []).map((notice: string) => `${notice}\n`).join('');
         if (result.outputs?.length) {
           for (const output of result.outputs) {
             if (output.type === 'stream') outputText += output.text;
@@ -0,0 +1,26 @@
+import React, { useEffect, useState } from 'react';
+import { daysAPI } from '../utils/api';
+
+interface PDFThumbnailProps {
+  path: string;
+  alt: string;
+}
+
+// First-page preview of a PDF card; fetched with the auth header and cached by the browser
+const PDFThumbnail: React.FC<PDFThumbnailProps> = ({ path, alt }) => {
+  const [src, setSrc] = useState<string | null>(null);
+
+  useEffect(() => {
+    let objectUrl: string | null = null;
+    let cancelled = false;
+    daysAPI.getPDFThumbnail(path)
+      .then((url) => { objectUrl = url; if (!cancelled) setSrc(url); })
+      .catch(() => {});
+    return () => { cancelled = true; if (objectUrl) URL.revokeObjectURL(objectUrl); };
+  }, [path]);
+
+  if (!src) return null;
+  return <img src={src} alt={alt} className="w-16 h-20 object-cover object-top rounded-lg border border-white/10" />;
+};
+
+export default PDFThumbnail;
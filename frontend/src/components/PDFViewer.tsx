@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useMemo } from 'react';
 import { Document, Page, pdfjs } from 'react-pdf';
 import { daysAPI } from '../utils/api';
 import { X, ChevronLeft, ChevronRight, ZoomIn, ZoomOut, RotateCcw } from 'lucide-react';
@@ -14,25 +14,13 @@ interface PDFViewerProps {
 }
 
 const PDFViewer: React.FC<PDFViewerProps> = ({ dayNumber, filename, onClose }) => {
-  const [pdfUrl, setPdfUrl] = useState<string | null>(null);
+  // PDF.js fetches the file itself, with Range requests, so page 1 renders before the whole deck arrives
+  const pdfSource = useMemo(() => daysAPI.getPDFSource(dayNumber, filename), [dayNumber, filename]);
   const [numPages, setNumPages] = useState<number | null>(null);
   const [pageNumber, setPageNumber] = useState(1);
   const [scale, setScale] = useState(1.0);
-  const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
-  useEffect(() => {
-    fetchPDF();
-    return () => { if (pdfUrl) URL.revokeObjectURL(pdfUrl); };
-  }, [dayNumber, filename]);
-
-  const fetchPDF = async () => {
-    setLoading(true);
-    try { setPdfUrl(await daysAPI.getPDF(dayNumber, filename)); }
-    catch { setError('Failed to load PDF.'); }
-    finally { setLoading(false); }
-  };
-
   const ToolbarButton: React.FC<{ onClick: () => void; disabled?: boolean; children: React.ReactNode; title?: string }> =
     ({ onClick, disabled, children, title }) => (
       <button onClick={onClick} disabled={disabled} title={title}
@@ -41,21 +29,12 @@ const PDFViewer: React.FC<PDFViewerProps> = ({ dayNumber, filename, onClose }) =
       </button>
     );
 
-  if (loading) return (
-    <div className="flex-1 flex flex-col bg-slate-950 h-screen">
-      <div className="bg-slate-900/80 backdrop-blur-xl border-b border-white/10 px-6 py-4 flex justify-end">
-        <button onClick={onClose} className="btn-ghost text-sm flex items-center gap-1.5"><X className="w-4 h-4" /> Close</button>
-      </div>
-      <div className="flex-1 flex items-center justify-center text-slate-400">Loading PDF...</div>
-    </div>
-  );
-
-  if (error || !pdfUrl) return (
+  if (error) return (
     <div className="flex-1 flex flex-col bg-slate-950 h-screen">
       <div className="bg-slate-900/80 backdrop-blur-xl border-b border-white/10 px-6 py-4 flex justify-end">
         <button onClick={onClose} className="btn-ghost text-sm flex items-center gap-1.5"><X className="w-4 h-4" /> Close</button>
       </div>
-      <div className="p-6"><div className="error-banner">{error || 'PDF not found'}</div></div>
+      <div className="p-6"><div className="error-banner">{error}</div></div>
     </div>
   );
 
@@ -98,7 +77,7 @@ const PDFViewer: React.FC<PDFViewerProps> = ({ dayNumber, filename, onClose }) =
 
       <div className="flex-1 overflow-auto bg-slate-900/50 flex justify-center py-6">
         <Document
-          file={pdfUrl}
+          file={pdfSource}
           onLoadSuccess={({ numPages }) => { setNumPages(numPages); setPageNumber(1); }}
           onLoadError={() => setError('Failed to load PDF document')}
           loading={<div className="text-slate-400 py-12">Loading PDF document...</div>}
@@ -91,6 +91,8 @@ export interface ContentFile {
   filename: string;
   name: string;
   type: 'notebook' | 'pdf';
+  pages?: number | null;  // PDFs: null until the page index has been extracted
+  thumbnails?: string[];  // PDFs: preview image paths, relative to the API root
 }
 
 export interface UserProgress {
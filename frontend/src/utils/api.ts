@@ -3,6 +3,11 @@ import { AuthResponse, Day, DayContent, UserProgress, Notebook, User, UserProfil
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
+const sha256Hex = async (data: ArrayBuffer): Promise<string> => {
+  const digest = await window.crypto.subtle.digest('SHA-256', data);
+  return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+};
+
 const api = axios.create({
   baseURL: API_URL,
   headers: {
@@ -98,12 +103,35 @@ export const contentAPI = {
     return response.data;
   },
 
+  // Chunked and resumable: uploading the same file again after a failure sends only the missing chunks
   uploadFile: async (dayNumber: number, file: File): Promise<any> => {
-    const formData = new FormData();
-    formData.append('file', file);
-    const response = await api.post(`/admin/content/days/${dayNumber}/upload`, formData, {
-      headers: { 'Content-Type': 'multipart/form-data' },
-    });
+    const resumeKey = `upload:${dayNumber}:${file.name}:${file.size}:${file.lastModified}`;
+    let session: any = null;
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+      try { session = (await api.get(`/admin/content/uploads/${savedId}`)).data; } catch { session = null; }
+    }
+    if (!session) {
+      session = (await api.post(`/admin/content/days/${dayNumber}/uploads`, { filename: file.name, size: file.size })).data;
+      localStorage.setItem(resumeKey, session.upload_id);
+    }
+
+    for (const index of session.missing as number[]) {
+      const chunk = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+      const headers: Record<string, string> = { 'Content-Type': 'application/octet-stream' };
+      if (window.crypto?.subtle) headers['X-Chunk-SHA256'] = await sha256Hex(await chunk.arrayBuffer());
+      for (let attempt = 1; ; attempt++) {
+        try {
+          await api.put(`/admin/content/uploads/${session.upload_id}/chunks/${index}`, chunk, { headers });
+          break;
+        } catch (err) {
+          if (attempt >= 3) throw err;
+        }
+      }
+    }
+
+    const response = await api.post(`/admin/content/uploads/${session.upload_id}/complete`);
+    localStorage.removeItem(resumeKey);
     return response.data;
   },
 
@@ -141,15 +169,22 @@ export const daysAPI = {
     return response.data;
   },
 
-  getPDF: async (dayNumber: number, filename: string): Promise<string> => {
-    const response = await api.get(`/days/${dayNumber}/pdf/${filename}`, {
-      responseType: 'blob',
-    });
+  getPDFThumbnail: async (path: string): Promise<string> => {
+    const response = await api.get(path, { responseType: 'blob' });
     return URL.createObjectURL(response.data);
   },
 
-  executeCell: async (code: string): Promise<any> => {
-    const response = await api.post('/execute/cell', { code });
+  getPDFSource: (dayNumber: number, filename: string) => ({
+    url: `${API_URL}/days/${dayNumber}/pdf/${encodeURIComponent(filename)}`,
+    httpHeaders: { Authorization: `Bearer ${localStorage.getItem('access_token') || ''}` },
+  }),
+
+  // cell names the notebook cell being run, so unedited cacheable cells can be served from the server's cache
+  executeCell: async (code: string, cell?: { dayNumber: number; filename: string; cellIndex: number }): Promise<any> => {
+    const response = await api.post('/execute/cell', {
+      code,
+      ...(cell && { day_number: cell.dayNumber, filename: cell.filename, cell_index: cell.cellIndex }),
+    });
     return response.data;
   },
 };